@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark for the stdio entry point
+
+Measures, over several fresh interpreter launches:
+- import: `import coinex_mcp_server.main` alone
+- tools_list: process spawn -> initialize -> first `tools/list` response, i.e. what an MCP host waits for
+
+Usage:
+    python benchmarks/bench_startup.py --runs 10
+    python benchmarks/bench_startup.py --runs 5 --max-ms 3000   # exit 1 when the median regresses past the budget
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+PROTOCOL_VERSION = "2025-06-18"
+
+
+def measure_import() -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import coinex_mcp_server.main"], check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return (time.perf_counter() - started) * 1000
+
+
+def _send(proc: subprocess.Popen, message: dict):
+    proc.stdin.write((json.dumps(message) + "\n").encode())
+    proc.stdin.flush()
+
+
+def _read_response(proc: subprocess.Popen, request_id: int) -> dict:
+    while True:
+        line = proc.stdout.readline()
+        if not line:
+            raise RuntimeError("server exited before responding")
+        message = json.loads(line)
+        if message.get("id") == request_id:
+            return message
+
+
+def measure_tools_list() -> tuple[float, int]:
+    env = dict(os.environ, FASTMCP_SHOW_CLI_BANNER="false")
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "coinex_mcp_server.main"], env=env,
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        _send(proc, {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {
+            "protocolVersion": PROTOCOL_VERSION, "capabilities": {},
+            "clientInfo": {"name": "bench-startup", "version": "0"},
+        }})
+        _read_response(proc, 1)
+        _send(proc, {"jsonrpc": "2.0", "method": "notifications/initialized"})
+        _send(proc, {"jsonrpc": "2.0", "id": 2, "method": "tools/list"})
+        response = _read_response(proc, 2)
+        elapsed = (time.perf_counter() - started) * 1000
+        return elapsed, len(response["result"]["tools"])
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def _summary(samples: list[float]) -> str:
+    return (f"median {statistics.median(samples):8.1f} ms   min {min(samples):8.1f} ms   "
+            f"max {max(samples):8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import and first tools/list latency of the stdio server")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh processes per measurement (default 5)")
+    parser.add_argument("--max-ms", type=float, default=None, help="Fail when median tools/list latency exceeds this")
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    listings = [measure_tools_list() for _ in range(args.runs)]
+    latencies = [elapsed for elapsed, _ in listings]
+
+    print(f"import        {_summary(imports)}")
+    print(f"tools/list    {_summary(latencies)}   ({listings[0][1]} tools)")
+
+    if args.max_ms is not None and statistics.median(latencies) > args.max_ms:
+        print(f"FAIL: median tools/list latency exceeds {args.max_ms:.0f} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
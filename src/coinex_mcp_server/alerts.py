@@ -0,0 +1,315 @@
+"""
+Alert engine
+Price, spread and funding-rate conditions registered by clients, indexed per market and metric
+in sorted threshold lists, so a new value only touches the conditions it actually crosses
+"""
+
+import re
+import time
+import asyncio
+import bisect
+import itertools
+import logging
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Set, Tuple
+
+from .analytics import SCAN_METRICS, ticker_columns
+from .coinex_client import CoinExClient
+from .limits import create_background_task
+from .metrics import metrics
+from .warmup import HOT_DEPTH_PARAMS
+
+# Ticker metrics (see analytics.ticker_columns) plus the order book spread: (best ask - best bid) / mid * 100.
+# Indicator metrics (RSI, moving averages) are not offered: they need the candles of every watched market on
+# every check instead of one shared ticker snapshot per market type.
+ALERT_METRICS = SCAN_METRICS + ("spread_pct",)
+MAX_ALERTS_PER_OWNER = 1000
+MAX_TRIGGERED_PER_OWNER = 1000
+# Triggered alerts not polled within this many seconds are dropped (their session is most likely gone)
+TRIGGERED_RETENTION_SECONDS = 3600
+
+_CONDITION_RE = re.compile(r"^\s*([a-z_]+)\s*(>=|<=|>|<)\s*([-+]?[0-9]*\.?[0-9]+(?:[eE][-+]?[0-9]+)?)\s*$")
+
+
+def parse_condition(expression: str) -> Tuple[str, str, float]:
+    """'last>=70000' -> ('last', '>=', 70000.0)"""
+    match = _CONDITION_RE.match(expression or "")
+    if not match or match.group(1) not in ALERT_METRICS:
+        raise ValueError(f"Invalid condition: {expression!r}; expected '<metric><op><number>' with op in >, >=, <, <= "
+                         f"and metric in {', '.join(ALERT_METRICS)}")
+    metric, op, number = match.groups()
+    return metric, op, float(number)
+
+
+@dataclass
+class Alert:
+    alert_id: int
+    owner: str
+    market_type: str
+    base: str
+    quote: str
+    metric: str
+    op: str
+    threshold: float
+    note: str | None
+    created_at: int
+
+    @property
+    def market(self) -> str:
+        return self.base + self.quote
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = asdict(self)
+        del result["owner"]
+        result["market"] = self.market
+        result["condition"] = f"{self.metric}{self.op}{self.threshold:.15g}"
+        return result
+
+
+class AlertEngine:
+    """One-shot alerts, triggered the first time their condition holds.
+
+    For every (market_type, market, metric) the thresholds of each operator are kept sorted, so evaluating a value
+    is a binary search plus a slice of exactly the triggered alerts: '>'/'>=' alerts are triggered from the low end
+    of their list, '<'/'<=' alerts from the high end. Triggered alerts are queued per owner until polled,
+    for at most TRIGGERED_RETENTION_SECONDS.
+    """
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+        self._alerts: Dict[int, Alert] = {}
+        self._owned: Dict[str, Set[int]] = {}
+        self._index: Dict[Tuple[str, str, str], Dict[str, List[Tuple[float, int]]]] = {}
+        self._triggered: Dict[str, Deque[Dict[str, Any]]] = {}
+        metrics.gauge("alerts", lambda: {"active": len(self._alerts), "owners": len(self._owned)})
+
+    def __len__(self):
+        return len(self._alerts)
+
+    def owns(self, owner: str) -> bool:
+        """Whether owner has active alerts."""
+        return owner in self._owned
+
+    def add(self, owner: str, market_type: str, base: str, quote: str, condition: str,
+            note: str | None = None) -> Alert:
+        metric, op, threshold = parse_condition(condition)
+        owned = self._owned.setdefault(owner, set())
+        if len(owned) >= MAX_ALERTS_PER_OWNER:
+            raise ValueError(f"At most {MAX_ALERTS_PER_OWNER} active alerts per session")
+        alert = Alert(next(self._ids), owner, market_type, base.upper(), quote.upper(), metric, op, threshold, note,
+                      int(time.time() * 1000))
+        self._alerts[alert.alert_id] = alert
+        owned.add(alert.alert_id)
+        key = (market_type, alert.market, metric)
+        bisect.insort(self._index.setdefault(key, {}).setdefault(op, []), (threshold, alert.alert_id))
+        return alert
+
+    def _disown(self, alert: Alert):
+        del self._alerts[alert.alert_id]
+        self._owned[alert.owner].discard(alert.alert_id)
+        if not self._owned[alert.owner]:
+            del self._owned[alert.owner]
+
+    def _remove(self, alert: Alert):
+        self._disown(alert)
+        key = (alert.market_type, alert.market, alert.metric)
+        thresholds = self._index[key][alert.op]
+        i = bisect.bisect_left(thresholds, (alert.threshold, alert.alert_id))
+        if i < len(thresholds) and thresholds[i][1] == alert.alert_id:
+            del thresholds[i]
+        self._prune(key)
+
+    def _prune(self, key: Tuple[str, str, str]):
+        by_op = self._index[key]
+        for op in [op for op, thresholds in by_op.items() if not thresholds]:
+            del by_op[op]
+        if not by_op:
+            del self._index[key]
+
+    def cancel(self, owner: str, alert_id: int) -> bool:
+        alert = self._alerts.get(alert_id)
+        if alert is None or alert.owner != owner:
+            return False
+        self._remove(alert)
+        return True
+
+    def alerts(self, owner: str) -> List[Alert]:
+        return [self._alerts[alert_id] for alert_id in sorted(self._owned.get(owner, ()))]
+
+    def watched(self) -> Dict[str, Dict[str, Dict[str, Tuple[str, str]]]]:
+        """market_type -> metric -> {market: (base, quote)} of everything with an active alert."""
+        result: Dict[str, Dict[str, Dict[str, Tuple[str, str]]]] = {}
+        for (market_type, market, metric), by_op in self._index.items():
+            alert = self._alerts[next(iter(by_op.values()))[0][1]]
+            result.setdefault(market_type, {}).setdefault(metric, {})[market] = (alert.base, alert.quote)
+        return result
+
+    def evaluate(self, market_type: str, market: str, metric: str, value: float) -> List[Tuple[str, Dict[str, Any]]]:
+        """Trigger and remove the alerts whose condition holds for value; returns (owner, trigger record) pairs."""
+        key = (market_type, market, metric)
+        by_op = self._index.get(key)
+        if by_op is None or value != value:  # NaN never triggers
+            return []
+
+        hits: List[Tuple[float, int]] = []
+        for op, thresholds in by_op.items():
+            if op == ">":  # thresholds < value
+                i = bisect.bisect_left(thresholds, (value,))
+                hits += thresholds[:i]
+                del thresholds[:i]
+            elif op == ">=":  # thresholds <= value
+                i = bisect.bisect_right(thresholds, (value, float("inf")))
+                hits += thresholds[:i]
+                del thresholds[:i]
+            elif op == "<":  # thresholds > value
+                i = bisect.bisect_right(thresholds, (value, float("inf")))
+                hits += thresholds[i:]
+                del thresholds[i:]
+            else:  # "<=": thresholds >= value
+                i = bisect.bisect_left(thresholds, (value,))
+                hits += thresholds[i:]
+                del thresholds[i:]
+        self._prune(key)
+
+        now = int(time.time() * 1000)
+        records = []
+        for _, alert_id in hits:
+            alert = self._alerts[alert_id]
+            self._disown(alert)
+            record = {**alert.to_dict(), "value": value, "triggered_at": now}
+            self._triggered.setdefault(alert.owner, deque(maxlen=MAX_TRIGGERED_PER_OWNER)).append(record)
+            records.append((alert.owner, record))
+        if records:
+            metrics.inc("alerts_triggered_total", len(records))
+        return records
+
+    def expire_triggered(self, now: int | None = None):
+        """Drop triggered alerts queued longer than TRIGGERED_RETENTION_SECONDS, and owners left without any."""
+        cutoff = (now or int(time.time() * 1000)) - TRIGGERED_RETENTION_SECONDS * 1000
+        for owner in list(self._triggered):
+            queue = self._triggered[owner]
+            # Queued in trigger order, so expired records are at the front
+            while queue and queue[0]["triggered_at"] < cutoff:
+                queue.popleft()
+            if not queue:
+                del self._triggered[owner]
+
+    def drain(self, owner: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """Triggered alerts of owner not polled yet, oldest first."""
+        queue = self._triggered.get(owner)
+        if not queue:
+            return []
+        records = [queue.popleft() for _ in range(min(limit, len(queue)))]
+        if not queue:
+            del self._triggered[owner]
+        return records
+
+
+def _spread_pct(depth: Dict[str, Any]) -> float:
+    try:
+        ask = float(depth["asks"][0][0])
+        bid = float(depth["bids"][0][0])
+    except (KeyError, IndexError, TypeError, ValueError):
+        return float("nan")
+    return (ask - bid) / ((ask + bid) / 2) * 100
+
+
+class AlertMonitor:
+    """Feeds the engine with market data every interval seconds while alerts are active.
+
+    All ticker-based alerts of a market type are evaluated from one all-markets ticker snapshot (and one
+    funding-rate snapshot for funding_rate alerts), spread alerts from the market's order book; reads go through
+    the client's snapshot/cache layers. Owners with a registered notifier get each trigger pushed as well, until
+    they have no active alert left.
+    """
+
+    def __init__(self, engine: AlertEngine, client: CoinExClient, interval: float = 1.0):
+        self.engine = engine
+        self.client = client
+        self.interval = interval
+        self._notifiers: Dict[str, Callable[[Dict[str, Any]], Awaitable[Any]]] = {}
+        self._task: asyncio.Task | None = None
+
+    def watch(self, owner: str, notify: Callable[[Dict[str, Any]], Awaitable[Any]] | None = None):
+        """Make sure the monitor runs; notify (if given) receives owner's trigger records."""
+        if notify is not None:
+            self._notifiers[owner] = notify
+        if self._task is None or self._task.done():
+            # Started by a create_alert call, but must not inherit its deadline
+            self._task = create_background_task(self._run())
+
+    async def _run(self):
+        while len(self.engine):
+            try:
+                await self.check()
+            except Exception as e:
+                logging.warning("alert check failed: %s", e)
+            await asyncio.sleep(self.interval)
+        # The last alerts were cancelled rather than triggered
+        self._prune_notifiers()
+
+    def _prune_notifiers(self):
+        for owner in [owner for owner in self._notifiers if not self.engine.owns(owner)]:
+            del self._notifiers[owner]
+
+    async def _ticker_values(self, market_type: str, by_metric: Dict[str, Dict[str, Tuple[str, str]]]):
+        mt = CoinExClient.MarketType(market_type)
+        requests = [self.client.get_tickers(None, None, mt)]
+        if "funding_rate" in by_metric and mt == CoinExClient.MarketType.FUTURES:
+            requests.append(self.client.futures_get_funding_rate(None, None))
+        results = await asyncio.gather(*requests)
+        for result in results:
+            if result.get('code') != 0:
+                raise RuntimeError(f"code:{result.get('code')}, message:{result.get('message')}")
+        columns = ticker_columns(results[0].get('data'), results[1].get('data') if len(results) > 1 else None)
+        rows = {market: i for i, market in enumerate(columns["market"])}
+        values = []
+        for metric, markets in by_metric.items():
+            if metric == "spread_pct":
+                continue
+            for market in markets:
+                if market in rows:
+                    values.append((market_type, market, metric, columns[metric][rows[market]]))
+        return values
+
+    async def _spread_value(self, market_type: str, market: str, base: str, quote: str):
+        result = await self.client.get_depth(base, quote, CoinExClient.MarketType(market_type),
+                                             HOT_DEPTH_PARAMS["limit"], HOT_DEPTH_PARAMS["interval"])
+        if result.get('code') != 0:
+            raise RuntimeError(f"code:{result.get('code')}, message:{result.get('message')}")
+        return [(market_type, market, "spread_pct", _spread_pct((result.get('data') or {}).get('depth') or {}))]
+
+    async def check(self):
+        """Fetch what the active alerts need, evaluate it and deliver the triggers."""
+        jobs = []
+        for market_type, by_metric in self.engine.watched().items():
+            if set(by_metric) - {"spread_pct"}:
+                jobs.append(self._ticker_values(market_type, by_metric))
+            for market, (base, quote) in by_metric.get("spread_pct", {}).items():
+                jobs.append(self._spread_value(market_type, market, base, quote))
+
+        records = []
+        for result in await asyncio.gather(*jobs, return_exceptions=True):
+            if isinstance(result, Exception):
+                logging.warning("alert data fetch failed: %s", result)
+                continue
+            for market_type, market, metric, value in result:
+                records += self.engine.evaluate(market_type, market, metric, value)
+
+        for owner, record in records:
+            notify = self._notifiers.get(owner)
+            if notify is None:
+                continue
+            try:
+                await notify(record)
+            except Exception as e:
+                # The session is gone; its triggers stay queued for poll_alerts
+                logging.info("alert notification failed, dropping notifier: %s", e)
+                self._notifiers.pop(owner, None)
+        self._prune_notifiers()
+        self.engine.expire_triggered()
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
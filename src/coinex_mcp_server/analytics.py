@@ -0,0 +1,334 @@
+"""
+Analytics helpers
+Pure computations over CoinEx API payloads (no I/O), used by the aggregate MCP tools
+"""
+
+import re
+import heapq
+import math
+import operator
+from array import array
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, List, Optional
+
+_ZERO = Decimal(0)
+_VALUE_EXP = Decimal("0.00000001")
+BRIDGE_CURRENCY = "USDT"
+
+
+def _dec(value: Any) -> Decimal:
+    """Convert an API numeric string to Decimal, treating empty/invalid values as zero."""
+    if value is None or value == "":
+        return _ZERO
+    try:
+        return Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        return _ZERO
+
+
+def _fmt(value: Decimal) -> str:
+    return format(value.quantize(_VALUE_EXP), "f")
+
+
+def build_price_table(tickers: List[Dict[str, Any]]) -> Dict[str, Decimal]:
+    """Map market name (e.g. BTCUSDT) -> last price from a bulk ticker snapshot."""
+    table: Dict[str, Decimal] = {}
+    for ticker in tickers or []:
+        last = _dec(ticker.get("last"))
+        if last > 0:
+            table[ticker.get("market")] = last
+    return table
+
+
+def price_in(ccy: str, quote: str, prices: Dict[str, Decimal]) -> Optional[Decimal]:
+    """Price of one unit of ccy in quote: direct market, inverse market, or bridged through USDT."""
+    if ccy == quote:
+        return Decimal(1)
+    if ccy + quote in prices:
+        return prices[ccy + quote]
+    if quote + ccy in prices:
+        return 1 / prices[quote + ccy]
+    if BRIDGE_CURRENCY not in (ccy, quote):
+        ccy_bridge = price_in(ccy, BRIDGE_CURRENCY, prices)
+        quote_bridge = price_in(quote, BRIDGE_CURRENCY, prices)
+        if ccy_bridge is not None and quote_bridge:
+            return ccy_bridge / quote_bridge
+    return None
+
+
+def balance_holdings(account: str, balances: List[Dict[str, Any]]) -> Dict[str, Decimal]:
+    """Net holdings per currency for one account type's balance payload.
+    - spot: available + frozen
+    - margin: available + frozen - repaid - interest, per isolated margin account
+    - futures: available + frozen + margin + unrealized_pnl
+    """
+    holdings: Dict[str, Decimal] = {}
+
+    def add(ccy: str, amount: Decimal):
+        if ccy and amount:
+            holdings[ccy] = holdings.get(ccy, _ZERO) + amount
+
+    for item in balances or []:
+        if account == "margin":
+            for ccy in (item.get("base_ccy"), item.get("quote_ccy")):
+                amount = (_dec((item.get("available") or {}).get(ccy))
+                          + _dec((item.get("frozen") or {}).get(ccy))
+                          - _dec((item.get("repaid") or {}).get(ccy))
+                          - _dec((item.get("interest") or {}).get(ccy)))
+                add(ccy, amount)
+        elif account == "futures":
+            add(item.get("ccy"), _dec(item.get("available")) + _dec(item.get("frozen"))
+                + _dec(item.get("margin")) + _dec(item.get("unrealized_pnl")))
+        else:
+            add(item.get("ccy"), _dec(item.get("available")) + _dec(item.get("frozen")))
+    return holdings
+
+
+def value_portfolio(holdings_by_account: Dict[str, Dict[str, Decimal]], tickers: List[Dict[str, Any]],
+                    quote: str = BRIDGE_CURRENCY, min_value: Decimal = _ZERO) -> Dict[str, Any]:
+    """Value account holdings in quote currency against one ticker snapshot.
+
+    Each distinct currency is priced once; per-account and per-asset values are then
+    accumulated in a single pass over the holdings.
+    Returns a compact summary: total, per-account totals, per-asset rows (value desc) and unpriced currencies.
+    """
+    prices = build_price_table(tickers)
+    currencies = {ccy for holdings in holdings_by_account.values() for ccy in holdings}
+    unit_prices = {ccy: price_in(ccy, quote, prices) for ccy in currencies}
+
+    accounts: Dict[str, Decimal] = {}
+    amounts: Dict[str, Decimal] = {}
+    values: Dict[str, Decimal] = {}
+    for account, holdings in holdings_by_account.items():
+        account_total = _ZERO
+        for ccy, amount in holdings.items():
+            amounts[ccy] = amounts.get(ccy, _ZERO) + amount
+            unit_price = unit_prices[ccy]
+            if unit_price is None:
+                continue
+            value = amount * unit_price
+            values[ccy] = values.get(ccy, _ZERO) + value
+            account_total += value
+        accounts[account] = account_total
+
+    assets = [
+        {"ccy": ccy, "amount": format(amounts[ccy], "f"), "price": _fmt(unit_prices[ccy]), "value": _fmt(value)}
+        for ccy, value in sorted(values.items(), key=lambda kv: kv[1], reverse=True)
+        if abs(value) >= min_value
+    ]
+    return {
+        "quote": quote,
+        "total_value": _fmt(sum(accounts.values(), _ZERO)),
+        "accounts": {account: _fmt(total) for account, total in accounts.items()},
+        "assets": assets,
+        "unpriced": sorted(ccy for ccy, p in unit_prices.items() if p is None and amounts.get(ccy)),
+    }
+
+
+# =====================
+# Market scanner
+# =====================
+SCAN_METRICS = ("last", "volume", "value", "change_pct", "range_pct", "premium_pct", "funding_rate")
+
+_FILTER_RE = re.compile(r"^\s*([a-z_]+)\s*(>=|<=|==|!=|>|<)\s*([-+]?[0-9]*\.?[0-9]+(?:[eE][-+]?[0-9]+)?)\s*$")
+_FILTER_OPS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le,
+               "==": operator.eq, "!=": operator.ne}
+
+
+def _f(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def ticker_columns(tickers: List[Dict[str, Any]], funding_rates: Optional[List[Dict[str, Any]]] = None,
+                   quote: Optional[str] = None) -> Dict[str, Any]:
+    """Load a ticker list into columnar form: {"market": [str], <metric>: array('d')}.
+
+    Derived metrics are computed column-wise once:
+    - change_pct: (last - open) / open * 100
+    - range_pct: (high - low) / low * 100 (REST tickers carry no best bid/ask, this is the 24h spread proxy)
+    - premium_pct: (mark_price - index_price) / index_price * 100 (futures only, NaN otherwise)
+    - funding_rate: latest funding rate joined by market (futures only, NaN otherwise)
+    Missing values are NaN and never pass a filter.
+    """
+    tickers = tickers or []
+    if quote:
+        tickers = [t for t in tickers if str(t.get("market", "")).endswith(quote)]
+    markets = [t.get("market") for t in tickers]
+    raw = {field: array("d", (_f(t.get(field)) for t in tickers))
+           for field in ("last", "open", "high", "low", "volume", "value", "mark_price", "index_price")}
+
+    def ratio(num, den):
+        return array("d", ((n / d - 1) * 100 if d else float("nan") for n, d in zip(num, den)))
+
+    funding_by_market = {r.get("market"): _f(r.get("latest_funding_rate")) for r in funding_rates or []}
+    return {
+        "market": markets,
+        "last": raw["last"],
+        "volume": raw["volume"],
+        "value": raw["value"],
+        "change_pct": ratio(raw["last"], raw["open"]),
+        "range_pct": ratio(raw["high"], raw["low"]),
+        "premium_pct": ratio(raw["mark_price"], raw["index_price"]),
+        "funding_rate": array("d", (funding_by_market.get(m, float("nan")) for m in markets)),
+    }
+
+
+def parse_filter(expression: str) -> tuple[str, Any, float]:
+    """Parse 'metric op number', e.g. 'value>=1000000' or 'change_pct<-5'."""
+    match = _FILTER_RE.match(expression or "")
+    if not match or match.group(1) not in SCAN_METRICS:
+        raise ValueError(f"Invalid filter expression: {expression!r}; expected '<metric><op><number>' "
+                         f"with metric in {', '.join(SCAN_METRICS)}")
+    metric, op, number = match.groups()
+    return metric, _FILTER_OPS[op], float(number)
+
+
+def scan(columns: Dict[str, Any], filters: Iterable[str] = (), sort_by: str = "value",
+         descending: bool = True, top_k: int = 10) -> List[Dict[str, Any]]:
+    """Filter rows column by column, then select the top_k rows by sort_by with a heap (no full sort)."""
+    if sort_by not in SCAN_METRICS:
+        raise ValueError(f"Invalid sort metric: {sort_by!r}; expected one of {', '.join(SCAN_METRICS)}")
+
+    selected = range(len(columns["market"]))
+    for metric, op, threshold in (parse_filter(f) for f in filters):
+        col = columns[metric]
+        selected = [i for i in selected if op(col[i], threshold)]
+
+    sort_col = columns[sort_by]
+    candidates = (i for i in selected if sort_col[i] == sort_col[i])  # drop NaN
+    pick = heapq.nlargest if descending else heapq.nsmallest
+    top = pick(top_k, candidates, key=sort_col.__getitem__)
+    return _rows(columns, top, SCAN_METRICS)
+
+
+def _rows(columns: Dict[str, Any], indices: Iterable[int], metrics: Iterable[str]) -> List[Dict[str, Any]]:
+    """Materialize selected row indices as compact dicts, omitting NaN metrics."""
+    rows = []
+    for i in indices:
+        row = {"market": columns["market"][i]}
+        for metric in metrics:
+            value = columns[metric][i]
+            if value == value:
+                row[metric] = round(value, 8)
+        rows.append(row)
+    return rows
+
+
+# =====================
+# Funding / basis screener
+# =====================
+YEAR_MS = 365 * 24 * 3600 * 1000
+DEFAULT_FUNDING_INTERVAL_MS = 8 * 3600 * 1000
+SCREEN_METRICS = ("annualized_funding_pct", "funding_rate", "basis_pct", "spot_perp_spread_pct")
+
+
+def funding_basis_columns(futures_tickers: List[Dict[str, Any]], funding_rates: List[Dict[str, Any]],
+                          spot_tickers: List[Dict[str, Any]], quote: Optional[str] = None) -> Dict[str, Any]:
+    """Join futures tickers, funding rates and spot tickers by market into columns.
+
+    - funding_rate: latest funding rate
+    - annualized_funding_pct: funding_rate * (periods per year) * 100, the period being next - latest funding time
+    - basis_pct: (mark_price - index_price) / index_price * 100
+    - spot_perp_spread_pct: (futures last - spot last) / spot last * 100
+    """
+    columns = ticker_columns(futures_tickers, funding_rates, quote)
+    markets = columns["market"]
+    spot_last = {t.get("market"): _f(t.get("last")) for t in spot_tickers or []}
+
+    intervals = {}
+    for r in funding_rates or []:
+        interval = _f(r.get("next_funding_time")) - _f(r.get("latest_funding_time"))
+        intervals[r.get("market")] = interval if interval > 0 else DEFAULT_FUNDING_INTERVAL_MS
+
+    funding = columns["funding_rate"]
+    return {
+        "market": markets,
+        "funding_rate": funding,
+        "annualized_funding_pct": array("d", (
+            rate * YEAR_MS / intervals.get(m, DEFAULT_FUNDING_INTERVAL_MS) * 100 for m, rate in zip(markets, funding)
+        )),
+        "basis_pct": columns["premium_pct"],
+        "spot_perp_spread_pct": array("d", (
+            (last / spot_last[m] - 1) * 100 if spot_last.get(m) else float("nan")
+            for m, last in zip(markets, columns["last"])
+        )),
+    }
+
+
+def screen(columns: Dict[str, Any], sort_by: str = "annualized_funding_pct", top_k: int = 20,
+           min_abs: float = 0.0) -> List[Dict[str, Any]]:
+    """Top_k markets by absolute value of sort_by (both positive and negative carry are opportunities)."""
+    if sort_by not in SCREEN_METRICS:
+        raise ValueError(f"Invalid sort metric: {sort_by!r}; expected one of {', '.join(SCREEN_METRICS)}")
+    col = columns[sort_by]
+    candidates = (i for i in range(len(col)) if col[i] == col[i] and abs(col[i]) >= min_abs)
+    top = heapq.nlargest(top_k, candidates, key=lambda i: abs(col[i]))
+    return _rows(columns, top, SCREEN_METRICS)
+
+
+# =====================
+# Correlation / volatility
+# =====================
+def align_closes(columns_by_market: Dict[str, Dict[str, array]]) -> tuple[array, Dict[str, array]]:
+    """Restrict every market's close column to the candle timestamps all markets have in common."""
+    common = None
+    for columns in columns_by_market.values():
+        times = set(columns["created_at"])
+        common = times if common is None else common & times
+    timestamps = array("d", sorted(common or ()))
+    aligned = {}
+    for market, columns in columns_by_market.items():
+        index = {t: i for i, t in enumerate(columns["created_at"])}
+        close = columns["close"]
+        aligned[market] = array("d", (close[index[t]] for t in timestamps))
+    return timestamps, aligned
+
+
+def log_returns(closes: array) -> array:
+    return array("d", (math.log(b / a) if a > 0 and b > 0 else 0.0 for a, b in zip(closes, closes[1:])))
+
+
+def _dot(a: array, b: array) -> float:
+    return sum(map(operator.mul, a, b))
+
+
+def rolling_volatility(returns: array, window: int) -> array:
+    """Sample standard deviation of each trailing window of returns, from running sums (NaN before the first)."""
+    out = array("d", [math.nan]) * len(returns)
+    total = squares = 0.0
+    for i, r in enumerate(returns):
+        total += r
+        squares += r * r
+        if i >= window:
+            old = returns[i - window]
+            total -= old
+            squares -= old * old
+        if i >= window - 1 and window > 1:
+            out[i] = math.sqrt(max(squares - total * total / window, 0.0) / (window - 1))
+    return out
+
+
+def covariance_matrix(returns_by_market: Dict[str, array]) -> tuple[List[str], List[List[float]], List[List[float]]]:
+    """(markets, covariance, correlation) of equally long return columns.
+
+    Each column is centered once, so every matrix cell is a single dot product of two columns.
+    """
+    markets = list(returns_by_market)
+    centered = []
+    for market in markets:
+        returns = returns_by_market[market]
+        mean = math.fsum(returns) / len(returns) if returns else 0.0
+        centered.append(array("d", (r - mean for r in returns)))
+    size = len(markets)
+    dof = max(len(centered[0]) - 1, 1) if centered else 1
+    covariance = [[0.0] * size for _ in range(size)]
+    for i in range(size):
+        for j in range(i, size):
+            covariance[i][j] = covariance[j][i] = _dot(centered[i], centered[j]) / dof
+    std = [math.sqrt(covariance[i][i]) for i in range(size)]
+    correlation = [[covariance[i][j] / (std[i] * std[j]) if std[i] and std[j] else math.nan for j in range(size)]
+                   for i in range(size)]
+    return markets, covariance, correlation
@@ -0,0 +1,269 @@
+"""
+Backtesting
+Runs a small rule-based strategy over K-line columns and summarises the result (return, drawdown, Sharpe, trades);
+indicators are computed column-wise once per market, markets are simulated in parallel in a process pool
+"""
+
+import re
+import math
+import asyncio
+import multiprocessing
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+CANDLE_FIELDS = ("created_at", "open", "high", "low", "close", "volume")
+PRICE_COLUMNS = ("open", "high", "low", "close", "volume")
+INDICATORS = ("sma", "ema", "rsi")
+PERIOD_SECONDS = {"1min": 60, "5min": 300, "15min": 900, "30min": 1800, "1hour": 3600, "4hour": 14400,
+                  "1day": 86400, "1week": 604800}
+NAN = float("nan")
+
+_OPERAND = r"(?:[a-z]+(?:\(\s*\d+\s*\))?|[-+]?[0-9]*\.?[0-9]+)"
+_RULE_RE = re.compile(rf"^\s*({_OPERAND})\s*(crosses_above|crosses_below|>=|<=|>|<)\s*({_OPERAND})\s*$")
+_INDICATOR_RE = re.compile(r"^([a-z]+)(?:\(\s*(\d+)\s*\))?$")
+
+
+def candle_columns(klines: List[Dict[str, Any]]) -> Dict[str, array]:
+    """Load a K-line list (oldest first) into columns: {field: array('d')}."""
+    klines = sorted(klines or [], key=lambda k: int(k.get("created_at", 0)))
+    return {field: array("d", (NAN if k.get(field) in (None, "") else float(k[field]) for k in klines))
+            for field in CANDLE_FIELDS}
+
+
+# =====================
+# Indicators
+# =====================
+
+def sma(values: array, n: int) -> array:
+    """Simple moving average with a running sum; NaN until n values are available and while a NaN is in the window.
+
+    NaN values are counted rather than summed, so one missing close does not poison every later average.
+    """
+    out = array("d", [NAN]) * len(values)
+    total = 0.0
+    nans = 0
+    for i, v in enumerate(values):
+        if v != v:
+            nans += 1
+        else:
+            total += v
+        if i >= n:
+            old = values[i - n]
+            if old != old:
+                nans -= 1
+            else:
+                total -= old
+        if i >= n - 1 and not nans:
+            out[i] = total / n
+    return out
+
+
+def ema(values: array, n: int) -> array:
+    """Exponential moving average seeded with the SMA of the first n values."""
+    out = array("d", [NAN]) * len(values)
+    if len(values) < n:
+        return out
+    alpha = 2 / (n + 1)
+    prev = sum(values[:n]) / n
+    out[n - 1] = prev
+    for i in range(n, len(values)):
+        prev += alpha * (values[i] - prev)
+        out[i] = prev
+    return out
+
+
+def rsi(values: array, n: int) -> array:
+    """Wilder's relative strength index."""
+    out = array("d", [NAN]) * len(values)
+    if len(values) <= n:
+        return out
+    gains = losses = 0.0
+    for i in range(1, n + 1):
+        change = values[i] - values[i - 1]
+        gains += max(change, 0.0)
+        losses += max(-change, 0.0)
+    avg_gain, avg_loss = gains / n, losses / n
+    for i in range(n, len(values)):
+        if i > n:
+            change = values[i] - values[i - 1]
+            avg_gain = (avg_gain * (n - 1) + max(change, 0.0)) / n
+            avg_loss = (avg_loss * (n - 1) + max(-change, 0.0)) / n
+        out[i] = 100.0 if avg_loss == 0 else 100 - 100 / (1 + avg_gain / avg_loss)
+    return out
+
+
+def _operand(columns: Dict[str, array], token: str, cache: Dict[str, array]) -> array:
+    token = token.replace(" ", "")
+    if token in cache:
+        return cache[token]
+    match = _INDICATOR_RE.match(token)
+    if match is None:
+        values = array("d", [float(token)]) * len(columns["close"])
+    else:
+        name, n = match.group(1), match.group(2)
+        if name in PRICE_COLUMNS and n is None:
+            values = columns[name]
+        elif name in INDICATORS and n is not None and int(n) > 0:
+            values = {"sma": sma, "ema": ema, "rsi": rsi}[name](columns["close"], int(n))
+        else:
+            raise ValueError(f"Unknown operand {token!r}; expected a number, one of {', '.join(PRICE_COLUMNS)} "
+                             f"or {', '.join(f'{i}(n)' for i in INDICATORS)}")
+    cache[token] = values
+    return values
+
+
+def parse_rule(rule: str) -> Tuple[str, str, str]:
+    """'sma(10) crosses_above sma(30)' -> ('sma(10)', 'crosses_above', 'sma(30)')"""
+    match = _RULE_RE.match(rule or "")
+    if match is None:
+        raise ValueError(f"Invalid rule {rule!r}; expected '<operand> <op> <operand>' with op in "
+                         f">, >=, <, <=, crosses_above, crosses_below")
+    return match.groups()
+
+
+def signal(columns: Dict[str, array], rule: str, cache: Dict[str, array] | None = None) -> List[bool]:
+    """Evaluate a rule on every bar; bars where an operand is NaN are False."""
+    cache = {} if cache is None else cache
+    left_token, op, right_token = parse_rule(rule)
+    left, right = _operand(columns, left_token, cache), _operand(columns, right_token, cache)
+    size = len(left)
+    if op in ("crosses_above", "crosses_below"):
+        sign = 1 if op == "crosses_above" else -1
+        return [i > 0 and sign * (left[i - 1] - right[i - 1]) <= 0 < sign * (left[i] - right[i]) for i in range(size)]
+    compare = {">": float.__gt__, ">=": float.__ge__, "<": float.__lt__, "<=": float.__le__}[op]
+    return [compare(left[i], right[i]) for i in range(size)]
+
+
+# =====================
+# Simulation
+# =====================
+
+@dataclass(frozen=True)
+class BacktestSpec:
+    """Strategy: enter when entry holds, leave when exit holds or a stop/target is hit; fills at the bar's close.
+
+    position_pct of current equity is committed per trade; fee_rate is charged on entry and exit notional.
+    """
+    entry: str
+    exit: str
+    side: str = "long"
+    position_pct: float = 100.0
+    fee_rate: float = 0.002
+    stop_loss_pct: Optional[float] = None
+    take_profit_pct: Optional[float] = None
+    bars_per_year: float = 24 * 365
+
+    def validate(self):
+        parse_rule(self.entry)
+        parse_rule(self.exit)
+        if self.side not in ("long", "short"):
+            raise ValueError("side must be long or short")
+        if not 0 < self.position_pct <= 100:
+            raise ValueError("position_pct must be in (0, 100]")
+
+
+def run_backtest(spec: BacktestSpec, columns: Dict[str, array]) -> Dict[str, Any]:
+    """Simulate spec over one market's candle columns and return summary statistics (process pool entry point)."""
+    close, high, low = columns["close"], columns["high"], columns["low"]
+    size = len(close)
+    if size < 2:
+        return {"bars": size, "error": "not enough candles"}
+    cache: Dict[str, array] = {}
+    entries, exits = signal(columns, spec.entry, cache), signal(columns, spec.exit, cache)
+    direction = 1 if spec.side == "long" else -1
+    fraction = spec.position_pct / 100
+
+    equity = 1.0
+    curve = array("d", [1.0]) * size
+    position = 0.0  # units held, in multiples of the starting equity
+    entry_price = equity_before = 0.0
+    trades: List[float] = []
+    bars_in_market = 0
+
+    def close_position(price: float):
+        nonlocal position, equity
+        equity += direction * position * (price - entry_price) - position * price * spec.fee_rate
+        trades.append(equity / equity_before - 1)
+        position = 0.0
+
+    for i in range(size):
+        price = close[i]
+        if position:
+            bars_in_market += 1
+            stop = target = None
+            if spec.stop_loss_pct is not None:
+                stop = entry_price * (1 - direction * spec.stop_loss_pct / 100)
+            if spec.take_profit_pct is not None:
+                target = entry_price * (1 + direction * spec.take_profit_pct / 100)
+            worst, best = (low[i], high[i]) if direction == 1 else (high[i], low[i])
+            if stop is not None and direction * (worst - stop) <= 0:
+                close_position(stop)
+            elif target is not None and direction * (best - target) >= 0:
+                close_position(target)
+            elif exits[i]:
+                close_position(price)
+        elif entries[i] and price > 0:
+            notional = equity * fraction
+            equity_before, entry_price = equity, price
+            position = notional / price
+            equity -= notional * spec.fee_rate
+        curve[i] = equity + (direction * position * (price - entry_price) if position else 0.0)
+    if position:
+        close_position(close[-1])
+        curve[-1] = equity
+
+    peak, max_drawdown = curve[0], 0.0
+    for value in curve:
+        peak = max(peak, value)
+        max_drawdown = max(max_drawdown, 1 - value / peak)
+    returns = [curve[i] / curve[i - 1] - 1 for i in range(1, size)]
+    mean = sum(returns) / len(returns)
+    std = math.sqrt(sum((r - mean) ** 2 for r in returns) / len(returns))
+    wins = sum(1 for t in trades if t > 0)
+    return {
+        "bars": size,
+        "start_time": int(columns["created_at"][0]),
+        "end_time": int(columns["created_at"][-1]),
+        "total_return_pct": round((curve[-1] - 1) * 100, 4),
+        "buy_and_hold_pct": round((close[-1] / close[0] - 1) * 100, 4) if close[0] else None,
+        "max_drawdown_pct": round(max_drawdown * 100, 4),
+        "sharpe": round(mean / std * math.sqrt(spec.bars_per_year), 4) if std else None,
+        "trades": len(trades),
+        "win_rate_pct": round(wins / len(trades) * 100, 2) if trades else None,
+        "avg_trade_pct": round(sum(trades) / len(trades) * 100, 4) if trades else None,
+        "exposure_pct": round(bars_in_market / size * 100, 2),
+    }
+
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: the server process runs an event loop and threads, which do not survive fork
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+async def run_many(spec: BacktestSpec, columns_by_market: Dict[str, Dict[str, array]],
+                   workers: int = 0) -> Dict[str, Dict[str, Any]]:
+    """Backtest every market; with workers > 0 and several markets, in a shared process pool, else in a thread."""
+    if workers <= 0 or len(columns_by_market) < 2:
+        # Never on the event loop: a long simulation would stall every other request
+        return await asyncio.to_thread(
+            lambda: {market: run_backtest(spec, columns) for market, columns in columns_by_market.items()})
+    loop = asyncio.get_running_loop()
+    pool = _get_pool(workers)
+    results = await asyncio.gather(*(loop.run_in_executor(pool, run_backtest, spec, columns)
+                                     for columns in columns_by_market.values()))
+    return dict(zip(columns_by_market, results))
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
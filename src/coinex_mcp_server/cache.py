@@ -0,0 +1,454 @@
+"""
+Response caching
+In-process TTL cache with single-flight loading, shared by tools that aggregate slow-changing data,
+a file-backed variant shared by all server processes on one host,
+and a persistent variant that keeps slow-changing responses across restarts
+"""
+
+import os
+import ast
+import json
+import mmap
+import time
+import asyncio
+import hashlib
+import logging
+import tempfile
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from .limits import create_background_task
+
+
+class TTLCache:
+    """Async TTL cache.
+
+    - Entries expire ttl seconds after they were stored (ttl is given per lookup, so one cache can serve different data).
+    - Concurrent misses for the same key share a single loader call (single-flight).
+    - At most maxsize entries are kept, least recently used are evicted first.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        # Background refreshes started by get_stale_while_revalidate (referenced so they aren't collected)
+        self._refreshing: set = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, ttl: float) -> Tuple[bool, Any]:
+        """Return (hit, value) without loading."""
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[0] > ttl:
+            return False, None
+        self._entries.move_to_end(key)
+        return True, entry[1]
+
+    def peek(self, key: Hashable) -> Tuple[float, Any] | None:
+        """Return (age in seconds, value) of an entry regardless of its age, or None."""
+        entry = self._entries.get(key)
+        return None if entry is None else (time.monotonic() - entry[0], entry[1])
+
+    def set(self, key: Hashable, value: Any):
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable = None):
+        """Drop one key, or everything when key is None."""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: float,
+                          cache_if: Callable[[Any], bool] = None) -> Any:
+        """Return cached value for key, or await loader() once for all concurrent callers.
+        :param cache_if: optional predicate; results for which it returns False are returned but not stored
+        """
+        hit, value = self.get(key, ttl)
+        if hit:
+            return value
+
+        while (inflight := self._inflight.get(key)) is not None:
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # The caller that owned the load was cancelled; take over
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an unobserved failure doesn't log "exception was never retrieved"
+            future.exception()
+            raise
+        else:
+            if cache_if is None or cache_if(value):
+                self.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    async def get_stale_while_revalidate(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: float,
+                                         stale_ttl: float, error_ttl: float,
+                                         cache_if: Callable[[Any], bool] = None) -> Tuple[Any, float]:
+        """Return (value, age in seconds), preferring an immediate answer over a fresh one.
+
+        - age <= ttl: the cached value.
+        - age <= stale_ttl: the cached value right away, while a single background load refreshes it.
+        - otherwise the value is loaded; if the load fails or cache_if rejects the result,
+          a cached value up to error_ttl old is returned instead (stale-if-error).
+        """
+        peeked = self.peek(key)
+        if peeked is not None:
+            age, value = peeked
+            if age <= ttl:
+                return value, age
+            if age <= stale_ttl:
+                self._refresh_in_background(key, loader, ttl, cache_if)
+                return value, age
+
+        try:
+            value = await self.get_or_load(key, loader, ttl, cache_if)
+        except Exception:
+            if peeked is not None and peeked[0] <= error_ttl:
+                return peeked[1], peeked[0]
+            raise
+        if cache_if is not None and not cache_if(value) and peeked is not None and peeked[0] <= error_ttl:
+            return peeked[1], peeked[0]
+        return value, 0.0
+
+    def _refresh_in_background(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: float,
+                               cache_if: Callable[[Any], bool] = None):
+        if key in self._inflight:
+            return
+
+        async def refresh():
+            try:
+                await self.get_or_load(key, loader, ttl, cache_if)
+            except Exception as e:
+                # The stale entry keeps being served until it ages out
+                logging.warning("background refresh of %r failed: %s", key, e)
+
+        # Refreshes outlive the request that found the entry stale, so they don't inherit its deadline
+        task = create_background_task(refresh())
+        self._refreshing.add(task)
+        task.add_done_callback(self._refreshing.discard)
+
+
+def default_shared_cache_dir() -> str:
+    """tmpfs when available, so the shared cache never touches disk."""
+    root = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(root, "coinex-mcp-server-cache")
+
+
+class SharedCache(TTLCache):
+    """TTL cache shared by server processes on the same host (e.g. workers started with --reuse-port).
+
+    - Each key is one file in directory holding its store time and JSON value, replaced atomically on write.
+    - On a miss, the process holding the key's flock is the designated fetcher; other processes poll
+      for its result instead of calling upstream themselves (a crashed fetcher releases the lock).
+    - Within a process, concurrent misses still share one load, and decoded values are reused
+      until the file changes.
+    - The directory is swept at startup and then at most every SWEEP_INTERVAL_SECONDS on writes: entries older
+      than max_age are removed, then the least recently written ones beyond maxsize.
+    Values must be JSON serializable. POSIX only.
+    """
+
+    LOCK_POLL_SECONDS = 0.02
+    SWEEP_INTERVAL_SECONDS = 60
+    # Longer than the stale window of any cached endpoint (CoinExClient.STALE_WINDOWS)
+    MAX_ENTRY_AGE_SECONDS = 25 * 3600
+
+    def __init__(self, directory: str | None = None, maxsize: int = 1024, lock_timeout: float = 10.0,
+                 max_age: float = MAX_ENTRY_AGE_SECONDS):
+        super().__init__(maxsize)
+        self.directory = directory or default_shared_cache_dir()
+        self.lock_timeout = lock_timeout
+        self.max_age = max_age
+        os.makedirs(self.directory, exist_ok=True)
+        # key -> (stored_at, value, file mtime_ns)
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, int]]" = OrderedDict()
+        self._swept_at = 0.0
+        self.sweep()
+
+    @staticmethod
+    def _unlink(path: str):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            # Another process swept it first
+            pass
+
+    def sweep(self):
+        """Remove expired and excess entry files, and lock/temporary files left behind by them."""
+        self._swept_at = time.monotonic()
+        now = time.time()
+        entries, others = [], []
+        for entry in os.scandir(self.directory):
+            try:
+                mtime = entry.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            if entry.name.endswith(".json"):
+                if now - mtime > self.max_age:
+                    self._unlink(entry.path)
+                else:
+                    entries.append((mtime, entry.path))
+            else:
+                others.append((mtime, entry.path))
+        entries.sort()
+        for _, path in entries[:max(0, len(entries) - self.maxsize)]:
+            self._unlink(path)
+        # Locks of removed entries, and temporary files of writers that died (both idle longer than a fetch takes)
+        idle = max(self.lock_timeout, self.SWEEP_INTERVAL_SECONDS)
+        for mtime, path in others:
+            stem = path.rsplit(".", 1)[0]
+            if now - mtime > idle and (path.endswith(".tmp") or not os.path.exists(stem + ".json")):
+                self._unlink(path)
+
+    def _path(self, key: Hashable) -> str:
+        return os.path.join(self.directory, hashlib.sha1(repr(key).encode()).hexdigest() + ".json")
+
+    def _remember(self, key: Hashable, entry: Tuple[float, Any, int]):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _read(self, key: Hashable) -> Tuple[float, Any] | None:
+        path = self._path(key)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            self._entries.pop(key, None)
+            return None
+        entry = self._entries.get(key)
+        if entry is None or entry[2] != mtime:
+            try:
+                with open(path, "rb") as f:
+                    header, _, body = f.read().partition(b"\n")
+                entry = (float(header), json.loads(body), mtime)
+            except (OSError, ValueError):
+                return None
+            self._remember(key, entry)
+        return entry[0], entry[1]
+
+    def get(self, key: Hashable, ttl: float) -> Tuple[bool, Any]:
+        entry = self._read(key)
+        if entry is None or time.time() - entry[0] > ttl:
+            return False, None
+        return True, entry[1]
+
+    def peek(self, key: Hashable) -> Tuple[float, Any] | None:
+        entry = self._read(key)
+        return None if entry is None else (time.time() - entry[0], entry[1])
+
+    def set(self, key: Hashable, value: Any):
+        stored_at = time.time()
+        path = self._path(key)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(repr(stored_at).encode() + b"\n" + json.dumps(value, separators=(",", ":")).encode())
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self._remember(key, (stored_at, value, os.stat(path).st_mtime_ns))
+        if time.monotonic() - self._swept_at > self.SWEEP_INTERVAL_SECONDS:
+            self.sweep()
+
+    def invalidate(self, key: Hashable = None):
+        if key is not None:
+            self._entries.pop(key, None)
+            paths = [self._path(key)]
+        else:
+            self._entries.clear()
+            paths = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".json")]
+        for path in paths:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: float,
+                          cache_if: Callable[[Any], bool] = None) -> Any:
+        async def load():
+            return await self._load_as_designated_fetcher(key, loader, ttl, cache_if)
+
+        # Storing happens inside load, while the key's lock is still held
+        return await super().get_or_load(key, load, ttl, cache_if=lambda value: False)
+
+    async def _load_as_designated_fetcher(self, key, loader, ttl, cache_if) -> Any:
+        import fcntl
+
+        async def load_and_store():
+            value = await loader()
+            if cache_if is None or cache_if(value):
+                self.set(key, value)
+            return value
+
+        deadline = time.monotonic() + self.lock_timeout
+        with open(self._path(key)[:-len(".json")] + ".lock", "a+b") as lock_file:
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    hit, value = self.get(key, ttl)
+                    if hit:
+                        return value
+                    if time.monotonic() >= deadline:
+                        # The designated fetcher is stuck; don't make callers wait any longer
+                        return await load_and_store()
+                    await asyncio.sleep(self.LOCK_POLL_SECONDS)
+            try:
+                # Another process may have stored the value between our miss and taking the lock
+                hit, value = self.get(key, ttl)
+                if hit:
+                    return value
+                return await load_and_store()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class PersistentCache(TTLCache):
+    """Cache persisted to a directory, for slow-changing responses that should survive restarts.
+
+    - Each entry is a file holding one JSON metadata line (key, store time, ETag) and the JSON value.
+      All entries are loaded (mmap) when the cache is created, so a restarted server answers from disk at once.
+    - Store times are wall-clock, so entries keep their age across restarts.
+    - The upstream ETag, when sent, is kept with the entry so revalidate() can make a conditional request.
+    - Entries older than max_age are not served at all.
+    - Beyond maxsize entries the least recently used one is evicted, file included; on load the most recently
+      stored entries are kept.
+    """
+
+    def __init__(self, directory: str, max_age: float = 24 * 3600, maxsize: int = 1024):
+        super().__init__(maxsize)
+        self.directory = directory
+        self.max_age = max_age
+        self._meta: Dict[Hashable, Dict[str, Any]] = {}
+        self._revalidating: Dict[Hashable, asyncio.Task] = {}
+        os.makedirs(directory, exist_ok=True)
+        self.load()
+
+    def _path(self, key: Hashable) -> str:
+        return os.path.join(self.directory, hashlib.sha1(repr(key).encode()).hexdigest() + ".json")
+
+    def load(self) -> int:
+        """Load every entry of the directory; unreadable files are skipped. Returns number of entries loaded."""
+        loaded = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), "rb") as f, \
+                        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    split = mm.find(b"\n")
+                    meta = json.loads(mm[:split])
+                    value = json.loads(mm[split + 1:])
+                key = ast.literal_eval(meta["key"])
+            except (OSError, ValueError, SyntaxError, KeyError):
+                continue
+            loaded.append((meta["stored_at"], key, value, meta))
+        # Oldest first, so eviction starts with them
+        loaded.sort(key=lambda entry: entry[0])
+        for stored_at, key, value, meta in loaded:
+            self._entries[key] = (stored_at, value)
+            self._meta[key] = meta
+        self._evict()
+        return len(self._entries)
+
+    def _evict(self):
+        while len(self._entries) > self.maxsize:
+            key, _ = self._entries.popitem(last=False)
+            self._meta.pop(key, None)
+            try:
+                os.unlink(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def get(self, key: Hashable, ttl: float) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None or time.time() - entry[0] > min(ttl, self.max_age):
+            return False, None
+        self._entries.move_to_end(key)
+        return True, entry[1]
+
+    def peek(self, key: Hashable) -> Tuple[float, Any] | None:
+        entry = self._entries.get(key)
+        return None if entry is None else (time.time() - entry[0], entry[1])
+
+    def age(self, key: Hashable) -> float | None:
+        peeked = self.peek(key)
+        return None if peeked is None else peeked[0]
+
+    def set(self, key: Hashable, value: Any, etag: str | None = None):
+        body = json.dumps(value, separators=(",", ":")).encode()
+        meta = {"key": repr(key), "stored_at": time.time(), "etag": etag}
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(json.dumps(meta).encode() + b"\n" + body)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self._entries[key] = (meta["stored_at"], value)
+        self._entries.move_to_end(key)
+        self._meta[key] = meta
+        self._evict()
+
+    def invalidate(self, key: Hashable = None):
+        for k in ([key] if key is not None else list(self._entries)):
+            self._entries.pop(k, None)
+            self._meta.pop(k, None)
+            try:
+                os.unlink(self._path(k))
+            except FileNotFoundError:
+                pass
+
+    async def revalidate(self, key: Hashable,
+                         fetch: Callable[[str | None], Awaitable[Tuple[Any, str | None]]],
+                         cache_if: Callable[[Any], bool] = None):
+        """Refresh one entry. fetch(etag) returns (value, etag), or (None, etag) when upstream answered 304,
+        in which case only the store time is renewed. Rejected values leave the old entry in place."""
+        meta = self._meta.get(key, {})
+        value, etag = await fetch(meta.get("etag"))
+        if value is None:
+            value, etag = self._entries[key][1], etag or meta.get("etag")
+        elif cache_if is not None and not cache_if(value):
+            return
+        self.set(key, value, etag)
+
+    def revalidate_in_background(self, key: Hashable,
+                                 fetch: Callable[[str | None], Awaitable[Tuple[Any, str | None]]],
+                                 cache_if: Callable[[Any], bool] = None):
+        """Schedule revalidate() on the running loop unless one is already in progress for key."""
+        if key in self._revalidating:
+            return
+
+        async def run():
+            try:
+                await self.revalidate(key, fetch, cache_if)
+            except Exception as e:
+                # Keep serving the stored entry; the next stale read tries again
+                logging.warning("revalidating %r failed: %s", key, e)
+            finally:
+                self._revalidating.pop(key, None)
+
+        self._revalidating[key] = create_background_task(run())
@@ -4,14 +4,60 @@ Implements authentication, signing and request functionality for CoinEx API v2
 """
 
 import os
+import sys
 import time
 import hmac
+import heapq
+import asyncio
 import hashlib
 import json
+import weakref
 from enum import Enum
-from typing import Any, Dict, Optional, List
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Iterable, Optional, List
 from urllib.parse import urlencode
-import httpx
+
+from .cache import PersistentCache, TTLCache
+from .limits import FairScheduler, RateLimiter, current_tenant, deadline_remaining
+from .metrics import metrics
+from .tracing import span
+
+if TYPE_CHECKING:
+    import httpx
+    from .snapshots import SnapshotReader
+
+# Pooled HTTP clients, one per event loop (httpx connections cannot be shared across loops).
+# Created on first request so importing the package does not pay for httpx.
+_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+HTTP_POOL_MAX_CONNECTIONS = 100
+HTTP_POOL_MAX_KEEPALIVE = 20
+
+
+def get_http_client() -> "httpx.AsyncClient":
+    """Return the pooled httpx client of the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None or client.is_closed:
+        import httpx
+        client = httpx.AsyncClient(limits=httpx.Limits(max_connections=HTTP_POOL_MAX_CONNECTIONS,
+                                                       max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE))
+        _http_clients[loop] = client
+    return client
+
+
+async def close_http_client():
+    """Close the pooled client of the running event loop, if any."""
+    client = _http_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+class CoinExAPIError(Exception):
+    """Raised by helpers that consume API results when CoinEx returns a non-zero code."""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"code:{code}, message:{message}")
+        self.code = code
+        self.message = message
 
 
 class CoinExClient:
@@ -33,11 +79,43 @@ class CoinExClient:
         PENDING = "pending"
         FINISHED = "finished"
 
-    def __init__(self, access_id: str = None, secret_key: str = None, *, enable_env_credentials: bool = True):
+    # Seconds public GET responses may be served from the optional cache, by endpoint
+    PUBLIC_CACHE_TTLS: Dict[str, float] = {
+        "market": 300,
+        "position-level": 300,
+        "ticker": 2,
+        "index": 2,
+        "funding-rate": 5,
+        "depth": 1,
+    }
+
+    # Endpoints served stale-while-revalidate from the cache: (seconds past expiry stale data is returned at once
+    # while it is refreshed in the background, seconds it may be returned when upstream fails)
+    STALE_WINDOWS: Dict[str, tuple] = {
+        "market": (3600, 24 * 3600),
+        "ticker": (30, 300),
+        "index": (30, 300),
+        "funding-rate": (60, 900),
+    }
+
+    # Endpoints whose responses are stable for hours; kept in the optional persistent cache across restarts
+    PERSISTENT_ENDPOINTS = ("market", "position-level")
+
+    def __init__(self, access_id: str = None, secret_key: str = None, *, enable_env_credentials: bool = True,
+                 rate_limiter: RateLimiter | None = None, cache: TTLCache | None = None,
+                 snapshots: "SnapshotReader | None" = None, persistent: PersistentCache | None = None,
+                 scheduler: FairScheduler | None = None, serve_stale: bool = True):
         """Initialize CoinEx client
         :param access_id: API access ID
         :param secret_key: API secret key
         :param enable_env_credentials: Whether to allow fallback reading from environment variables COINEX_ACCESS_ID/COINEX_SECRET_KEY
+        :param rate_limiter: Optional limiter every upstream request waits on
+        :param cache: Optional cache for public market data, see PUBLIC_CACHE_TTLS
+        :param snapshots: Optional reader of ticker/depth snapshots published by the fetcher process, consulted first
+        :param persistent: Optional on-disk cache for PERSISTENT_ENDPOINTS; stale entries are served and
+                           revalidated in the background
+        :param scheduler: Optional per-tenant fair scheduler upstream requests of the current tenant wait on
+        :param serve_stale: Serve STALE_WINDOWS endpoints stale-while-revalidate from the cache, with an 'age_ms' field
         """
 
         if enable_env_credentials:
@@ -49,6 +127,12 @@ class CoinExClient:
             self.secret_key = secret_key
         self.base_url = "https://api.coinex.com"  # CoinEx doesn't have a dedicated testnet, use mainnet
         self.timeout = 30
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.snapshots = snapshots
+        self.persistent = persistent
+        self.scheduler = scheduler
+        self.serve_stale = serve_stale
 
     def _generate_signature(self, method: str, path: str, params: Dict = None, body: str = "") -> tuple[str, str]:
         """Generate API signature"""
@@ -130,14 +214,128 @@ class CoinExClient:
         if extra_params:
             data.update(extra_params)
 
+        if self.snapshots is not None and method == 'GET':
+            result = self._lookup(self.snapshots, path, data, self.snapshots.max_age)
+            if result is not None:
+                return result
+        if self.persistent is not None and method == 'GET' and endpoint in self.PERSISTENT_ENDPOINTS:
+            return await self._persistent_request(path, data, self.PUBLIC_CACHE_TTLS[endpoint])
+        if self.cache is not None and method == 'GET' and endpoint in self.PUBLIC_CACHE_TTLS:
+            if self.serve_stale and endpoint in self.STALE_WINDOWS:
+                return await self._stale_while_revalidate_request(path, data, endpoint)
+            return await self._cached_request(path, data, self.PUBLIC_CACHE_TTLS[endpoint])
         return await self._request(method, path, data=data)
 
-    async def _request(self, method: str, path: str, data: Dict = None) -> Dict[str, Any]:
+    @staticmethod
+    def _cache_key(path: str, data: Dict[str, Any]) -> tuple:
+        return path, tuple(sorted(data.items()))
+
+    @classmethod
+    def public_request_key(cls, endpoint: str, market_type: MarketType = MarketType.SPOT,
+                           base: str | None = None, quote: str | None = None,
+                           extra_params: Optional[Dict[str, Any]] = None) -> tuple:
+        """Cache/snapshot key of a public GET, as built by _market_request."""
+        data: Dict[str, Any] = {'market': base + quote} if base and quote else {}
+        data.update(extra_params or {})
+        return cls._cache_key(cls._build_market_path(market_type, endpoint), data)
+
+    def _lookup(self, store, path: str, data: Dict[str, Any], ttl: float) -> Dict[str, Any] | None:
+        """Fresh result from store (cache or snapshots) without loading; None on a miss.
+        Single-market lookups are answered from a fresh all-markets snapshot of the same endpoint.
+        Returns a shallow copy, callers may replace 'data'."""
+        market = data.get('market')
+        if market and len(data) == 1:
+            hit, snapshot = store.get(self._cache_key(path, {}), ttl)
+            if hit and isinstance(snapshot.get('data'), list):
+                rows = [row for row in snapshot['data'] if row.get('market') == market]
+                if rows:
+                    return {**snapshot, 'data': rows}
+        hit, result = store.get(self._cache_key(path, data), ttl)
+        return dict(result) if hit else None
+
+    async def _cached_request(self, path: str, data: Dict[str, Any], ttl: float) -> Dict[str, Any]:
+        """GET through the public cache."""
+        result = self._lookup(self.cache, path, data, ttl)
+        if result is not None:
+            return result
+        result = await self.cache.get_or_load(self._cache_key(path, data),
+                                              lambda: self._request('GET', path, data=data), ttl,
+                                              cache_if=lambda r: r.get('code') == 0)
+        return dict(result)
+
+    async def _stale_while_revalidate_request(self, path: str, data: Dict[str, Any], endpoint: str) -> Dict[str, Any]:
+        """GET through the cache, answering with stale data while it is refreshed (see STALE_WINDOWS).
+        The result carries 'age_ms', the age of the returned data."""
+        ttl = self.PUBLIC_CACHE_TTLS[endpoint]
+        market = data.get('market')
+        if market and len(data) == 1:
+            # Single-market answer cut from a fresh all-markets snapshot
+            peeked = self.cache.peek(self._cache_key(path, {}))
+            if peeked is not None and peeked[0] <= ttl and isinstance(peeked[1].get('data'), list):
+                rows = [row for row in peeked[1]['data'] if row.get('market') == market]
+                if rows:
+                    return {**peeked[1], 'data': rows, 'age_ms': round(peeked[0] * 1000)}
+        stale_ttl, error_ttl = self.STALE_WINDOWS[endpoint]
+        result, age = await self.cache.get_stale_while_revalidate(
+            self._cache_key(path, data), lambda: self._request('GET', path, data=data),
+            ttl, ttl + stale_ttl, ttl + error_ttl, cache_if=lambda r: r.get('code') == 0)
+        return {**result, 'age_ms': round(age * 1000)}
+
+    async def _persistent_request(self, path: str, data: Dict[str, Any], ttl: float) -> Dict[str, Any]:
+        """GET through the persistent cache. Entries older than ttl are still served, and revalidated
+        in the background with a conditional request."""
+        store = self.persistent
+
+        async def conditional_get(key: tuple, etag: str | None):
+            meta = {'etag': etag}
+            result = await self._request('GET', key[0], data=dict(key[1]), response_meta=meta)
+            return result, meta.get('etag')
+
+        result = self._lookup(store, path, data, store.max_age)
+        if result is not None:
+            for key in {self._cache_key(path, {}), self._cache_key(path, data)}:
+                age = store.age(key)
+                if age is not None and age > ttl:
+                    store.revalidate_in_background(key, lambda etag, key=key: conditional_get(key, etag),
+                                                   cache_if=lambda r: r.get('code') == 0)
+            return result
+
+        key = self._cache_key(path, data)
+
+        async def load():
+            value, etag = await conditional_get(key, None)
+            if value.get('code') == 0:
+                store.set(key, value, etag)
+            return value
+
+        # load() stores the value together with its ETag
+        return dict(await store.get_or_load(key, load, store.max_age, cache_if=lambda r: False))
+
+    async def prefetch(self, endpoint: str, market_type: MarketType = MarketType.SPOT,
+                       base: str | None = None, quote: str | None = None,
+                       extra_params: Optional[Dict[str, Any]] = None, max_age: float = 0) -> Dict[str, Any]:
+        """Fetch a public endpoint and store the result in the cache (warm-up / refresh).
+        :param max_age: skip the fetch when the cached entry is at most this old, e.g. because another
+                        process sharing the cache has just refreshed it
+        """
+        key = self.public_request_key(endpoint, market_type, base, quote, extra_params)
+        path, data = key[0], dict(key[1])
+        if self.persistent is not None and endpoint in self.PERSISTENT_ENDPOINTS:
+            return await self._persistent_request(path, data, self.PUBLIC_CACHE_TTLS[endpoint])
+        if self.cache is None:
+            return await self._request('GET', path, data=data)
+        return await self.cache.get_or_load(key, lambda: self._request('GET', path, data=data), max_age,
+                                            cache_if=lambda r: r.get('code') == 0)
+
+    async def _request(self, method: str, path: str, data: Dict = None,
+                       response_meta: Optional[Dict[str, Any]] = None) -> Dict[str, Any] | None:
         """Send HTTP request
 
         :param method: HTTP method (GET/POST/DELETE)
         :param path: API path
         :param data: Request data - for GET requests becomes URL params, for POST/DELETE becomes request body
+        :param response_meta: Optional dict for conditional GETs: its 'etag' is sent as If-None-Match and replaced
+                              by the response's ETag; None is returned when upstream answers 304 Not Modified
         """
         url = f"{self.base_url}{path}"
 
@@ -153,36 +351,76 @@ class CoinExClient:
             if data:
                 request_body = json.dumps(data, separators=(',', ':'))
 
-        # Get request headers
-        headers = self._get_headers(method, path, params, request_body)
+        with span("coinex.request", {"http.request.method": method, "coinex.endpoint": path}) as request_span:
+            # Don't spend rate budget on a request whose MCP caller has already given up
+            if deadline_remaining(self.timeout) <= 0:
+                raise Exception("Request timeout")
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            """Send HTTP request"""
+            # Requests made on behalf of a tenant share upstream slots fairly with other tenants
+            tenant = current_tenant.get() if self.scheduler is not None else None
+            with span("coinex.queue"):
+                if self.rate_limiter is not None:
+                    await self.rate_limiter.acquire()
+                if tenant is not None:
+                    metrics.observe("upstream_queue_seconds", await self.scheduler.acquire(tenant), tenant=tenant)
             try:
+                result = await self._send(method, url, path, params, request_body, response_meta)
+            finally:
+                if tenant is not None:
+                    self.scheduler.release(tenant)
+            if isinstance(result, dict):
+                request_span.set_attribute("coinex.code", result.get('code'))
+            return result
+
+    async def _send(self, method: str, url: str, path: str, params: Dict | None, request_body: str,
+                    response_meta: Optional[Dict[str, Any]]) -> Dict[str, Any] | None:
+        """Sign and send one HTTP request, mapping transport errors to exceptions with readable messages."""
+        # Get request headers
+        with span("coinex.sign"):
+            headers = self._get_headers(method, path, params, request_body)
+        if response_meta is not None and response_meta.get('etag'):
+            headers['If-None-Match'] = response_meta['etag']
+
+        import httpx  # already loaded after the first request; kept local for a cheap package import
+
+        client = get_http_client()
+        # Fixed client timeout, shortened to what is left of the current MCP request's deadline
+        timeout = deadline_remaining(self.timeout)
+        try:
+            if timeout <= 0:
+                raise httpx.TimeoutException("deadline exceeded before sending")
+            # Connection acquisition from the pool, upstream wait and body download
+            with span("coinex.send") as send_span:
                 if method.upper() == "GET":
-                    response = await client.get(url, params=params, headers=headers)
+                    response = await client.get(url, params=params, headers=headers, timeout=timeout)
                 elif method.upper() == "POST":
-                    response = await client.post(url, headers=headers, content=request_body)
+                    response = await client.post(url, headers=headers, content=request_body, timeout=timeout)
                 else:
                     # coinex api doesn't have DELETE/PUT requests
                     raise ValueError(f"Unsupported HTTP method: {method}")
-
-                response.raise_for_status()
+                send_span.set_attribute("http.response.status_code", response.status_code)
+
+            response.raise_for_status()
+            if response_meta is not None:
+                response_meta['etag'] = response.headers.get('ETag')
+                if response.status_code == 304:
+                    return None
+            with span("coinex.decode"):
                 return response.json()
 
-            except httpx.TimeoutException:
-                raise Exception("Request timeout")
-            except httpx.HTTPStatusError as e:
-                error_msg = f"HTTP error {e.response.status_code}"
-                try:
-                    error_data = e.response.json()
-                    if 'message' in error_data:
-                        error_msg += f": {error_data['message']}"
-                except (ValueError, KeyError, AttributeError):
-                    pass
-                raise Exception(error_msg)
-            except Exception as e:
-                raise Exception(f"Request failed: {str(e)}")
+        except httpx.TimeoutException:
+            raise Exception("Request timeout")
+        except httpx.HTTPStatusError as e:
+            error_msg = f"HTTP error {e.response.status_code}"
+            try:
+                error_data = e.response.json()
+                if 'message' in error_data:
+                    error_msg += f": {error_data['message']}"
+            except (ValueError, KeyError, AttributeError):
+                pass
+            raise Exception(error_msg)
+        except Exception as e:
+            raise Exception(f"Request failed: {str(e)}")
 
     # =====================
     # Unified public market queries
@@ -213,8 +451,8 @@ class CoinExClient:
     # =====================
     # Futures public market queries
     # =====================
-    async def futures_get_funding_rate(self, base: str, quote: str = 'USDT'):
-        """Get current funding rate (futures)"""
+    async def futures_get_funding_rate(self, base: str | None, quote: str | None = 'USDT'):
+        """Get current funding rate (futures); pass base=None and quote=None for all markets"""
         return await self._market_request("funding-rate", base_currency=base, quote_currency=quote, market_type=self.MarketType.FUTURES)
 
     async def futures_get_funding_rate_history(self, base: str, quote: str = 'USDT',
@@ -282,7 +520,8 @@ class CoinExClient:
         if not self.access_id or not self.secret_key:
             raise ValueError("Account interface requires access_id and secret_key")
 
-        path = f"/v2/assets/{self._market_type_str_in_path(market_type)}/balance"
+        # Unlike market and order endpoints, margin balances have their own path (per isolated margin account)
+        path = f"/v2/assets/{market_type.value}/balance"
         return await self._request("GET", path, data=None)
 
     # Trading interfaces (authentication required)
@@ -355,6 +594,23 @@ class CoinExClient:
         return await self._market_request(endpoint, 'POST', base, quote,
                                           market_type=market_type, extra_params=params)
 
+    # Trading interfaces (authentication required)
+    async def get_order_status(self, base: str, quote: str, market_type: MarketType = MarketType.SPOT,
+                               order_id: int | None = None) -> Dict[str, Any]:
+        """Get one order by id, whether open or finished.
+        Parameters:
+            base: base currency
+            quote: quote currency
+            market_type: spot/futures/margin
+            order_id: order id
+        data.status is one of open, part_filled, filled, part_canceled, canceled; data.filled_amount is the
+        amount executed so far.
+        """
+        if not self.access_id or not self.secret_key:
+            raise ValueError("Account interface requires access_id and secret_key")
+        return await self._market_request("order-status", 'GET', base, quote,
+                                          market_type=market_type, extra_params={"order_id": order_id})
+
     # Trading interfaces (authentication required)
     async def get_orders(self, base: str = None, quote: str = None,
                          market_type: MarketType = MarketType.SPOT,
@@ -378,6 +634,102 @@ class CoinExClient:
         return await self._market_request(endpoint, 'GET', base, quote,
                                           market_type=market_type, extra_params=extra_params)
 
+    async def iter_orders(self, base: str = None, quote: str = None,
+                          market_type: MarketType = MarketType.SPOT,
+                          side: OrderSide = None,
+                          status: OrderStatus = OrderStatus.FINISHED,
+                          is_stop=False, page_size: int = 100) -> AsyncIterator[Dict[str, Any]]:
+        """Iterate orders (newest first) page by page.
+        The next page is only requested once the previous one has been consumed, so at most one page is held in memory.
+        Raises CoinExAPIError when the API returns a non-zero code.
+        """
+        page = 1
+        while True:
+            api_result = await self.get_orders(base, quote, market_type, side, status, is_stop, page, page_size)
+            if api_result.get('code') != 0:
+                raise CoinExAPIError(api_result.get('code'), api_result.get('message'))
+
+            orders = api_result.get('data') or []
+            for order in orders:
+                order.setdefault("market_type", market_type.name)
+                order["is_stop"] = bool(is_stop)
+                yield order
+
+            pagination = api_result.get('pagination') or {}
+            if not orders or not pagination.get('has_next'):
+                return
+            page += 1
+
+    async def get_merged_orders(self, base: str = None, quote: str = None,
+                                market_types: Iterable[MarketType] = (MarketType.SPOT, MarketType.MARGIN, MarketType.FUTURES),
+                                side: OrderSide = None,
+                                statuses: Iterable[OrderStatus] = (OrderStatus.PENDING, OrderStatus.FINISHED),
+                                include_stop: bool = True,
+                                limit: int = 100) -> Dict[str, Any]:
+        """Query several order streams concurrently and merge them by creation time (newest first).
+        Parameters:
+            market_types: markets to query, default spot/margin/futures
+            statuses: pending and/or finished
+            include_stop: whether stop orders are queried alongside normal orders
+            limit: total number of merged orders to return
+        Every (market_type, status, is_stop) combination is one paged stream; streams are merged with a
+        k-way heap merge, duplicates (an order seen both pending and finished) are dropped.
+        """
+        if not self.access_id or not self.secret_key:
+            raise ValueError("Account interface requires access_id and secret_key")
+
+        stop_flags = (False, True) if include_stop else (False,)
+        streams = [
+            self.iter_orders(base, quote, mt, side, st, is_stop, page_size=min(limit, 100))
+            for mt in market_types for st in statuses for is_stop in stop_flags
+        ]
+
+        merger = _merge_streams_desc(streams, key=lambda o: o.get('created_at') or 0)
+        merged: List[Dict[str, Any]] = []
+        seen = set()
+        try:
+            async for order in merger:
+                ident = (order.get('market_type'), order.get('is_stop'), order.get('stop_id') or order.get('order_id'))
+                if ident in seen:
+                    continue
+                seen.add(ident)
+                merged.append(order)
+                if len(merged) >= limit:
+                    break
+        except CoinExAPIError as e:
+            return {"code": e.code, "message": e.message, "data": merged}
+        finally:
+            await merger.aclose()
+            await asyncio.gather(*(stream.aclose() for stream in streams))
+
+        return {"code": 0, "message": "OK", "data": merged}
+
+
+async def _merge_streams_desc(streams: List[AsyncIterator[Dict[str, Any]]], key) -> AsyncIterator[Dict[str, Any]]:
+    """K-way merge of async streams that are each sorted by key descending.
+    Heads of all streams are fetched concurrently; afterwards only the stream that was popped is advanced.
+    """
+    async def head(stream):
+        try:
+            return await stream.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    heap = []
+    counter = 0
+    for idx, item in enumerate(await asyncio.gather(*(head(s) for s in streams))):
+        if item is not None:
+            heapq.heappush(heap, (-key(item), counter, idx, item))
+            counter += 1
+
+    while heap:
+        _, _, idx, item = heapq.heappop(heap)
+        yield item
+        nxt = await head(streams[idx])
+        if nxt is not None:
+            heapq.heappush(heap, (-key(nxt), counter, idx, nxt))
+            counter += 1
+
 
 def validate_environment():
     """Validate environment variable configuration"""
@@ -385,9 +737,10 @@ def validate_environment():
     secret_key = os.getenv('COINEX_SECRET_KEY')
 
     if not access_id or not secret_key:
-        print("Warning: COINEX_ACCESS_ID and COINEX_SECRET_KEY environment variables not set")
-        print("Some features (account info, trading) will be unavailable")
-        print("Market data features can still be used normally")
+        # stderr: in stdio mode stdout carries the MCP protocol
+        print("Warning: COINEX_ACCESS_ID and COINEX_SECRET_KEY environment variables not set", file=sys.stderr)
+        print("Some features (account info, trading) will be unavailable", file=sys.stderr)
+        print("Market data features can still be used normally", file=sys.stderr)
         return False
 
     return True
@@ -0,0 +1,418 @@
+"""
+Execution engine
+Server-side OCO, bracket, trailing-stop, TWAP and iceberg orders: strategies watch the last trade price,
+polled several times a second, and issue plain child orders through CoinExClient.place_order / cancel_order
+
+Strategies live in server memory only; they stop when the server process exits.
+"""
+
+import time
+import asyncio
+import itertools
+import logging
+from decimal import ROUND_DOWN, Decimal
+from typing import Any, Dict, List, Tuple
+
+from .coinex_client import CoinExAPIError, CoinExClient
+from .limits import create_background_task
+from .metrics import metrics
+
+Side = CoinExClient.OrderSide
+
+ACTIVE, DONE, CANCELLED, FAILED = "active", "done", "cancelled", "failed"
+# Finished strategies kept per owner for list_executions
+MAX_FINISHED_PER_OWNER = 100
+
+
+def opposite(side: Side) -> Side:
+    return Side.SELL if side == Side.BUY else Side.BUY
+
+
+def split_amount(total: Decimal, parts: int) -> List[Decimal]:
+    """Split total into parts slices with total's precision; the last slice takes the rounding remainder."""
+    exponent = Decimal(1).scaleb(total.as_tuple().exponent)
+    piece = (total / parts).quantize(exponent, rounding=ROUND_DOWN)
+    if piece <= 0:
+        raise ValueError(f"Amount {total} is too small to split into {parts} slices")
+    return [piece] * (parts - 1) + [total - piece * (parts - 1)]
+
+
+class Strategy:
+    """Base of all execution strategies: identity, child order bookkeeping and state.
+
+    step() is called by the engine with the latest trade price of the strategy's market; it places child orders
+    through the strategy's own (authenticated) client and finishes by setting state to DONE.
+    """
+
+    kind = ""
+    # Order statuses of a limit order still resting on the exchange
+    OPEN_STATUSES = ("open", "part_filled")
+
+    def __init__(self, client: CoinExClient, owner: str, market_type: CoinExClient.MarketType,
+                 base: str, quote: str, side: Side, amount: str):
+        self.client = client
+        self.owner = owner
+        self.market_type = market_type
+        self.base, self.quote = base.upper(), quote.upper()
+        self.side = side
+        self.amount = Decimal(amount)
+        if self.amount <= 0:
+            raise ValueError("amount must be positive")
+        self.execution_id = 0
+        self.state = ACTIVE
+        self.message = ""
+        self.created_at = int(time.time() * 1000)
+        self.children: List[Dict[str, Any]] = []
+        self.lock = asyncio.Lock()
+
+    @property
+    def market(self) -> str:
+        return self.base + self.quote
+
+    async def place(self, side: Side, amount: Decimal, purpose: str, price: Decimal | None = None) -> int:
+        """Place one child order (market unless price is given) and record it; raises CoinExAPIError on failure."""
+        result = await self.client.place_order(side=side, base=self.base, quote=self.quote, amount=str(amount),
+                                               market_type=self.market_type,
+                                               price=str(price) if price is not None else None)
+        if result.get('code') != 0:
+            raise CoinExAPIError(result.get('code'), result.get('message'))
+        order_id = (result.get('data') or {}).get('order_id')
+        self.children.append({"order_id": order_id, "purpose": purpose, "side": side.value, "amount": str(amount),
+                              "price": str(price) if price is not None else None,
+                              "placed_at": int(time.time() * 1000)})
+        metrics.inc("execution_child_orders_total", kind=self.kind)
+        return order_id
+
+    async def _order_status(self, order_id: int) -> Dict[str, Any]:
+        result = await self.client.get_order_status(self.base, self.quote, self.market_type, order_id)
+        if result.get('code') != 0:
+            raise CoinExAPIError(result.get('code'), result.get('message'))
+        return result.get('data') or {}
+
+    async def step(self, price: Decimal | None, now: float):
+        raise NotImplementedError
+
+    async def on_cancel(self):
+        """Cancel child orders that may still rest on the exchange."""
+
+    def details(self) -> Dict[str, Any]:
+        return {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"execution_id": self.execution_id, "kind": self.kind, "state": self.state, "message": self.message,
+                "market_type": self.market_type.value, "market": self.market, "side": self.side.value,
+                "amount": str(self.amount), "created_at": self.created_at, **self.details(),
+                "children": self.children}
+
+
+class _Exit:
+    """Take-profit / stop-loss trigger pair for closing a position with an order on `side`.
+
+    A sell exit takes profit at or above take_profit and stops out at or below stop_loss; a buy exit the reverse.
+    """
+
+    def __init__(self, side: Side, take_profit: Decimal, stop_loss: Decimal):
+        if side == Side.SELL and not take_profit > stop_loss:
+            raise ValueError("For a sell exit take_profit must be above stop_loss")
+        if side == Side.BUY and not take_profit < stop_loss:
+            raise ValueError("For a buy exit take_profit must be below stop_loss")
+        self.side, self.take_profit, self.stop_loss = side, take_profit, stop_loss
+
+    def triggered(self, price: Decimal) -> str | None:
+        if self.side == Side.SELL:
+            return "take_profit" if price >= self.take_profit else "stop_loss" if price <= self.stop_loss else None
+        return "take_profit" if price <= self.take_profit else "stop_loss" if price >= self.stop_loss else None
+
+
+class OCOStrategy(Strategy):
+    """One-cancels-other: whichever of take_profit / stop_loss is reached first sends a market order."""
+
+    kind = "oco"
+
+    def __init__(self, *args, take_profit: str, stop_loss: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.exit = _Exit(self.side, Decimal(take_profit), Decimal(stop_loss))
+
+    async def step(self, price, now):
+        leg = self.exit.triggered(price) if price is not None else None
+        if leg:
+            await self.place(self.side, self.amount, leg)
+            self.state, self.message = DONE, f"{leg} triggered at {price}"
+
+    def details(self):
+        return {"take_profit": str(self.exit.take_profit), "stop_loss": str(self.exit.stop_loss)}
+
+
+class BracketStrategy(Strategy):
+    """Entry order, then an OCO exit on the opposite side.
+
+    Without entry_price the entry is a market order sent right away; with it, the market entry is sent once the
+    price reaches entry_price (at or below for buys, at or above for sells). A rejected exit order leaves the
+    position open, so it is retried on the following ticks, up to MAX_EXIT_ATTEMPTS times.
+    """
+
+    kind = "bracket"
+    MAX_EXIT_ATTEMPTS = 5
+
+    def __init__(self, *args, take_profit: str, stop_loss: str, entry_price: str | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.entry_price = Decimal(entry_price) if entry_price else None
+        self.exit = _Exit(opposite(self.side), Decimal(take_profit), Decimal(stop_loss))
+        self.entered = False
+        self.exit_failures = 0
+
+    async def step(self, price, now):
+        if not self.entered:
+            if self.entry_price is not None:
+                if price is None:
+                    return
+                if (price > self.entry_price) if self.side == Side.BUY else (price < self.entry_price):
+                    return
+            await self.place(self.side, self.amount, "entry")
+            self.entered = True
+            self.message = "entered, waiting for take_profit / stop_loss"
+            return
+        leg = self.exit.triggered(price) if price is not None else None
+        if leg:
+            try:
+                await self.place(self.exit.side, self.amount, leg)
+            except Exception as e:
+                self.exit_failures += 1
+                if self.exit_failures >= self.MAX_EXIT_ATTEMPTS:
+                    raise RuntimeError(f"{leg} exit order failed {self.exit_failures} times, "
+                                       f"the entered position of {self.amount} is still open: {e}") from e
+                self.message = f"{leg} exit order failed ({e}), retrying; the entered position is open"
+                return
+            self.state, self.message = DONE, f"{leg} triggered at {price}"
+
+    def details(self):
+        return {"entry_price": str(self.entry_price) if self.entry_price is not None else None,
+                "entered": self.entered, "exit_failures": self.exit_failures, "take_profit": str(self.exit.take_profit),
+                "stop_loss": str(self.exit.stop_loss)}
+
+
+class TrailingStopStrategy(Strategy):
+    """Market order once the price retraces trail_pct from its best level since activation.
+
+    A sell stop follows the highest price and triggers at high * (1 - trail_pct/100); a buy stop follows the
+    lowest price and triggers at low * (1 + trail_pct/100). With activation_price, tracking starts once the price
+    reaches it (at or above for sells, at or below for buys).
+    """
+
+    kind = "trailing_stop"
+
+    def __init__(self, *args, trail_pct: float, activation_price: str | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not 0 < trail_pct < 100:
+            raise ValueError("trail_pct must be between 0 and 100")
+        self.trail = Decimal(str(trail_pct)) / 100
+        self.activation_price = Decimal(activation_price) if activation_price else None
+        self.best: Decimal | None = None
+
+    def stop_price(self) -> Decimal | None:
+        if self.best is None:
+            return None
+        return self.best * (1 - self.trail) if self.side == Side.SELL else self.best * (1 + self.trail)
+
+    async def step(self, price, now):
+        if price is None:
+            return
+        if self.best is None:
+            if self.activation_price is not None and (
+                    price < self.activation_price if self.side == Side.SELL else price > self.activation_price):
+                return
+            self.best = price
+        self.best = max(self.best, price) if self.side == Side.SELL else min(self.best, price)
+        stop = self.stop_price()
+        if price <= stop if self.side == Side.SELL else price >= stop:
+            await self.place(self.side, self.amount, "trailing_stop")
+            self.state, self.message = DONE, f"triggered at {price}, best {self.best}"
+
+    def details(self):
+        stop = self.stop_price()
+        return {"trail_pct": str(self.trail * 100), "best_price": str(self.best) if self.best is not None else None,
+                "stop_price": str(stop) if stop is not None else None}
+
+
+class TWAPStrategy(Strategy):
+    """Amount split into equal slices sent every duration/slices seconds; market orders, or limit orders at
+    limit_price. The first slice goes out immediately; cancelling cancels limit slices still open."""
+
+    kind = "twap"
+
+    def __init__(self, *args, slices: int, duration_seconds: float, limit_price: str | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if slices < 1 or duration_seconds < 0:
+            raise ValueError("slices must be at least 1 and duration_seconds not negative")
+        self.slices = split_amount(self.amount, slices)
+        self.interval = duration_seconds / slices
+        self.limit_price = Decimal(limit_price) if limit_price else None
+        self.sent = 0
+        self.next_at = 0.0
+
+    async def step(self, price, now):
+        if now < self.next_at:
+            return
+        await self.place(self.side, self.slices[self.sent], f"slice {self.sent + 1}/{len(self.slices)}",
+                         self.limit_price)
+        self.sent += 1
+        self.next_at = now + self.interval
+        if self.sent == len(self.slices):
+            self.state, self.message = DONE, "all slices sent"
+
+    async def on_cancel(self):
+        if self.limit_price is None:
+            return
+        for child in self.children:
+            order = await self._order_status(child["order_id"])
+            if order.get('status') in self.OPEN_STATUSES:
+                await self.client.cancel_order(self.base, self.quote, self.market_type, child["order_id"])
+
+    def details(self):
+        return {"slices": len(self.slices), "slices_sent": self.sent, "interval_seconds": self.interval,
+                "limit_price": str(self.limit_price) if self.limit_price is not None else None}
+
+
+class IcebergStrategy(Strategy):
+    """Limit orders of visible_amount at price, the next one placed when the previous one has filled.
+
+    The open slice is looked up by order id. If it is cancelled outside the server, the execution stops
+    (state cancelled) with the amount filled so far.
+    """
+
+    kind = "iceberg"
+    # Seconds between checks of the open slice, so its status is not requested on every price tick
+    CHECK_SECONDS = 1.0
+
+    def __init__(self, *args, visible_amount: str, price: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.visible = Decimal(visible_amount)
+        if not 0 < self.visible <= self.amount:
+            raise ValueError("visible_amount must be positive and not above amount")
+        self.price = Decimal(price)
+        self.filled = Decimal(0)
+        self.open_order: int | None = None
+        self.checked_at = 0.0
+
+    async def step(self, price, now):
+        if self.open_order is not None:
+            if now - self.checked_at < self.CHECK_SECONDS:
+                return
+            self.checked_at = now
+            order = await self._order_status(self.open_order)
+            status = order.get('status')
+            if status in self.OPEN_STATUSES:
+                return
+            self.filled += Decimal(order.get('filled_amount') or 0)
+            if status != "filled":
+                self.state = CANCELLED
+                self.message = f"slice {self.open_order} was {status} outside the server, {self.filled} filled"
+                self.open_order = None
+                return
+            self.open_order = None
+        remaining = self.amount - self.filled
+        if remaining <= 0:
+            self.state, self.message = DONE, "all slices filled"
+            return
+        self.open_order = await self.place(self.side, min(self.visible, remaining), "visible slice", self.price)
+        self.checked_at = now
+
+    async def on_cancel(self):
+        if self.open_order is not None:
+            await self.client.cancel_order(self.base, self.quote, self.market_type, self.open_order)
+            self.open_order = None
+
+    def details(self):
+        return {"price": str(self.price), "visible_amount": str(self.visible), "filled": str(self.filled),
+                "remaining": str(self.amount - self.filled), "open_order": self.open_order}
+
+
+class ExecutionEngine:
+    """Runs submitted strategies until they finish, are cancelled or fail.
+
+    Every interval seconds the last trade price of each market with active strategies is fetched once
+    (through price_client, the deals endpoint is never cached), then all strategies step concurrently.
+    """
+
+    def __init__(self, price_client: CoinExClient, interval: float = 0.25):
+        self.price_client = price_client
+        self.interval = interval
+        self._ids = itertools.count(1)
+        self._active: Dict[int, Strategy] = {}
+        self._finished: Dict[str, List[Strategy]] = {}
+        self._task: asyncio.Task | None = None
+        metrics.gauge("executions", lambda: {"active": len(self._active)})
+
+    def submit(self, strategy: Strategy) -> Strategy:
+        strategy.execution_id = next(self._ids)
+        self._active[strategy.execution_id] = strategy
+        if self._task is None or self._task.done():
+            self._task = create_background_task(self._run())
+        return strategy
+
+    def executions(self, owner: str) -> List[Strategy]:
+        active = [s for s in self._active.values() if s.owner == owner]
+        return active + list(reversed(self._finished.get(owner, [])))
+
+    def _finish(self, strategy: Strategy):
+        self._active.pop(strategy.execution_id, None)
+        finished = self._finished.setdefault(strategy.owner, [])
+        finished.append(strategy)
+        del finished[:-MAX_FINISHED_PER_OWNER]
+        metrics.inc("executions_finished_total", kind=strategy.kind, state=strategy.state)
+
+    async def cancel(self, owner: str, execution_id: int) -> Strategy | None:
+        strategy = self._active.get(execution_id)
+        if strategy is None or strategy.owner != owner:
+            return None
+        async with strategy.lock:
+            if strategy.state == ACTIVE:
+                strategy.state, strategy.message = CANCELLED, "cancelled"
+                try:
+                    await strategy.on_cancel()
+                except Exception as e:
+                    strategy.message = f"cancelled, cancelling child order failed: {e}"
+                self._finish(strategy)
+        return strategy
+
+    async def _price(self, key: Tuple[CoinExClient.MarketType, str, str]) -> Decimal:
+        market_type, base, quote = key
+        result = await self.price_client.get_deal(base, quote, market_type, limit=1)
+        if result.get('code') != 0 or not result.get('data'):
+            raise CoinExAPIError(result.get('code'), result.get('message'))
+        return Decimal(result['data'][0]['price'])
+
+    async def _step(self, strategy: Strategy, price: Decimal | None, now: float):
+        async with strategy.lock:
+            if strategy.state != ACTIVE:
+                return
+            try:
+                await strategy.step(price, now)
+            except Exception as e:
+                strategy.state, strategy.message = FAILED, str(e)
+                logging.error("execution %s (%s) failed: %s", strategy.execution_id, strategy.kind, e)
+            if strategy.state != ACTIVE:
+                self._finish(strategy)
+
+    async def tick(self):
+        strategies = list(self._active.values())
+        keys = list({(s.market_type, s.base, s.quote) for s in strategies})
+        prices = {}
+        for key, result in zip(keys, await asyncio.gather(*(self._price(k) for k in keys), return_exceptions=True)):
+            if isinstance(result, Exception):
+                # Price-driven strategies wait for the next tick; time-driven ones (TWAP) still proceed
+                logging.warning("execution price fetch %s%s failed: %s", key[1], key[2], result)
+                result = None
+            prices[key] = result
+        now = time.monotonic()
+        await asyncio.gather(*(self._step(s, prices[(s.market_type, s.base, s.quote)], now) for s in strategies))
+
+    async def _run(self):
+        while self._active:
+            started = time.monotonic()
+            await self.tick()
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
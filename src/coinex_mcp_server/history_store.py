@@ -0,0 +1,259 @@
+"""
+Local history store
+Append-only binary files for futures funding-rate, premium-index and basis history, plus the sync job that fills them
+
+Layout: <root>/<series>/<MARKET>.bin
+- 8 byte header: b"CXHS", format version (uint16), number of value fields (uint16)
+- fixed-size little-endian records: timestamp ms (int64) followed by the series' float64 values,
+  strictly ascending by timestamp, so time-range lookups are a binary search over the mmap'ed file
+- appends hold an exclusive flock on the file, since server processes and the sync command may append at once
+"""
+
+import os
+import sys
+import mmap
+import time
+import fcntl
+import struct
+import asyncio
+import logging
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from .coinex_client import CoinExAPIError, CoinExClient
+
+HEADER_MAGIC = b"CXHS"
+HEADER_VERSION = 1
+HEADER = struct.Struct("<4sHH")
+
+# How often a tool call may ask upstream for the uncached tail of one series
+TAIL_REFRESH_SECONDS = 60
+SYNC_PAGE_LIMIT = 1000
+
+
+@dataclass(frozen=True)
+class SeriesSpec:
+    """How one upstream history endpoint maps onto a record."""
+    name: str
+    client_method: str
+    time_field: str
+    value_fields: Tuple[str, ...]
+
+    @property
+    def record(self) -> struct.Struct:
+        return struct.Struct("<q" + "d" * len(self.value_fields))
+
+
+SERIES: Dict[str, SeriesSpec] = {
+    "funding": SeriesSpec("funding", "futures_get_funding_rate_history", "funding_time",
+                          ("theoretical_funding_rate", "actual_funding_rate")),
+    "premium": SeriesSpec("premium", "futures_get_premium_history", "created_at", ("premium_index",)),
+    "basis": SeriesSpec("basis", "futures_basis_index_history", "created_at", ("basis_rate",)),
+}
+
+
+def default_history_dir() -> str:
+    return os.getenv("COINEX_HISTORY_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "coinex-mcp-server", "history")
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def _to_decimal_str(value: float) -> str:
+    """Stored float as the API's plain decimal string: 1e-05 -> '0.00001'."""
+    return f"{Decimal(repr(value)).normalize():f}"
+
+
+class HistoryStore:
+    """Append-only per-market series files with mmap-based time-range queries."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._tail_checked: Dict[Tuple[str, str], float] = {}
+
+    def path(self, series: str, market: str) -> str:
+        return os.path.join(self.root, series, f"{market.upper()}.bin")
+
+    def has(self, series: str, market: str) -> bool:
+        return os.path.exists(self.path(series, market))
+
+    def _open_for_append(self, spec: SeriesSpec, market: str):
+        """Open the series file for appending, holding its lock until the file is closed."""
+        path = self.path(spec.name, market)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        f = open(path, "a+b")
+        fcntl.flock(f, fcntl.LOCK_EX)
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            f.write(HEADER.pack(HEADER_MAGIC, HEADER_VERSION, len(spec.value_fields)))
+            size = HEADER.size
+        else:
+            self._check_header(f, spec, path)
+        # Drop a partially written trailing record left by an interrupted append
+        excess = (size - HEADER.size) % spec.record.size
+        if excess:
+            f.truncate(size - excess)
+            size -= excess
+        f.seek(size)
+        return f
+
+    @staticmethod
+    def _check_header(f, spec: SeriesSpec, path: str):
+        f.seek(0)
+        magic, version, fields = HEADER.unpack(f.read(HEADER.size))
+        if magic != HEADER_MAGIC or version != HEADER_VERSION or fields != len(spec.value_fields):
+            raise ValueError(f"{path} is not a {spec.name} history file of version {HEADER_VERSION}")
+
+    def first_time(self, series: str, market: str) -> Optional[int]:
+        spec = SERIES[series]
+        path = self.path(series, market)
+        try:
+            with open(path, "rb") as f:
+                f.seek(HEADER.size)
+                data = f.read(spec.record.size)
+        except OSError:
+            return None
+        return spec.record.unpack(data)[0] if len(data) == spec.record.size else None
+
+    def last_time(self, series: str, market: str) -> Optional[int]:
+        spec = SERIES[series]
+        path = self.path(series, market)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return None
+        count = (size - HEADER.size) // spec.record.size
+        if count <= 0:
+            return None
+        with open(path, "rb") as f:
+            f.seek(HEADER.size + (count - 1) * spec.record.size)
+            return spec.record.unpack(f.read(spec.record.size))[0]
+
+    def append(self, series: str, market: str, rows: List[Dict[str, Any]]) -> int:
+        """Append API rows newer than the last stored timestamp; returns number of records written."""
+        spec = SERIES[series]
+        records = sorted(
+            (int(row[spec.time_field]), *(_to_float(row.get(f)) for f in spec.value_fields))
+            for row in rows if row.get(spec.time_field) is not None
+        )
+        if not records:
+            return 0
+        with self._open_for_append(spec, market) as f:
+            # Read under the lock: another process may have appended since this one last looked
+            size = f.tell()
+            last = None
+            if size > HEADER.size:
+                f.seek(size - spec.record.size)
+                last = spec.record.unpack(f.read(spec.record.size))[0]
+            buf = bytearray()
+            for record in records:
+                if last is not None and record[0] <= last:
+                    continue
+                buf += spec.record.pack(*record)
+                last = record[0]
+            f.write(buf)
+        return len(buf) // spec.record.size
+
+    def query(self, series: str, market: str, start_time: Optional[int] = None, end_time: Optional[int] = None,
+              offset: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Records with start_time <= timestamp <= end_time, newest first (API order).
+        Only the requested offset/limit window is decoded.
+        """
+        spec = SERIES[series]
+        rec = spec.record
+        path = self.path(series, market)
+        if not os.path.exists(path) or os.path.getsize(path) <= HEADER.size:
+            return []
+
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            count = (len(mm) - HEADER.size) // rec.size
+
+            def ts_at(i: int) -> int:
+                return struct.unpack_from("<q", mm, HEADER.size + i * rec.size)[0]
+
+            def bisect_left(ts: int) -> int:
+                lo, hi = 0, count
+                while lo < hi:
+                    mid = (lo + hi) // 2
+                    if ts_at(mid) < ts:
+                        lo = mid + 1
+                    else:
+                        hi = mid
+                return lo
+
+            lo = bisect_left(start_time) if start_time is not None else 0
+            hi = bisect_left(end_time + 1) if end_time is not None else count
+            top = hi - 1 - offset
+            bottom = max(lo, top - limit + 1) if limit is not None else lo
+            rows = []
+            for i in range(top, bottom - 1, -1):
+                ts, *values = rec.unpack_from(mm, HEADER.size + i * rec.size)
+                row = {"market": market.upper(), spec.time_field: ts}
+                row.update((f, _to_decimal_str(v)) for f, v in zip(spec.value_fields, values))
+                rows.append(row)
+            return rows
+
+    # --------------------
+    # Upstream synchronisation
+    # --------------------
+    async def sync(self, client: CoinExClient, series: str, base: str, quote: str = "USDT",
+                   since: Optional[int] = None) -> int:
+        """Download records newer than what is stored (or than since, for an empty file) and append them."""
+        spec = SERIES[series]
+        market = f"{base}{quote}".upper()
+        lock = self._locks.setdefault((series, market), asyncio.Lock())
+        async with lock:
+            last = self.last_time(series, market)
+            start = last + 1 if last is not None else since
+            fetch = getattr(client, spec.client_method)
+
+            rows: List[Dict[str, Any]] = []
+            page = 1
+            while True:
+                api_result = await fetch(base, quote, start_time=start, end_time=None, page=page, limit=SYNC_PAGE_LIMIT)
+                if api_result.get('code') != 0:
+                    raise CoinExAPIError(api_result.get('code'), api_result.get('message'))
+                data = api_result.get('data') or []
+                rows.extend(data)
+                if not data or not (api_result.get('pagination') or {}).get('has_next'):
+                    break
+                page += 1
+
+            written = self.append(series, market, rows)
+            self._tail_checked[(series, market)] = time.monotonic()
+            return written
+
+    async def refresh_tail(self, client: CoinExClient, series: str, base: str, quote: str = "USDT"):
+        """Fetch the uncached tail for a series that has been backfilled, at most every TAIL_REFRESH_SECONDS."""
+        market = f"{base}{quote}".upper()
+        checked = self._tail_checked.get((series, market))
+        if checked is not None and time.monotonic() - checked < TAIL_REFRESH_SECONDS:
+            return
+        await self.sync(client, series, base, quote)
+
+
+async def run_sync(store: HistoryStore, client: CoinExClient, pairs: List[Tuple[str, str]], series: List[str],
+                   since: Optional[int] = None, concurrency: int = 4) -> Dict[str, Any]:
+    """Backfill every (pair, series) combination with bounded concurrency; returns records written per job."""
+    semaphore = asyncio.Semaphore(concurrency)
+    report: Dict[str, Any] = {}
+
+    async def job(base: str, quote: str, name: str):
+        key = f"{name}:{base}{quote}"
+        async with semaphore:
+            try:
+                report[key] = await store.sync(client, name, base, quote, since)
+            except Exception as e:
+                logging.error("history sync %s failed: %s", key, e)
+                report[key] = f"error: {e}"
+            print(f"{key}: {report[key]}", file=sys.stderr)
+
+    await asyncio.gather(*(job(base, quote, name) for base, quote in pairs for name in series))
+    return report
@@ -0,0 +1,200 @@
+"""
+Upstream rate limiting
+Async primitives that keep request volume and time spent towards api.coinex.com within budget
+"""
+
+import time
+import asyncio
+from collections import deque
+from contextvars import Context, ContextVar
+from typing import Deque, Dict
+
+# Tenant the current MCP request is executed for (set by TenantMiddleware); None outside tenant-aware requests
+current_tenant: ContextVar[str | None] = ContextVar("coinex_current_tenant", default=None)
+# time.monotonic() by which the current MCP request must be answered (set by DeadlineMiddleware)
+current_deadline: ContextVar[float | None] = ContextVar("coinex_current_deadline", default=None)
+
+
+def deadline_remaining(default: float) -> float:
+    """Seconds left before the current request's deadline, capped at default (used without a deadline)."""
+    deadline = current_deadline.get()
+    if deadline is None:
+        return default
+    return max(0.0, min(default, deadline - time.monotonic()))
+
+
+def create_background_task(coro) -> asyncio.Task:
+    """Start coro as a task that outlives the MCP request starting it.
+
+    asyncio.create_task copies the current context, which during a tool call holds that call's deadline and tenant:
+    the task's upstream requests would time out once the call's deadline passed, and be charged to its tenant.
+    The task runs in an empty context instead.
+    """
+    return Context().run(asyncio.create_task, coro)
+
+
+class RateLimiter:
+    """Token bucket limiter.
+
+    - rate: tokens added per second
+    - burst: bucket capacity (defaults to one second worth of tokens)
+    Waiters are served in FIFO order.
+    """
+
+    def __init__(self, rate: float, burst: int | None = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1):
+        """Wait until tokens are available, then consume them."""
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
+
+
+class QueueFullError(Exception):
+    """Raised by ConcurrencyLimiter.acquire() when no slot is free and the wait queue is full."""
+
+
+class ConcurrencyLimiter:
+    """Semaphore with a bounded wait queue.
+
+    - limit: callers allowed to hold a slot at the same time
+    - max_queue: callers allowed to wait for a slot; further callers are rejected immediately
+    """
+
+    def __init__(self, limit: int, max_queue: int):
+        if limit <= 0:
+            raise ValueError("limit must be positive")
+        self.limit = limit
+        self.max_queue = max_queue
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self.limit - self._semaphore._value
+
+    async def acquire(self) -> float:
+        """Take a slot, waiting if needed; returns seconds spent queued.
+        :raises QueueFullError: if all slots are taken and max_queue callers are already waiting
+        """
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            raise QueueFullError(f"{self.in_flight} running, {self.waiting} queued")
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        return time.monotonic() - started
+
+    def release(self):
+        self._semaphore.release()
+
+
+class _TenantState:
+    def __init__(self, weight: float, rate: float | None):
+        self.weight = weight
+        self.in_flight = 0
+        self.vtime = 0.0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.bucket = RateLimiter(rate) if rate else None
+
+
+class FairScheduler:
+    """Weighted fair sharing of upstream request slots between tenants.
+
+    - capacity: upstream requests in flight at once, over all tenants
+    - tenant_limit: requests one tenant may have in flight at once (its bounded share)
+    - max_queue: requests one tenant may have waiting; beyond that acquire() raises QueueFullError
+    - tenant_rate: optional requests per second per tenant
+    - weights: tenant -> weight (default 1); under contention a tenant of weight 2 is served twice as often
+    Freed slots go to the waiting tenant with the smallest virtual time (start-time fair queuing): each grant
+    advances the tenant's virtual time by 1/weight, and a tenant returning from idle starts at the current
+    virtual time, so it cannot bank credit while idle.
+    """
+
+    def __init__(self, capacity: int, tenant_limit: int, max_queue: int, tenant_rate: float | None = None,
+                 weights: Dict[str, float] | None = None):
+        self.capacity = capacity
+        self.tenant_limit = tenant_limit
+        self.max_queue = max_queue
+        self.tenant_rate = tenant_rate
+        self.weights = weights or {}
+        self.in_flight = 0
+        self._vtime = 0.0
+        self._tenants: Dict[str, _TenantState] = {}
+
+    def _tenant(self, tenant: str) -> _TenantState:
+        state = self._tenants.get(tenant)
+        if state is None:
+            state = self._tenants[tenant] = _TenantState(self.weights.get(tenant, 1.0), self.tenant_rate)
+        if not state.in_flight and not state.waiters:
+            state.vtime = max(state.vtime, self._vtime)
+        return state
+
+    def _grant(self, state: _TenantState):
+        state.in_flight += 1
+        self.in_flight += 1
+        self._vtime = state.vtime
+        state.vtime += 1 / state.weight
+
+    def _dispatch(self):
+        while self.in_flight < self.capacity:
+            eligible = [s for s in self._tenants.values() if s.waiters and s.in_flight < self.tenant_limit]
+            if not eligible:
+                return
+            state = min(eligible, key=lambda s: s.vtime)
+            self._grant(state)
+            state.waiters.popleft().set_result(None)
+
+    async def acquire(self, tenant: str) -> float:
+        """Take an upstream slot for tenant; returns seconds spent waiting (rate budget and queue).
+        :raises QueueFullError: if max_queue requests of this tenant are already waiting
+        """
+        state = self._tenant(tenant)
+        started = time.monotonic()
+        if state.bucket is not None:
+            await state.bucket.acquire()
+        # A free slot means no other tenant is eligible and waiting, see _dispatch
+        if not state.waiters and state.in_flight < self.tenant_limit and self.in_flight < self.capacity:
+            self._grant(state)
+            return time.monotonic() - started
+        if len(state.waiters) >= self.max_queue:
+            raise QueueFullError(f"tenant has {state.in_flight} running, {len(state.waiters)} queued")
+
+        future = asyncio.get_running_loop().create_future()
+        state.waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.cancelled():
+                state.waiters.remove(future)
+            else:
+                # Granted just as we were cancelled; hand the slot on
+                self.release(tenant)
+            raise
+        return time.monotonic() - started
+
+    def release(self, tenant: str):
+        state = self._tenants[tenant]
+        state.in_flight -= 1
+        self.in_flight -= 1
+        self._dispatch()
+
+    def state(self) -> Dict[str, Dict[str, int]]:
+        return {tenant: {"in_flight": s.in_flight, "queued": len(s.waiters)} for tenant, s in self._tenants.items()}
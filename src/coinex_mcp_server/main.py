@@ -10,33 +10,44 @@ Notes:
 - All tools return following CoinEx style: { code: int, message: str, data: any }
 """
 
+import re
 import sys
+import math
+import asyncio
+import inspect
 import logging
+import functools
+import time
+from decimal import Decimal
 from typing import Any, Annotated, Literal
 from pydantic import Field, validate_call
 
 from fastmcp import FastMCP
-from fastmcp.server.auth import StaticTokenVerifier
-from fastmcp.server.dependencies import get_http_headers
-from .coinex_client import CoinExClient, validate_environment
+from fastmcp.server.dependencies import get_access_token, get_context, get_http_headers
+from .coinex_client import CoinExClient, close_http_client, validate_environment
+from . import analytics
+from .cache import PersistentCache, SharedCache, TTLCache, default_shared_cache_dir
+from .history_store import HistoryStore, SERIES, default_history_dir, run_sync
+from .limits import RateLimiter
+from .warmup import HOT_DEPTH_PARAMS, Readiness, keep_hot, parse_hot_symbols, warm_up
+from .snapshots import SnapshotReader, default_snapshot_path, start_fetcher
+from .tape import DEFAULT_TAPE_CAPACITY, TapeFeed, parse_windows
+from .subscriptions import ResourceFeed, enable_subscriptions
+from .alerts import ALERT_METRICS, AlertEngine, AlertMonitor
+from .projection import parse_fields, project
+from .pagination import CursorPager
+from .backtest import PERIOD_SECONDS, BacktestSpec, candle_columns, run_many, shutdown_pool
+from .profiler import DEFAULT_LAG_THRESHOLD, LoopLagMonitor, SamplingProfiler
+from .tracing import TRACE_EXPORTERS, configure_tracing, enabled as tracing_enabled, shutdown_tracing, span
+from .metrics import metrics
+from .limits import FairScheduler
+from .middleware import (ConcurrencyLimitMiddleware, DeadlineMiddleware, TenantMiddleware, TracingMiddleware,
+                         parse_tenant_weights, parse_tool_limits, tenant_key)
+from .execution import (BracketStrategy, ExecutionEngine, IcebergStrategy, OCOStrategy, TrailingStopStrategy,
+                        TWAPStrategy)
 import os
 import argparse
 
-# Load .env (won't override externally set environment variables)
-try:
-    from dotenv import load_dotenv, find_dotenv
-    # When started via MCP Inspector, CWD is usually set to project root; find_dotenv is more robust
-    env_path = find_dotenv(usecwd=True)
-    if env_path:
-        load_dotenv(env_path, override=False)
-        print(f"Loaded environment variables from {env_path}", file=sys.stderr)
-    else:
-        print(".env not found, continuing with system environment variables", file=sys.stderr)
-except Exception as e:
-    # Give hint when python-dotenv is not installed or other exceptions occur, but don't block service
-    print(f"Failed to load .env: {e} (you can run pip install python-dotenv)", file=sys.stderr)
-
-
 # Enum field descriptions (for reuse across tool functions)
 MARKET_TYPE_DESC = "Market type: spot|futures|margin; default spot"
 ORDER_SIDE_DESC = "Order side: buy|sell"
@@ -45,9 +56,44 @@ ORDER_STATUS_DESC = "Order status: pending|finished"
 # Initialize FastMCP server
 mcp = FastMCP("coinex-mcp-server")
 
+# Short-lived cache for aggregate tools whose inputs are bulk market snapshots
+SCREENER_TTL_SECONDS = 10
+aggregate_cache = TTLCache(maxsize=64)
+# K-line columns loaded by backtest and the correlation/volatility tools, so repeated runs skip upstream requests
+CANDLE_TTL_SECONDS = 30
+candle_cache = TTLCache(maxsize=256)
+# Processes backtesting markets in parallel (see --backtest-workers); 0 runs them on the event loop
+backtest_workers: int = 0
+
+# Results of tools declared with tool_pipeline(cache_ttl=...), keyed by tool name and arguments
+tool_cache = TTLCache(maxsize=256)
+
+# Snapshots behind the pagination cursors of get_ticker, get_index_price and list_markets
+pager = CursorPager()
+
 # Delayed initialization: decide whether to allow reading credentials from environment based on transport and auth mode
 coinex_client: CoinExClient | None = None
 is_http_like: bool = False
+# Optional local store of backfilled futures history (see `coinex-mcp-server sync`)
+history_store: HistoryStore | None = None
+# Reported by GET /ready in HTTP/SSE mode; set once warm-up (if enabled) has completed
+readiness = Readiness()
+# Shares upstream request slots between tenants in HTTP auth mode (see TenantMiddleware)
+tenant_scheduler: FairScheduler | None = None
+# Trade tapes of markets queried through get_trades_since, polled in the background
+tape_feed: TapeFeed | None = None
+# Alerts registered through create_alert, evaluated by alert_monitor while any are active
+alert_engine = AlertEngine()
+alert_monitor: AlertMonitor | None = None
+# Server-side OCO/bracket/trailing/TWAP/iceberg executions (see place_conditional_order, place_sliced_order)
+execution_engine: ExecutionEngine | None = None
+# Diagnostics behind profile_server / get_event_loop_lag; the lag monitor runs while serving (see --loop-lag-threshold)
+profiler = SamplingProfiler()
+loop_monitor: LoopLagMonitor | None = None
+# Bearer token scope required by the diagnostics tools in HTTP/SSE mode
+ADMIN_SCOPE = "admin"
+# Serve GET /metrics without a bearer token (see --public-metrics)
+public_metrics: bool = False
 
 
 def get_secret_client() -> CoinExClient:
@@ -69,7 +115,8 @@ def get_secret_client() -> CoinExClient:
                 "Request headers must include X-CoinEx-Access-Id and X-CoinEx-Secret-Key to access account/trading interfaces"
             )
 
-        return CoinExClient(access_id=access_id, secret_key=secret_key, enable_env_credentials=False)
+        return CoinExClient(access_id=access_id, secret_key=secret_key, enable_env_credentials=False,
+                            scheduler=tenant_scheduler)
     else:
         # stdio mode - use global client with environment credentials
         if coinex_client is None:
@@ -84,37 +131,198 @@ def get_secret_client() -> CoinExClient:
         return coinex_client
 
 
+def tool_pipeline(preset: list[str] | None = None, cache_ttl: float | None = None):
+    """Shared call pipeline of every tool, applied under @mcp.tool.
+
+    In one pass around the tool body it:
+    - adds a `fields` argument (and `summary`, when the tool has a preset) that prunes the data of the result,
+      into new objects so cached responses are never modified;
+    - serves repeated calls with equal arguments from tool_cache for cache_ttl seconds (only code 0 results,
+      concurrent identical calls share one execution);
+    - times the call and counts it by outcome in metrics (tool_seconds, tool_calls_total), inside an "mcp.tool"
+      trace span carrying the result code;
+    - logs results with a non-zero code and exceptions once, lazily formatted with structured extra fields.
+    Exceptions (e.g. missing credentials) are re-raised unchanged.
+    """
+    def decorator(fn):
+        name = fn.__name__
+        signature = inspect.signature(fn)
+
+        async def call(args, kwargs):
+            if not cache_ttl:
+                return await fn(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = (name, tuple((k, repr(v)) for k, v in bound.arguments.items()))
+            return await tool_cache.get_or_load(key, lambda: fn(*args, **kwargs), cache_ttl,
+                                                cache_if=lambda r: isinstance(r, dict) and r.get("code") == 0)
+
+        @functools.wraps(fn)
+        async def wrapper(*args, fields: list[str] | None = None, summary: bool = False, **kwargs):
+            selected = fields or (preset if summary else None)
+            try:
+                tree = parse_fields(selected) if selected else None
+            except ValueError as e:
+                return {"code": -1, "message": str(e), "data": None}
+
+            started = time.perf_counter()
+            with span("mcp.tool", {"mcp.tool": name}) as tool_span:
+                try:
+                    result = await call(args, kwargs)
+                except Exception as e:
+                    elapsed = time.perf_counter() - started
+                    metrics.observe("tool_seconds", elapsed, tool=name)
+                    metrics.inc("tool_calls_total", tool=name, outcome="exception")
+                    logging.error("%s failed, message:%s", name, e,
+                                  extra={"tool": name, "duration_ms": round(elapsed * 1000, 3)})
+                    raise
+                code = result.get("code") if isinstance(result, dict) else 0
+                tool_span.set_attribute("coinex.code", code)
+            elapsed = time.perf_counter() - started
+            metrics.observe("tool_seconds", elapsed, tool=name)
+
+            metrics.inc("tool_calls_total", tool=name, outcome="ok" if code == 0 else "error")
+            if code != 0:
+                logging.error("%s error, code:%s, message:%s", name, code, result.get("message"),
+                              extra={"tool": name, "code": code, "duration_ms": round(elapsed * 1000, 3)})
+            elif tree and result.get("data") is not None:
+                result = {**result, "data": project(result["data"], tree)}
+            return result
+
+        extra = {"fields": Annotated[list[str] | None, Field(
+            description="Optional, only return these keys of data (dotted paths such as 'depth.asks', "
+                        "'*' for every key of a mapping)")]}
+        if preset:
+            extra["summary"] = Annotated[bool, Field(
+                description=f"Only return the commonly used fields ({', '.join(preset)}); default false")]
+        wrapper.__signature__ = signature.replace(parameters=[
+            *signature.parameters.values(),
+            *(inspect.Parameter(arg, inspect.Parameter.KEYWORD_ONLY, default=None if arg == "fields" else False,
+                                annotation=annotation) for arg, annotation in extra.items()),
+        ])
+        wrapper.__annotations__ = {**fn.__annotations__, **extra}
+        return wrapper
+
+    return decorator
+
+
+def _next_page(cursor: str) -> dict[str, Any]:
+    """Next page of a paginated result, from its snapshot."""
+    try:
+        return pager.page(cursor)
+    except ValueError as e:
+        return {"code": -1, "message": str(e), "data": None}
+
+
+def _quoted(entries: list[dict], quote: str | None) -> list[dict]:
+    """Entries of an all-markets snapshot whose market is quoted in quote (all of them when quote is empty).
+
+    CoinEx only filters by a full market name, so list calls fetch every market and filter here.
+    """
+    if not quote:
+        return entries
+    quote = quote.upper()
+    return [entry for entry in entries if str(entry.get('market', '')).endswith(quote)]
+
+
+async def _history_from_store(series: str, base: str, quote: str, start_time: int | None, end_time: int | None,
+                              page: int | None, limit: int | None) -> dict[str, Any] | None:
+    """Answer a history query from the local store when the market has been backfilled and covers start_time.
+
+    Only the tail newer than the last stored record is requested upstream. Returns None to fall back to the API.
+    """
+    market = f"{base}{quote}".upper()
+    if history_store is None or not history_store.has(series, market):
+        return None
+    first = history_store.first_time(series, market)
+    if first is None or (start_time is not None and start_time < first):
+        return None
+
+    last = history_store.last_time(series, market)
+    if end_time is None or end_time > last:
+        try:
+            await history_store.refresh_tail(coinex_client, series, base, quote)
+        except Exception as e:
+            logging.warning("history tail refresh failed for %s:%s, serving local data: %s", series, market, e)
+
+    page, limit = page or 1, limit or 100
+    rows = history_store.query(series, market, start_time, end_time, offset=(page - 1) * limit, limit=limit + 1)
+    return {"code": 0, "message": "OK", "data": rows[:limit], "pagination": {"has_next": len(rows) > limit}}
+
+
+@mcp.custom_route("/ready", methods=["GET"])
+async def ready_endpoint(request):
+    """Readiness probe: 503 until warm-up has completed, so load balancers skip cold workers."""
+    from starlette.responses import JSONResponse
+    status = 200 if readiness.ready else 503
+    return JSONResponse({"ready": readiness.ready, "warmup": readiness.report}, status_code=status)
+
+
+async def _metrics_authorized(request) -> bool:
+    """Custom routes bypass the MCP auth provider: check the request's bearer token against it here."""
+    if public_metrics:
+        return True
+    if mcp.auth is None:
+        return False
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    return scheme.lower() == "bearer" and bool(token) and await mcp.auth.verify_token(token) is not None
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics_endpoint(request):
+    """Tool latency, queueing and rejection metrics of this server process.
+
+    They include tenant names and queue state, so a bearer token (API_TOKEN) is required unless --public-metrics.
+    """
+    from starlette.responses import JSONResponse
+    if not await _metrics_authorized(request):
+        return JSONResponse({"error": "unauthorized"}, status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    return JSONResponse(metrics.snapshot())
+
+
 # =====================
 # Public Market Queries (spot/futures)
 # =====================
 @mcp.tool(tags={"public"})
+@tool_pipeline(["market", "last", "open", "high", "low", "volume", "value"])
 @validate_call
 async def get_ticker(
     base: Annotated[str | None, Field(description="Base currency, e.g. BTC, ETH; returns top 5 when empty")] = None,
     quote: Annotated[str, Field(description="Quote currency, default USDT")] = "USDT",
     market_type: Annotated[CoinExClient.MarketType, Field(description=MARKET_TYPE_DESC)] = CoinExClient.MarketType.SPOT,
+    page_size: Annotated[int | None, Field(description="Optional, page through all entries with this page size", ge=1, le=1000)] = None,
+    cursor: Annotated[str | None, Field(description="Optional, pagination.next_cursor of the previous page; other arguments are then ignored")] = None,
 ) -> dict[str, Any]:
     """Get trading pair's recent price, 24h price and volume information (spot).
 
     Parameters:
     - base: Optional, base currency like "BTC", "ETH". When not provided, returns top 5 entries.
-    - quote: Optional, quote currency, default "USDT".
+    - quote: Optional, quote currency, default "USDT"; without base, an empty quote covers every quote currency.
+    - page_size: Optional, when base is not provided, page through all tickers sorted by 24h value (descending).
+    - cursor: Optional, continue from the previous page.
 
-    Returns: {code, message, data}; when base is not provided, only returns top 5 items.
+    Returns: {code, message, data, age_ms}; when base is not provided, only returns top 5 items. age_ms is the age of cached data, which may be briefly stale while it is refreshed.
+    With page_size or cursor, also pagination: {total, offset, has_next, next_cursor}.
     """
-    api_result = await coinex_client.get_tickers(base, quote, market_type)
+    if cursor:
+        return _next_page(cursor)
+    api_result = await coinex_client.get_tickers(base, quote if base else None, market_type)
 
     if api_result.get('code') != 0 or 'data' not in api_result:
-        logging.error(f"get_ticker error, code:{api_result.get('code')}, message:{api_result.get('message')}")
         return api_result
 
     data = api_result['data']
     if not base and isinstance(data, list):
-        api_result['data'] = data[:5]
+        data = _quoted(data, quote)
+        if page_size:
+            ranked = sorted(data, key=lambda ticker: float(ticker.get('value') or 0), reverse=True)
+            return pager.first(ranked, page_size, api_result.get('age_ms'))
+        api_result = {**api_result, 'data': data[:5]}
     return api_result
 
 
 @mcp.tool(tags={"public"})
+@tool_pipeline(["market", "depth.asks", "depth.bids", "depth.last"])
 @validate_call
 async def get_orderbook(
     base: Annotated[str, Field(description="Required, base currency, e.g. BTC, ETH")],
@@ -136,12 +344,11 @@ async def get_orderbook(
     """
     api_result = await coinex_client.get_depth(base, quote, market_type, limit or 20, interval or "0")
 
-    if api_result.get('code') != 0 or 'data' not in api_result:
-        logging.error(f"get_depth error, code:{api_result.get('code')}, message:{api_result.get('message')}")
     return api_result
 
 
 @mcp.tool(tags={"public"})
+@tool_pipeline(["created_at", "open", "close", "high", "low", "volume"])
 @validate_call
 async def get_kline(
     base: Annotated[str, Field(description="Required, base currency, e.g. BTC, ETH")],
@@ -173,8 +380,6 @@ async def get_kline(
 
     api_result = await coinex_client.get_kline(str(period), base, quote, market_type, limit)
 
-    if api_result.get('code') != 0 or 'data' not in api_result:
-        logging.error(f"get_kline error, code:{api_result.get('code')}, message:{api_result.get('message')}")
     return api_result
 
 
@@ -183,28 +388,42 @@ async def get_kline(
 # ===============
 
 @mcp.tool(tags={"public"})
+@tool_pipeline(["market", "base_ccy", "quote_ccy", "min_amount", "base_ccy_precision", "quote_ccy_precision"])
 @validate_call
 async def list_markets(
     market_type: Annotated[CoinExClient.MarketType, Field(description=MARKET_TYPE_DESC)] = CoinExClient.MarketType.SPOT,
     base: Annotated[str | None, Field(description="Optional; base currency to filter")] = None,
     quote: Annotated[str, Field(description="Quote currency, default USDT")] = "USDT",
+    page_size: Annotated[int | None, Field(description="Optional, page through all entries with this page size", ge=1, le=1000)] = None,
+    cursor: Annotated[str | None, Field(description="Optional, pagination.next_cursor of the previous page; other arguments are then ignored")] = None,
 ) -> dict[str, Any]:
     """List market status (spot/futures).
 
     Parameters:
     - market_type: Optional, default "spot"; options: "spot" | "futures".
     - base: Optional, base currency to filter.
-    - quote: Optional, quote currency, default "USDT".
+    - quote: Optional, quote currency, default "USDT"; without base, an empty quote lists every quote currency.
+    - page_size: Optional, page through the markets sorted by name instead of returning all at once.
+    - cursor: Optional, continue from the previous page.
 
-    Returns: {code, message, data} (list).
+    Returns: {code, message, data, age_ms} (list); age_ms is the age of cached data.
+    With page_size or cursor, also pagination: {total, offset, has_next, next_cursor}.
     """
-    api_result = await coinex_client.get_market_info(base, quote, market_type)
+    if cursor:
+        return _next_page(cursor)
+    api_result = await coinex_client.get_market_info(base, quote if base else None, market_type)
     if api_result.get('code') != 0 or 'data' not in api_result:
-        logging.error(f"list_markets error, code:{api_result.get('code')}, message:{api_result.get('message')}")
+        return api_result
+    if not base and isinstance(api_result['data'], list):
+        api_result = {**api_result, 'data': _quoted(api_result['data'], quote)}
+    if page_size and isinstance(api_result['data'], list):
+        ranked = sorted(api_result['data'], key=lambda market: market.get('market') or "")
+        return pager.first(ranked, page_size, api_result.get('age_ms'))
     return api_result
 
 
 @mcp.tool(tags={"public"})
+@tool_pipeline(["deal_id", "created_at", "side", "price", "amount"])
 @validate_call
 async def get_deals(
     base: Annotated[str, Field(description="Required, base currency, e.g. BTC, ETH")],
@@ -224,43 +443,409 @@ async def get_deals(
     """
     api_result = await coinex_client.get_deal(base, quote, market_type, limit)
 
-    if api_result.get('code') != 0 or 'data' not in api_result:
-        logging.error(f"get_deals error, code:{api_result.get('code')}, message:{api_result.get('message')}")
     return api_result
 
 
 @mcp.tool(tags={"public"})
+@tool_pipeline()
+@validate_call
+async def get_trades_since(
+    base: Annotated[str, Field(description="Required, base currency, e.g. BTC, ETH")],
+    quote: Annotated[str, Field(description="Quote currency, default USDT")] = "USDT",
+    market_type: Annotated[CoinExClient.MarketType, Field(description=MARKET_TYPE_DESC)] = CoinExClient.MarketType.SPOT,
+    deal_id: Annotated[int | None, Field(description="Optional; only return trades with a larger deal_id")] = None,
+    since: Annotated[int | None, Field(description="Optional; only return trades created after this timestamp (ms)")] = None,
+    limit: Annotated[int | None, Field(description="Return quantity, default 100, max 1000")] = 100,
+) -> dict[str, Any]:
+    """Get trades newer than a deal_id or timestamp from the server's trade tape, plus rolling aggregates.
+
+    The first call for a market loads its latest trades; the server then keeps polling them,
+    so repeated calls passing the last seen deal_id return only the new trades. At most 50 markets are
+    polled at once; beyond that the least recently queried market is dropped and reloaded on its next call.
+
+    Parameters:
+    - base: Required, base currency.
+    - quote: Optional, quote currency, default "USDT".
+    - market_type: Optional, default "spot"; options: "spot" | "futures".
+    - deal_id: Optional, return trades after this deal_id (takes precedence over since).
+    - since: Optional, return trades created after this timestamp in milliseconds.
+    - limit: Optional, return quantity, default 100, max 1000; oldest trades first.
+      Without deal_id and since, the latest limit trades are returned.
+
+    Returns: {code, message, data}, data = {trades, last_id, has_more, truncated, windows};
+    truncated is true when the tape no longer holds all trades after the given point,
+    windows lists trade_count, volume, buy_volume, sell_volume and vwap per window.
+    """
+    global tape_feed
+    if tape_feed is None:
+        tape_feed = TapeFeed(coinex_client)
+    limit = min(limit or 100, 1000)
+    try:
+        tape = await tape_feed.tape(base, quote, market_type)
+    except Exception as e:
+        return {"code": -1, "message": str(e), "data": None}
+
+    trades, truncated = tape.since(deal_id, None if deal_id is not None else since, limit=limit + 1)
+    has_more = len(trades) > limit
+    if deal_id is None and since is None:
+        # Latest trades: what is left out is older, not newer
+        trades, has_more = trades[-limit:], False
+    else:
+        trades = trades[:limit]
+    return {"code": 0, "message": "OK", "data": {
+        "trades": trades,
+        "last_id": int(trades[-1]["deal_id"]) if trades else max(deal_id or 0, tape.last_id),
+        "has_more": has_more,
+        "truncated": truncated,
+        "windows": tape.aggregates(),
+    }}
+
+
+@mcp.tool(tags={"public"})
+@tool_pipeline(["market", "price"])
 @validate_call
 async def get_index_price(
     market_type: Annotated[CoinExClient.MarketType, Field(description=MARKET_TYPE_DESC)] = CoinExClient.MarketType.SPOT,
     base: Annotated[str | None, Field(description="Optional; base currency, returns multi-market index if not provided")] = None,
     quote: Annotated[str, Field(description="Quote currency, default USDT")] = "USDT",
     top_n: Annotated[int | None, Field(description="Return top N entries when base not provided; default 5")] = 5,
+    page_size: Annotated[int | None, Field(description="Optional, page through all entries with this page size", ge=1, le=1000)] = None,
+    cursor: Annotated[str | None, Field(description="Optional, pagination.next_cursor of the previous page; other arguments are then ignored")] = None,
 ) -> dict[str, Any]:
     """Get market index price (spot/futures). Supports batch; returns top N entries when base not provided.
 
     Parameters:
     - market_type: Optional, default "spot"; options: "spot" | "futures".
     - base: Optional, base currency; returns multi-market index when not provided.
-    - quote: Optional, quote currency, default "USDT".
+    - quote: Optional, quote currency, default "USDT"; without base, an empty quote covers every quote currency.
     - top_n: Optional, only effective when base not provided; default 5.
+    - page_size: Optional, when base is not provided, page through all index prices sorted by market.
+    - cursor: Optional, continue from the previous page.
 
-    Returns: {code, message, data}.
+    Returns: {code, message, data, age_ms}; age_ms is the age of cached data.
+    With page_size or cursor, also pagination: {total, offset, has_next, next_cursor}.
     """
-    api_result = await coinex_client.get_index_price(base, quote, market_type)
+    if cursor:
+        return _next_page(cursor)
+    api_result = await coinex_client.get_index_price(base, quote if base else None, market_type)
 
     if api_result.get('code') != 0 or 'data' not in api_result:
-        logging.error(f"get_index_price error, code:{api_result.get('code')}, message:{api_result.get('message')}")
         return api_result
 
-    if not base and isinstance(api_result.get('data'), list) and top_n:
-        api_result['data'] = api_result['data'][:top_n]
+    if not base and isinstance(api_result.get('data'), list):
+        indexes = _quoted(api_result['data'], quote)
+        if page_size:
+            ranked = sorted(indexes, key=lambda index: index.get('market') or "")
+            return pager.first(ranked, page_size, api_result.get('age_ms'))
+        api_result = {**api_result, 'data': indexes[:top_n] if top_n else indexes}
     return api_result
 
 
+@mcp.tool(tags={"public"})
+@tool_pipeline(cache_ttl=SCREENER_TTL_SECONDS)
+@validate_call
+async def scan_markets(
+    market_type: Annotated[CoinExClient.MarketType, Field(description=MARKET_TYPE_DESC)] = CoinExClient.MarketType.SPOT,
+    quote: Annotated[str | None, Field(description="Only scan markets quoted in this currency; default USDT, empty for all")] = "USDT",
+    filters: Annotated[list[str] | None, Field(description="Optional filter expressions, e.g. ['value>=1000000', 'change_pct<-5']")] = None,
+    sort_by: Annotated[
+        Literal["last", "volume", "value", "change_pct", "range_pct", "premium_pct", "funding_rate"],
+        Field(description="Metric to rank by; default value (24h turnover)")
+    ] = "value",
+    order: Annotated[Literal["desc", "asc"], Field(description="desc for top, asc for bottom; default desc")] = "desc",
+    top_k: Annotated[int, Field(description="Number of markets to return; default 10", ge=1, le=200)] = 10,
+) -> dict[str, Any]:
+    """Scan the full spot or futures ticker universe and return the top markets by a metric.
+
+    Description: The whole ticker list (plus funding rates for futures) is loaded once into columns;
+    filters are applied column-wise and the top_k rows are selected with a heap.
+
+    Parameters:
+    - market_type: Optional, default "spot"; options: "spot" | "futures".
+    - quote: Optional, default "USDT"; empty string scans every quote currency.
+    - filters: Optional, list of "<metric><op><number>", op in > >= < <= == !=.
+    - sort_by: Optional, one of last, volume, value, change_pct, range_pct (24h high/low range),
+      premium_pct (futures mark vs index), funding_rate (futures); default "value".
+    - order: Optional, "desc" | "asc"; default "desc".
+    - top_k: Optional, default 10.
+
+    Returns: {code, message, data: {scanned, markets}}. Invalid filters return code -1.
+    """
+    requests = [coinex_client.get_tickers(None, None, market_type)]
+    if market_type == CoinExClient.MarketType.FUTURES:
+        requests.append(coinex_client.futures_get_funding_rate(None, None))
+    results = await asyncio.gather(*requests)
+
+    for api_result in results:
+        if api_result.get('code') != 0 or 'data' not in api_result:
+            return api_result
+
+    funding_rates = results[1]['data'] if len(results) > 1 else None
+    columns = analytics.ticker_columns(results[0]['data'], funding_rates, quote.upper() if quote else None)
+    try:
+        rows = analytics.scan(columns, filters or [], sort_by, order == "desc", top_k)
+    except ValueError as e:
+        return {"code": -1, "message": str(e)}
+
+    return {"code": 0, "message": "OK", "data": {
+        "scanned": len(columns["market"]),
+        "markets": rows,
+    }}
+
+
+async def _load_candles(bases: list[str], quote: str, period: str, limit: int, market_type: CoinExClient.MarketType,
+                        tool: str) -> tuple[dict[str, dict], dict[str, dict]]:
+    """K-line columns of several markets, fetched concurrently through candle_cache.
+
+    Returns ({market: columns}, {market: {"error": ...}}) in the order of bases.
+    """
+    quote = quote.upper()
+    bases = list(dict.fromkeys(base.upper() for base in bases))
+
+    async def load(base: str):
+        async def fetch():
+            api_result = await coinex_client.get_kline(str(period), base, quote, market_type, limit)
+            if api_result.get('code') != 0 or 'data' not in api_result:
+                return api_result
+            return candle_columns(api_result['data'])
+
+        return await candle_cache.get_or_load((market_type.value, base + quote, period, limit), fetch,
+                                              CANDLE_TTL_SECONDS, cache_if=lambda v: "close" in v)
+
+    loaded = await asyncio.gather(*(load(base) for base in bases))
+    columns_by_market, errors = {}, {}
+    for base, columns in zip(bases, loaded):
+        if "close" in columns:
+            columns_by_market[base + quote] = columns
+        else:
+            logging.error("%s error, code:%s, message:%s", tool, columns.get('code'), columns.get('message'),
+                          extra={"tool": tool, "code": columns.get('code')})
+            errors[base + quote] = {"error": f"code:{columns.get('code')}, message:{columns.get('message')}"}
+    return columns_by_market, errors
+
+
+@mcp.tool(tags={"public"})
+@tool_pipeline()
+@validate_call
+async def backtest(
+    markets: Annotated[list[str], Field(description="Base currencies to test, e.g. ['BTC', 'ETH']", min_length=1, max_length=50)],
+    entry: Annotated[str, Field(description="Entry rule, e.g. 'sma(10) crosses_above sma(30)', 'rsi(14) < 30'")],
+    exit: Annotated[str, Field(description="Exit rule, e.g. 'sma(10) crosses_below sma(30)', 'rsi(14) > 70'")],
+    quote: Annotated[str, Field(description="Quote currency, default USDT")] = "USDT",
+    period: Annotated[
+        Literal["1min", "5min", "15min", "30min", "1hour", "4hour", "1day", "1week"],
+        Field(description="K-line period; default 1hour")
+    ] = "1hour",
+    limit: Annotated[int, Field(description="Number of candles per market; default 500", ge=10, le=1000)] = 500,
+    market_type: Annotated[CoinExClient.MarketType, Field(description=MARKET_TYPE_DESC)] = CoinExClient.MarketType.SPOT,
+    side: Annotated[Literal["long", "short"], Field(description="Position direction; default long")] = "long",
+    position_pct: Annotated[float, Field(description="Percent of equity per trade; default 100", gt=0, le=100)] = 100,
+    fee_rate: Annotated[float, Field(description="Fee rate per fill; default 0.002", ge=0, lt=1)] = 0.002,
+    stop_loss_pct: Annotated[float | None, Field(description="Optional stop loss, percent from entry", gt=0)] = None,
+    take_profit_pct: Annotated[float | None, Field(description="Optional take profit, percent from entry", gt=0)] = None,
+) -> dict[str, Any]:
+    """Backtest a rule-based strategy over recent K-lines of one or many markets.
+
+    Description: Candles are loaded once per market into columns (and cached for a short while), indicators are
+    computed column-wise, and markets are simulated in parallel in a process pool (see --backtest-workers).
+    Positions open and close at the close of the signal bar; stop loss / take profit trigger on the bar's high/low.
+
+    Parameters:
+    - markets: Required, list of base currencies, e.g. ["BTC", "ETH"].
+    - entry / exit: Required, "<operand> <op> <operand>"; op in > >= < <= crosses_above crosses_below;
+      operand is a number, open/high/low/close/volume, or sma(n)/ema(n)/rsi(n) of close.
+    - quote: Optional, default "USDT".
+    - period: Optional, default "1hour".
+    - limit: Optional, candles per market, 10-1000, default 500.
+    - market_type: Optional, default "spot"; options: "spot" | "futures".
+    - side: Optional, "long" | "short"; default "long".
+    - position_pct: Optional, percent of equity committed per trade, default 100.
+    - fee_rate: Optional, charged on entry and exit notional, default 0.002.
+    - stop_loss_pct / take_profit_pct: Optional.
+
+    Returns: {code, message, data: {markets: {market: stats}}}; stats has total_return_pct, buy_and_hold_pct,
+    max_drawdown_pct, sharpe (annualised), trades, win_rate_pct, avg_trade_pct, exposure_pct.
+    Invalid rules return code -1.
+    """
+    spec = BacktestSpec(entry, exit, side, position_pct, fee_rate, stop_loss_pct, take_profit_pct,
+                        365 * 86400 / PERIOD_SECONDS[period])
+    try:
+        spec.validate()
+    except ValueError as e:
+        return {"code": -1, "message": str(e), "data": None}
+
+    columns_by_market, errors = await _load_candles(markets, quote, period, limit, market_type, "backtest")
+
+    try:
+        results = await run_many(spec, columns_by_market, backtest_workers)
+    except Exception as e:
+        return {"code": -1, "message": str(e), "data": None}
+    return {"code": 0, "message": "OK", "data": {"markets": {**results, **errors}}}
+
+
+def _round(value: float, digits: int = 6) -> float | None:
+    """Round for output; NaN (undefined statistic) becomes null."""
+    return None if value != value else round(value, digits)
+
+
+@mcp.tool(tags={"public"})
+@tool_pipeline()
+@validate_call
+async def get_correlation_matrix(
+    markets: Annotated[list[str], Field(description="Base currencies, e.g. ['BTC', 'ETH', 'SOL']", min_length=2, max_length=200)],
+    quote: Annotated[str, Field(description="Quote currency, default USDT")] = "USDT",
+    period: Annotated[
+        Literal["1min", "5min", "15min", "30min", "1hour", "4hour", "1day", "1week"],
+        Field(description="K-line period; default 1day")
+    ] = "1day",
+    limit: Annotated[int, Field(description="Number of candles per market; default 200", ge=10, le=1000)] = 200,
+    market_type: Annotated[CoinExClient.MarketType, Field(description=MARKET_TYPE_DESC)] = CoinExClient.MarketType.SPOT,
+    include_covariance: Annotated[bool, Field(description="Also return the covariance matrix; default false")] = False,
+) -> dict[str, Any]:
+    """Correlation (and optionally covariance) matrix of log returns across markets.
+
+    Description: Candles of all markets are fetched concurrently (and cached for a short while), aligned on the
+    timestamps every market has, and turned into return columns; each matrix cell is one dot product.
+
+    Parameters:
+    - markets: Required, list of 2-200 base currencies.
+    - quote: Optional, default "USDT".
+    - period: Optional, default "1day".
+    - limit: Optional, candles per market, 10-1000, default 200.
+    - market_type: Optional, default "spot"; options: "spot" | "futures".
+    - include_covariance: Optional, default false.
+
+    Returns: {code, message, data: {markets, aligned_bars, start_time, end_time, volatility_pct (annualized),
+    correlation, covariance?, errors}}; matrix rows and columns follow data.markets.
+    """
+    columns_by_market, errors = await _load_candles(markets, quote, period, limit, market_type,
+                                                    "get_correlation_matrix")
+
+    def compute():
+        timestamps, closes = analytics.align_closes(columns_by_market)
+        if len(closes) < 2 or len(timestamps) < 3:
+            return timestamps, None
+        returns = {market: analytics.log_returns(column) for market, column in closes.items()}
+        return timestamps, analytics.covariance_matrix(returns)
+
+    # The dot products take about a second at 200 markets x 1000 candles; keep them off the event loop
+    timestamps, matrix = await asyncio.to_thread(compute)
+    if matrix is None:
+        return {"code": -1, "message": "Need at least 2 markets with 3 common candles", "data": {"errors": errors}}
+    names, covariance, correlation = matrix
+    annualize = math.sqrt(365 * 86400 / PERIOD_SECONDS[period])
+    data = {
+        "markets": names,
+        "aligned_bars": len(timestamps),
+        "start_time": int(timestamps[0]),
+        "end_time": int(timestamps[-1]),
+        "volatility_pct": {m: _round(math.sqrt(covariance[i][i]) * annualize * 100, 4) for i, m in enumerate(names)},
+        "correlation": [[_round(v, 4) for v in row] for row in correlation],
+        "errors": errors,
+    }
+    if include_covariance:
+        data["covariance"] = [[_round(v, 10) for v in row] for row in covariance]
+    return {"code": 0, "message": "OK", "data": data}
+
+
+@mcp.tool(tags={"public"})
+@tool_pipeline()
+@validate_call
+async def get_volatility(
+    markets: Annotated[list[str], Field(description="Base currencies, e.g. ['BTC', 'ETH']", min_length=1, max_length=200)],
+    quote: Annotated[str, Field(description="Quote currency, default USDT")] = "USDT",
+    period: Annotated[
+        Literal["1min", "5min", "15min", "30min", "1hour", "4hour", "1day", "1week"],
+        Field(description="K-line period; default 1day")
+    ] = "1day",
+    limit: Annotated[int, Field(description="Number of candles per market; default 200", ge=10, le=1000)] = 200,
+    window: Annotated[int, Field(description="Rolling window in candles; default 20", ge=2, le=500)] = 20,
+    market_type: Annotated[CoinExClient.MarketType, Field(description=MARKET_TYPE_DESC)] = CoinExClient.MarketType.SPOT,
+) -> dict[str, Any]:
+    """Realized volatility of log returns per market, over the whole sample and a rolling window.
+
+    Parameters:
+    - markets: Required, list of 1-200 base currencies.
+    - quote: Optional, default "USDT".
+    - period: Optional, default "1day".
+    - limit: Optional, candles per market, 10-1000, default 200.
+    - window: Optional, rolling window in candles, default 20.
+    - market_type: Optional, default "spot"; options: "spot" | "futures".
+
+    Returns: {code, message, data: {markets: {market: {bars, return_pct, volatility_pct, rolling_volatility_pct,
+    max_rolling_volatility_pct}}}}; volatilities are annualized percentages, rolling ones over the last window.
+    """
+    columns_by_market, errors = await _load_candles(markets, quote, period, limit, market_type, "get_volatility")
+    annualize = math.sqrt(365 * 86400 / PERIOD_SECONDS[period]) * 100
+
+    results: dict[str, Any] = {}
+    for market, columns in columns_by_market.items():
+        close = columns["close"]
+        returns = analytics.log_returns(close)
+        rolling = [v for v in analytics.rolling_volatility(returns, window) if v == v]
+        volatility = analytics.rolling_volatility(returns, len(returns))[-1] if len(returns) > 1 else math.nan
+        results[market] = {
+            "bars": len(close),
+            "return_pct": _round((close[-1] / close[0] - 1) * 100, 4) if close[0] else None,
+            "volatility_pct": _round(volatility * annualize, 4),
+            "rolling_volatility_pct": _round(rolling[-1] * annualize, 4) if rolling else None,
+            "max_rolling_volatility_pct": _round(max(rolling) * annualize, 4) if rolling else None,
+        }
+    return {"code": 0, "message": "OK", "data": {"markets": {**results, **errors}}}
+
+
 # ====== Futures-Specific ======
 
 @mcp.tool(tags={"public"})
+@tool_pipeline()
+@validate_call
+async def screen_funding_basis(
+    quote: Annotated[str, Field(description="Quote currency of futures markets, default USDT")] = "USDT",
+    sort_by: Annotated[
+        Literal["annualized_funding_pct", "funding_rate", "basis_pct", "spot_perp_spread_pct"],
+        Field(description="Metric ranked by absolute value; default annualized_funding_pct")
+    ] = "annualized_funding_pct",
+    top_k: Annotated[int, Field(description="Number of markets to return; default 20", ge=1, le=200)] = 20,
+    min_abs: Annotated[float, Field(description="Optional, only markets whose |sort_by| is at least this value", ge=0)] = 0,
+) -> dict[str, Any]:
+    """Screen all futures markets for funding-rate and basis arbitrage (futures only).
+
+    Description: Futures tickers, funding rates of all markets and spot tickers are fetched in bulk,
+    joined by market and computed in one pass; the joined snapshot is cached for a few seconds.
+
+    Parameters:
+    - quote: Optional, default "USDT".
+    - sort_by: Optional, annualized_funding_pct | funding_rate | basis_pct (mark vs index) |
+      spot_perp_spread_pct (futures last vs spot last); ranked by absolute value.
+    - top_k: Optional, default 20.
+    - min_abs: Optional, default 0.
+
+    Returns: {code, message, data: {markets, cached_for_seconds}}.
+    """
+    quote = quote.upper()
+
+    async def load():
+        results = await asyncio.gather(
+            coinex_client.get_tickers(None, None, CoinExClient.MarketType.FUTURES),
+            coinex_client.futures_get_funding_rate(None, None),
+            coinex_client.get_tickers(None, None, CoinExClient.MarketType.SPOT),
+        )
+        for api_result in results:
+            if api_result.get('code') != 0 or 'data' not in api_result:
+                return api_result
+        return analytics.funding_basis_columns(results[0]['data'], results[1]['data'], results[2]['data'], quote)
+
+    columns = await aggregate_cache.get_or_load(("funding_basis", quote), load, SCREENER_TTL_SECONDS,
+                                                cache_if=lambda v: "market" in v)
+    if "market" not in columns:
+        return columns
+
+    rows = analytics.screen(columns, sort_by, top_k, min_abs)
+    return {"code": 0, "message": "OK", "data": {"markets": rows, "cached_for_seconds": SCREENER_TTL_SECONDS}}
+
+
+@mcp.tool(tags={"public"})
+@tool_pipeline(["market", "latest_funding_rate", "next_funding_rate", "next_funding_time"])
 async def get_funding_rate(
     base: Annotated[str, Field(description="Required, futures base currency, e.g. BTC, ETH")],
     quote: Annotated[str, Field(description="Quote currency, default USDT")] = "USDT"
@@ -271,15 +856,14 @@ async def get_funding_rate(
     - base: Required, futures base currency, e.g. "BTC", "ETH".
     - quote: Optional, quote currency, default "USDT".
 
-    Returns: {code, message, data}.
+    Returns: {code, message, data, age_ms}; age_ms is the age of cached data.
     """
     api_result = await coinex_client.futures_get_funding_rate(base, quote)
-    if api_result.get('code') != 0 or 'data' not in api_result:
-        logging.error(f"get_funding_rate error, code:{api_result.get('code')}, message:{api_result.get('message')}")
     return api_result
 
 
 @mcp.tool(tags={"public"})
+@tool_pipeline()
 async def get_funding_rate_history(
     base: Annotated[str, Field(description="Required, futures base currency, e.g. BTC, ETH")],
     quote: Annotated[str, Field(description="Quote currency, default USDT")] = "USDT",
@@ -300,13 +884,16 @@ async def get_funding_rate_history(
 
     Returns: {code, message, data}.
     """
+    local_result = await _history_from_store("funding", base, quote, start_time, end_time, page, limit)
+    if local_result is not None:
+        return local_result
+
     api_result = await coinex_client.futures_get_funding_rate_history(base, quote, start_time, end_time, page, limit)
-    if api_result.get('code') != 0 or 'data' not in api_result:
-        logging.error(f"get_funding_rate_history error, code:{api_result.get('code')}, message:{api_result.get('message')}")
     return api_result
 
 
 @mcp.tool(tags={"public"})
+@tool_pipeline()
 async def get_premium_index_history(
     base: Annotated[str, Field(description="Required, futures base currency")],
     quote: Annotated[str, Field(description="Quote currency, default USDT")] = "USDT",
@@ -327,13 +914,16 @@ async def get_premium_index_history(
 
     Returns: {code, message, data}.
     """
+    local_result = await _history_from_store("premium", base, quote, start_time, end_time, page, limit)
+    if local_result is not None:
+        return local_result
+
     api_result = await coinex_client.futures_get_premium_history(base, quote, start_time, end_time, page, limit)
-    if api_result.get('code') != 0 or 'data' not in api_result:
-        logging.error(f"get_premium_index_history error, code:{api_result.get('code')}, message:{api_result.get('message')}")
     return api_result
 
 
 @mcp.tool(tags={"public"})
+@tool_pipeline()
 async def get_basis_history(
     base: Annotated[str, Field(description="Required, futures base currency")],
     quote: Annotated[str, Field(description="Quote currency, default USDT")] = "USDT",
@@ -354,13 +944,16 @@ async def get_basis_history(
 
     Returns: {code, message, data}.
     """
+    local_result = await _history_from_store("basis", base, quote, start_time, end_time, page, limit)
+    if local_result is not None:
+        return local_result
+
     api_result = await coinex_client.futures_basis_index_history(base, quote, start_time, end_time, page, limit)
-    if api_result.get('code') != 0 or 'data' not in api_result:
-        logging.error(f"get_basis_history error, code:{api_result.get('code')}, message:{api_result.get('message')}")
     return api_result
 
 
 @mcp.tool(tags={"public"})
+@tool_pipeline()
 async def get_margin_tiers(
     base: Annotated[str, Field(description="Required, futures base currency")],
     quote: Annotated[str, Field(description="Quote currency, default USDT")] = "USDT"
@@ -374,12 +967,11 @@ async def get_margin_tiers(
     Returns: {code, message, data}.
     """
     api_result = await coinex_client.futures_get_position_level(base, quote)
-    if api_result.get('code') != 0 or 'data' not in api_result:
-        logging.error(f"get_position_tiers error, code:{api_result.get('code')}, message:{api_result.get('message')}")
     return api_result
 
 
 @mcp.tool(tags={"public"})
+@tool_pipeline()
 async def get_liquidation_history(
     base: Annotated[str, Field(description="Required, futures base currency, e.g. BTC, ETH")],
     quote: Annotated[str, Field(description="Quote currency, default USDT")] = "USDT",
@@ -404,7 +996,166 @@ async def get_liquidation_history(
     return {"code": -1, "message": "Liquidation history not available in current API version", "data": []}
 
 
+# ===============
+# Market Data Resources (subscribable)
+# ===============
+
+# Quote currencies recognised at the end of a resource market name such as BTCUSDT
+RESOURCE_QUOTES = ("USDT", "USDC", "BTC", "ETH")
+RESOURCE_URI = re.compile(r"^coinex://(?P<market_type>[a-z]+)/(?P<market>[A-Za-z0-9]+)/(?P<kind>ticker|depth)$")
+
+
+def _split_market(market: str) -> tuple[str, str]:
+    market = market.upper()
+    for quote in RESOURCE_QUOTES:
+        if market.endswith(quote) and len(market) > len(quote):
+            return market[:-len(quote)], quote
+    raise ValueError(f"Unsupported market '{market}', expected BASE followed by one of {', '.join(RESOURCE_QUOTES)}")
+
+
+async def _market_resource(kind: str, market_type: str, market: str) -> dict[str, Any]:
+    base, quote = _split_market(market)
+    mt = CoinExClient.MarketType(market_type)
+    if kind == "ticker":
+        return await coinex_client.get_tickers(base, quote, mt)
+    # Same parameters as the get_orderbook defaults, so snapshots and the cache are shared with the tool
+    return await coinex_client.get_depth(base, quote, mt, HOT_DEPTH_PARAMS["limit"], HOT_DEPTH_PARAMS["interval"])
+
+
+async def read_market_resource(uri: str) -> dict[str, Any]:
+    """Read a coinex://{market_type}/{market}/{ticker|depth} resource (used for subscription polling)."""
+    match = RESOURCE_URI.match(uri)
+    if match is None:
+        raise ValueError(f"Unknown resource {uri}")
+    return await _market_resource(match["kind"], match["market_type"], match["market"])
+
+
+# Notifies subscribers of the resources below when their data changes (see --resource-update-interval)
+resource_feed = ResourceFeed(read_market_resource)
+enable_subscriptions(mcp, resource_feed)
+
+
+@mcp.resource("coinex://{market_type}/{market}/ticker", tags={"public"}, mime_type="application/json")
+async def ticker_resource(market_type: str, market: str) -> dict[str, Any]:
+    """Ticker of one market, e.g. coinex://spot/BTCUSDT/ticker; subscribe to be notified when it changes.
+
+    Returns: {code, message, data}.
+    """
+    return await _market_resource("ticker", market_type, market)
+
+
+@mcp.resource("coinex://{market_type}/{market}/depth", tags={"public"}, mime_type="application/json")
+async def depth_resource(market_type: str, market: str) -> dict[str, Any]:
+    """Order book (20 levels) of one market, e.g. coinex://futures/BTCUSDT/depth; subscribe to be notified when it changes.
+
+    Returns: {code, message, data}.
+    """
+    return await _market_resource("depth", market_type, market)
+
+
+# ===============
+# Alerts (public)
+# ===============
+
+def _alert_session() -> tuple[str, Any]:
+    """Alerts belong to the MCP session that created them."""
+    ctx = get_context()
+    return ctx.session_id, ctx.session
+
+
+@mcp.tool(tags={"public"})
+@tool_pipeline()
+@validate_call
+async def create_alert(
+    base: Annotated[str, Field(description="Required, base currency, e.g. BTC, ETH")],
+    condition: Annotated[str, Field(description="Condition '<metric><op><number>', op one of > >= < <=, "
+                                                 f"metric one of {', '.join(ALERT_METRICS)}; e.g. 'last>=70000'")],
+    quote: Annotated[str, Field(description="Quote currency, default USDT")] = "USDT",
+    market_type: Annotated[CoinExClient.MarketType, Field(description=MARKET_TYPE_DESC)] = CoinExClient.MarketType.SPOT,
+    note: Annotated[str | None, Field(description="Optional; free text returned with the trigger")] = None,
+) -> dict[str, Any]:
+    """Register a one-shot alert that triggers the first time its condition holds.
+
+    The server evaluates active alerts every few seconds against shared market snapshots. Triggers are
+    pushed to this session as a log notification (logger "coinex.alerts") and kept for poll_alerts.
+
+    Parameters:
+    - base: Required, base currency.
+    - condition: Required, e.g. "last>=70000", "change_pct<-5", "spread_pct>0.1", "funding_rate>0.0005".
+      Metrics: last, volume, value, change_pct, range_pct, premium_pct and funding_rate (futures) from tickers,
+      spread_pct from the order book ((best ask - best bid) / mid * 100). Indicator conditions are not supported.
+    - quote: Optional, quote currency, default "USDT".
+    - market_type: Optional, default "spot"; options: "spot" | "futures".
+    - note: Optional, free text.
+
+    Returns: {code, message, data}, data = the alert with its alert_id.
+    """
+    global alert_monitor
+    owner, session = _alert_session()
+    try:
+        alert = alert_engine.add(owner, market_type.value, base, quote, condition, note)
+    except ValueError as e:
+        return {"code": -1, "message": str(e), "data": None}
+
+    if alert_monitor is None:
+        alert_monitor = AlertMonitor(alert_engine, coinex_client)
+
+    async def notify(record: dict[str, Any]):
+        await session.send_log_message(level="notice", data=record, logger="coinex.alerts")
+
+    alert_monitor.watch(owner, notify)
+    return {"code": 0, "message": "OK", "data": alert.to_dict()}
+
+
+@mcp.tool(tags={"public"})
+@tool_pipeline()
+async def list_alerts() -> dict[str, Any]:
+    """List the active (not yet triggered) alerts of this session.
+
+    Returns: {code, message, data} (list).
+    """
+    owner, _ = _alert_session()
+    return {"code": 0, "message": "OK", "data": [alert.to_dict() for alert in alert_engine.alerts(owner)]}
+
+
+@mcp.tool(tags={"public"})
+@tool_pipeline()
+@validate_call
+async def cancel_alert(
+    alert_id: Annotated[int, Field(description="Required, alert_id returned by create_alert")],
+) -> dict[str, Any]:
+    """Cancel an active alert of this session.
+
+    Parameters:
+    - alert_id: Required, alert id.
+
+    Returns: {code, message, data}.
+    """
+    owner, _ = _alert_session()
+    if not alert_engine.cancel(owner, alert_id):
+        return {"code": -1, "message": f"No active alert {alert_id}", "data": None}
+    return {"code": 0, "message": "OK", "data": {"alert_id": alert_id}}
+
+
+@mcp.tool(tags={"public"})
+@tool_pipeline()
+@validate_call
+async def poll_alerts(
+    limit: Annotated[int | None, Field(description="Return quantity, default 100")] = 100,
+) -> dict[str, Any]:
+    """Get the alerts of this session that triggered since the last poll, oldest first (kept for an hour).
+
+    Parameters:
+    - limit: Optional, return quantity, default 100; the rest stays queued.
+
+    Returns: {code, message, data} (list of alerts with the triggering value and triggered_at).
+    """
+    owner, _ = _alert_session()
+    return {"code": 0, "message": "OK", "data": alert_engine.drain(owner, limit or 100)}
+
+
 @mcp.tool(tags={"auth"})
+@tool_pipeline(["ccy", "available", "frozen"])
 async def get_account_balance() -> dict[str, Any]:
     """Get account balance information (requires authentication).
 
@@ -417,12 +1168,61 @@ async def get_account_balance() -> dict[str, Any]:
     client = get_secret_client()
     api_result = await client.get_balances(CoinExClient.MarketType.SPOT)
 
-    if api_result.get('code') != 0 or 'data' not in api_result:
-        logging.error(f"get_balances error, code:{api_result.get('code')}, message:{api_result.get('message')}")
     return api_result
 
 
 @mcp.tool(tags={"auth"})
+@tool_pipeline()
+@validate_call
+async def get_portfolio_value(
+    quote: Annotated[str, Field(description="Valuation currency, default USDT")] = "USDT",
+    market_types: Annotated[list[CoinExClient.MarketType] | None, Field(description="Optional, accounts to include; default spot, margin and futures")] = None,
+    min_value: Annotated[float, Field(description="Optional, hide assets valued below this amount; default 0", ge=0)] = 0,
+) -> dict[str, Any]:
+    """Get total account value in one quote currency (requires authentication).
+
+    Description: Balances of all selected accounts and one bulk spot ticker snapshot are fetched concurrently;
+    every asset is priced against that snapshot (directly, inversely or via USDT).
+
+    Parameters:
+    - quote: Optional, valuation currency, default "USDT".
+    - market_types: Optional, default ["spot", "margin", "futures"].
+    - min_value: Optional, assets valued below this are omitted from the asset list (still counted in totals).
+
+    Returns: {code, message, data: {quote, total_value, accounts, assets, unpriced}};
+    data.errors lists accounts whose balance query failed.
+    """
+    client = get_secret_client()
+    market_types = market_types or list(CoinExClient.MarketType)
+    quote = quote.upper()
+
+    results = await asyncio.gather(
+        coinex_client.get_tickers(None, None, CoinExClient.MarketType.SPOT),
+        *(client.get_balances(mt) for mt in market_types),
+    )
+    ticker_result, balance_results = results[0], results[1:]
+    if ticker_result.get('code') != 0 or 'data' not in ticker_result:
+        return ticker_result
+
+    holdings_by_account = {}
+    errors = {}
+    for mt, api_result in zip(market_types, balance_results):
+        if api_result.get('code') != 0 or 'data' not in api_result:
+            logging.error("get_portfolio_value %s balance error, code:%s, message:%s", mt.value,
+                          api_result.get('code'), api_result.get('message'),
+                          extra={"tool": "get_portfolio_value", "code": api_result.get('code')})
+            errors[mt.value] = api_result.get('message')
+            continue
+        holdings_by_account[mt.value] = analytics.balance_holdings(mt.value, api_result['data'])
+
+    summary = analytics.value_portfolio(holdings_by_account, ticker_result['data'], quote, Decimal(str(min_value)))
+    if errors:
+        summary["errors"] = errors
+    return {"code": 0, "message": "OK", "data": summary}
+
+
+@mcp.tool(tags={"auth"})
+@tool_pipeline()
 @validate_call
 async def place_order(
     base: Annotated[str, Field(description="Required, base currency, e.g. BTC, ETH")],
@@ -465,12 +1265,11 @@ async def place_order(
         trigger_price=trigger_price
     )
 
-    if api_result.get('code') != 0 or 'data' not in api_result:
-        logging.error(f"place_order error, code:{api_result.get('code')}, message:{api_result.get('message')}")
     return api_result
 
 
 @mcp.tool(tags={"auth"})
+@tool_pipeline()
 @validate_call
 async def cancel_order(
     base: Annotated[str, Field(description="Required, base currency, e.g. BTC, ETH")],
@@ -491,12 +1290,162 @@ async def cancel_order(
     client = get_secret_client()
     api_result = await client.cancel_order(base, quote, market_type, order_id)
 
-    if api_result.get('code') != 0 or 'data' not in api_result:
-        logging.error(f"cancel_order error, code:{api_result.get('code')}, message:{api_result.get('message')}")
     return api_result
 
 
+def _execution_engine() -> ExecutionEngine:
+    global execution_engine
+    if execution_engine is None:
+        execution_engine = ExecutionEngine(coinex_client)
+    return execution_engine
+
+
+def _execution_owner(client: CoinExClient) -> str:
+    """Server-side executions belong to the API key that submitted them."""
+    return tenant_key("access", client.access_id)
+
+
+@mcp.tool(tags={"auth"})
+@tool_pipeline()
+@validate_call
+async def place_conditional_order(
+    base: Annotated[str, Field(description="Required, base currency, e.g. BTC, ETH")],
+    side: Annotated[CoinExClient.OrderSide, Field(description=ORDER_SIDE_DESC)],
+    amount: Annotated[str, Field(description="Required, order quantity (string), must meet precision and minimum volume requirements")],
+    kind: Annotated[Literal["oco", "bracket", "trailing_stop"], Field(description="Strategy: oco|bracket|trailing_stop")],
+    quote: Annotated[str, Field(description="Quote currency, default USDT")] = "USDT",
+    market_type: Annotated[CoinExClient.MarketType, Field(description=MARKET_TYPE_DESC)] = CoinExClient.MarketType.SPOT,
+    take_profit: Annotated[str | None, Field(description="oco/bracket: take-profit trigger price")] = None,
+    stop_loss: Annotated[str | None, Field(description="oco/bracket: stop-loss trigger price")] = None,
+    entry_price: Annotated[str | None, Field(description="bracket: optional entry trigger price, market entry now if empty")] = None,
+    trail_pct: Annotated[float | None, Field(description="trailing_stop: retracement from the best price in percent")] = None,
+    activation_price: Annotated[str | None, Field(description="trailing_stop: optional price at which trailing starts")] = None,
+) -> dict[str, Any]:
+    """Run an OCO, bracket or trailing-stop order on the server (requires authentication, real funds).
+    Strong reminder: This is a real money trading operation. Please confirm with end user again before calling!
+
+    The server watches the last trade price several times a second and sends market child orders through
+    place_order when a trigger is reached. Executions live in server memory and stop if the server restarts.
+
+    Parameters:
+    - base: Required, base currency.
+    - side: Required, side of the triggered orders (for bracket: the entry side; exits use the other side).
+    - amount: Required, order quantity (string).
+    - kind: Required:
+      - "oco": take_profit and stop_loss; the first reached sends the order, the other is dropped.
+        A sell takes profit at or above take_profit and stops at or below stop_loss; a buy the reverse.
+      - "bracket": entry (at market, or once the price reaches entry_price), then an OCO exit on the other side;
+        a rejected exit order is retried on the next price checks.
+      - "trailing_stop": trail_pct, optional activation_price; triggers when the price retraces trail_pct
+        from its best level (highest for sell, lowest for buy).
+    - quote: Optional, quote currency, default "USDT".
+    - market_type: Optional, market type, default "spot".
+
+    Returns: {code, message, data}, data = the execution with its execution_id.
+    """
+    client = get_secret_client()
+    owner = _execution_owner(client)
+    args = (client, owner, market_type, base, quote, side, amount)
+    try:
+        if kind == "trailing_stop":
+            if trail_pct is None:
+                raise ValueError("trailing_stop requires trail_pct")
+            strategy = TrailingStopStrategy(*args, trail_pct=trail_pct, activation_price=activation_price)
+        else:
+            if not take_profit or not stop_loss:
+                raise ValueError(f"{kind} requires take_profit and stop_loss")
+            if kind == "oco":
+                strategy = OCOStrategy(*args, take_profit=take_profit, stop_loss=stop_loss)
+            else:
+                strategy = BracketStrategy(*args, take_profit=take_profit, stop_loss=stop_loss, entry_price=entry_price)
+    except (ValueError, ArithmeticError) as e:
+        return {"code": -1, "message": str(e), "data": None}
+    return {"code": 0, "message": "OK", "data": _execution_engine().submit(strategy).to_dict()}
+
+
 @mcp.tool(tags={"auth"})
+@tool_pipeline()
+@validate_call
+async def place_sliced_order(
+    base: Annotated[str, Field(description="Required, base currency, e.g. BTC, ETH")],
+    side: Annotated[CoinExClient.OrderSide, Field(description=ORDER_SIDE_DESC)],
+    amount: Annotated[str, Field(description="Required, total quantity (string); slices keep its precision")],
+    kind: Annotated[Literal["twap", "iceberg"], Field(description="Strategy: twap|iceberg")],
+    quote: Annotated[str, Field(description="Quote currency, default USDT")] = "USDT",
+    market_type: Annotated[CoinExClient.MarketType, Field(description=MARKET_TYPE_DESC)] = CoinExClient.MarketType.SPOT,
+    slices: Annotated[int | None, Field(description="twap: number of slices")] = None,
+    duration_seconds: Annotated[float | None, Field(description="twap: seconds over which the slices are spread")] = None,
+    price: Annotated[str | None, Field(description="iceberg: limit price (required); twap: optional limit price of the slices")] = None,
+    visible_amount: Annotated[str | None, Field(description="iceberg: quantity shown in the order book at a time")] = None,
+) -> dict[str, Any]:
+    """Execute a large order in slices on the server (requires authentication, real funds).
+    Strong reminder: This is a real money trading operation. Please confirm with end user again before calling!
+
+    Parameters:
+    - base: Required, base currency.
+    - side: Required, direction: buy|sell.
+    - amount: Required, total order quantity (string).
+    - kind: Required:
+      - "twap": slices and duration_seconds; equal slices every duration_seconds/slices, the first at once;
+        market orders, or limit orders at price.
+      - "iceberg": price and visible_amount; one limit order of visible_amount at a time, the next placed
+        once the previous one has filled; stops if a slice is cancelled outside the server.
+    - quote: Optional, quote currency, default "USDT".
+    - market_type: Optional, market type, default "spot".
+
+    Returns: {code, message, data}, data = the execution with its execution_id.
+    """
+    client = get_secret_client()
+    owner = _execution_owner(client)
+    args = (client, owner, market_type, base, quote, side, amount)
+    try:
+        if kind == "twap":
+            if not slices or duration_seconds is None:
+                raise ValueError("twap requires slices and duration_seconds")
+            strategy = TWAPStrategy(*args, slices=slices, duration_seconds=duration_seconds, limit_price=price)
+        else:
+            if not price or not visible_amount:
+                raise ValueError("iceberg requires price and visible_amount")
+            strategy = IcebergStrategy(*args, visible_amount=visible_amount, price=price)
+    except (ValueError, ArithmeticError) as e:
+        return {"code": -1, "message": str(e), "data": None}
+    return {"code": 0, "message": "OK", "data": _execution_engine().submit(strategy).to_dict()}
+
+
+@mcp.tool(tags={"auth"})
+@tool_pipeline()
+async def list_executions() -> dict[str, Any]:
+    """List server-side executions of this API key: active ones first, then recently finished ones
+    (requires authentication).
+
+    Returns: {code, message, data} (list with state, trigger details and child orders).
+    """
+    owner = _execution_owner(get_secret_client())
+    return {"code": 0, "message": "OK", "data": [s.to_dict() for s in _execution_engine().executions(owner)]}
+
+
+@mcp.tool(tags={"auth"})
+@tool_pipeline()
+@validate_call
+async def cancel_execution(
+    execution_id: Annotated[int, Field(description="Required, execution_id returned when the execution was placed")],
+) -> dict[str, Any]:
+    """Stop a server-side execution; resting iceberg and limit TWAP slices are cancelled too (requires authentication).
+
+    Parameters:
+    - execution_id: Required, execution id.
+
+    Returns: {code, message, data}.
+    """
+    owner = _execution_owner(get_secret_client())
+    strategy = await _execution_engine().cancel(owner, execution_id)
+    if strategy is None:
+        return {"code": -1, "message": f"No active execution {execution_id}", "data": None}
+    return {"code": 0, "message": "OK", "data": strategy.to_dict()}
+
+
+@mcp.tool(tags={"auth"})
+@tool_pipeline(["order_id", "market", "side", "type", "price", "amount", "filled_amount", "created_at"])
 @validate_call
 async def get_order_history(
     base: Annotated[str | None, Field(description="Optional, base currency; query all markets if empty")] = None,
@@ -510,7 +1459,8 @@ async def get_order_history(
 ) -> dict[str, Any]:
     """Get order history (requires authentication).
 
-    Description: Returns list of orders; limit applies to total merged count.
+    Description: Returns one page of orders for a single market type and status;
+    use get_merged_order_history to merge spot/margin/futures, pending/finished and stop orders.
 
     Parameters:
     - base: Optional, base currency; queries all markets if empty.
@@ -532,9 +1482,190 @@ async def get_order_history(
     return api_result
 
 
+@mcp.tool(tags={"auth"})
+@tool_pipeline(["order_id", "market", "side", "type", "price", "amount", "filled_amount", "created_at"])
+@validate_call
+async def get_merged_order_history(
+    base: Annotated[str | None, Field(description="Optional, base currency; query all markets if empty")] = None,
+    quote: Annotated[str, Field(description="Quote currency, default USDT")] = "USDT",
+    side: Annotated[CoinExClient.OrderSide | None, Field(description=ORDER_SIDE_DESC)] = None,
+    market_types: Annotated[list[CoinExClient.MarketType] | None, Field(description="Optional, market types to merge; default spot, margin and futures")] = None,
+    statuses: Annotated[list[CoinExClient.OrderStatus] | None, Field(description="Optional, order statuses to merge; default pending and finished")] = None,
+    include_stop: Annotated[bool, Field(description="Optional, whether stop orders are merged as well; default True")] = True,
+    limit: Annotated[int, Field(description="Optional, total number of merged orders; default 100", ge=1, le=1000)] = 100,
+) -> dict[str, Any]:
+    """Get order history merged across market types, statuses and stop/normal orders (requires authentication).
+
+    Description: All selected order streams are queried concurrently and merged by creation time;
+    limit applies to the total merged count, duplicates are removed.
+
+    Parameters:
+    - base: Optional, base currency; queries all markets if empty.
+    - quote: Optional, quote currency, default "USDT".
+    - side: Optional, order side.
+    - market_types: Optional, default ["spot", "margin", "futures"].
+    - statuses: Optional, default ["pending", "finished"].
+    - include_stop: Optional, whether to include stop orders, default True.
+    - limit: Optional, default 100.
+
+    Returns: {code, message, data}, sorted by created_at descending; each order carries market_type and is_stop.
+    """
+    client = get_secret_client()
+
+    api_result = await client.get_merged_orders(
+        base=base if base else None,
+        quote=quote if base else None,
+        market_types=market_types or list(CoinExClient.MarketType),
+        side=side,
+        statuses=statuses or list(CoinExClient.OrderStatus),
+        include_stop=include_stop,
+        limit=limit,
+    )
+
+    return api_result
+
+
+# ===============
+# Diagnostics (admin)
+# ===============
+def require_admin():
+    """Diagnostics expose server internals: in HTTP/SSE mode they need an API_TOKEN carrying the admin scope."""
+    if not is_http_like:
+        return
+    token = get_access_token()
+    if token is None or ADMIN_SCOPE not in token.scopes:
+        raise ValueError(f"Diagnostics require a bearer token (API_TOKEN) with the '{ADMIN_SCOPE}' scope in API_SCOPES")
+
+
+@mcp.tool(tags={"auth"})
+@tool_pipeline()
+@validate_call
+async def profile_server(
+    seconds: Annotated[float, Field(description="Optional, how long to sample; default 10", gt=0, le=120)] = 10,
+    interval_ms: Annotated[float, Field(description="Optional, sampling interval in milliseconds; default 10", ge=1, le=1000)] = 10,
+    all_threads: Annotated[bool, Field(description="Optional, sample every thread instead of the event loop; default false")] = False,
+    max_stacks: Annotated[int, Field(description="Optional, most sampled stacks to return; default 500", ge=1, le=10000)] = 500,
+) -> dict[str, Any]:
+    """Run the sampling profiler on this server process (admin only).
+
+    Description: Samples the event loop thread (or every thread) for the given time without pausing it, then returns
+    the stacks in collapsed format ("frame;frame;frame count" per line) for flamegraph.pl or speedscope.
+    One profile runs at a time.
+
+    Parameters:
+    - seconds: Optional, sampling duration, default 10 (max 120).
+    - interval_ms: Optional, default 10.
+    - all_threads: Optional, default false; stacks are then prefixed with the thread name.
+    - max_stacks: Optional, default 500; samples of further stacks are counted in truncated_samples.
+
+    Returns: {code, message, data} (collapsed, samples, stacks, truncated_samples).
+    """
+    require_admin()
+    try:
+        report = await profiler.profile(seconds, interval_ms / 1000, all_threads, max_stacks)
+    except RuntimeError as e:
+        return {"code": -1, "message": str(e), "data": None}
+    return {"code": 0, "message": "OK", "data": report}
+
+
+@mcp.tool(tags={"auth"})
+@tool_pipeline()
+async def get_event_loop_lag() -> dict[str, Any]:
+    """Event loop stalls recorded since startup, slowest first, with the stack that blocked the loop (admin only).
+
+    Returns: {code, message, data} (stalls, max_lag_ms and slowest: lag_ms, at, stack).
+    """
+    require_admin()
+    if loop_monitor is None:
+        return {"code": -1, "message": "Event loop lag monitor is disabled (--loop-lag-threshold 0)", "data": None}
+    return {"code": 0, "message": "OK", "data": loop_monitor.report()}
+
+
+def _load_env():
+    """Load .env (won't override externally set environment variables).
+
+    Called from main() rather than at import time, so importing this module (tests, MCP hosts
+    introspecting the package) does not walk the filesystem or write to stderr.
+    """
+    try:
+        from dotenv import load_dotenv, find_dotenv
+        # When started via MCP Inspector, CWD is usually set to project root; find_dotenv is more robust
+        env_path = find_dotenv(usecwd=True)
+        if env_path:
+            load_dotenv(env_path, override=False)
+            print(f"Loaded environment variables from {env_path}", file=sys.stderr)
+        else:
+            print(".env not found, continuing with system environment variables", file=sys.stderr)
+    except Exception as e:
+        # Give hint when python-dotenv is not installed or other exceptions occur, but don't block service
+        print(f"Failed to load .env: {e} (you can run pip install python-dotenv)", file=sys.stderr)
+
+
+def _parse_time_arg(value: str) -> int:
+    """Accept millisecond timestamps or ISO dates (UTC) on the command line."""
+    if value.isdigit():
+        return int(value)
+    from datetime import datetime, timezone
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+
+def sync_main(argv: list[str]):
+    """Backfill futures history series into the local store: coinex-mcp-server sync ..."""
+    parser = argparse.ArgumentParser(prog="coinex-mcp-server sync",
+                                     description="Download futures funding/premium/basis history into the local store")
+    parser.add_argument("--markets", required=True,
+                        help="Comma-separated futures markets as BASE or BASE/QUOTE, e.g. BTC,ETH,SOL/USDT")
+    parser.add_argument("--quote", default="USDT", help="Quote currency for markets given as BASE (default USDT)")
+    parser.add_argument("--series", default=",".join(SERIES),
+                        help=f"Comma-separated series to download: {'|'.join(SERIES)} (default all)")
+    parser.add_argument("--since", type=_parse_time_arg, default=None,
+                        help="Start of the backfill for empty files, ms timestamp or ISO date (default: as far back as the API pages)")
+    parser.add_argument("--history-dir", default=None, help="Store directory (default $COINEX_HISTORY_DIR or ~/.cache/coinex-mcp-server/history)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent downloads (default 4)")
+    parser.add_argument("--rate", type=float, default=10.0, help="Upstream requests per second (default 10)")
+    args = parser.parse_args(argv)
+
+    series = [name.strip() for name in args.series.split(",") if name.strip()]
+    unknown = [name for name in series if name not in SERIES]
+    if unknown:
+        parser.error(f"unknown series: {', '.join(unknown)}")
+
+    pairs = []
+    for item in args.markets.split(","):
+        item = item.strip().upper()
+        if not item:
+            continue
+        base, _, quote = item.partition("/")
+        pairs.append((base, quote or args.quote.upper()))
+
+    store = HistoryStore(args.history_dir or default_history_dir())
+    client = CoinExClient(enable_env_credentials=False, rate_limiter=RateLimiter(args.rate))
+    print(f"Syncing {len(pairs)} market(s) x {len(series)} series into {store.root}", file=sys.stderr)
+
+    async def sync():
+        try:
+            return await run_sync(store, client, pairs, series, args.since, args.concurrency)
+        finally:
+            await close_http_client()
+
+    report = asyncio.run(sync())
+    failed = [key for key, value in report.items() if not isinstance(value, int)]
+    if failed:
+        sys.exit(1)
+
+
 def main():
     """Main entry point for the CoinEx MCP server CLI."""
-    parser = argparse.ArgumentParser(description="CoinEx FastMCP server startup parameters")
+    _load_env()
+
+    if len(sys.argv) > 1 and sys.argv[1] == "sync":
+        sync_main(sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(description="CoinEx FastMCP server startup parameters (use `sync --help` for history backfill)")
     parser.add_argument(
         "--transport",
         choices=["stdio", "http", "streamable-http", "sse"],
@@ -565,6 +1696,186 @@ def main():
         action="store_true",
         help="Enable SO_REUSEPORT for multi-process (use with caution, only when multiple independent processes need to share same port)",
     )
+    parser.add_argument(
+        "--market-deadline",
+        type=float,
+        default=float(os.getenv("COINEX_MARKET_DEADLINE", "10")),
+        help="Seconds a public (market data) tool call may take before it is cancelled, 0 for none (default 10)",
+    )
+    parser.add_argument(
+        "--trading-deadline",
+        type=float,
+        default=float(os.getenv("COINEX_TRADING_DEADLINE", "30")),
+        help="Seconds an account/trading tool call may take before it is cancelled, 0 for none (default 30)",
+    )
+    parser.add_argument(
+        "--tool-deadlines",
+        default=os.getenv("COINEX_TOOL_DEADLINES"),
+        help="Per-tool deadline overrides in seconds, e.g. 'get_kline=5,get_merged_order_history=60'",
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=int(os.getenv("COINEX_MAX_CONCURRENCY", "64")),
+        help="HTTP/SSE mode: tool calls executing at once across all tools, 0 disables admission control (default 64)",
+    )
+    parser.add_argument(
+        "--tool-concurrency",
+        default=os.getenv("COINEX_TOOL_CONCURRENCY", "16"),
+        help="HTTP/SSE mode: tool calls executing at once per tool, with optional per-tool overrides, "
+             "e.g. '16,scan_markets=2,screen_funding_basis=2' (default 16)",
+    )
+    parser.add_argument(
+        "--max-queue",
+        type=int,
+        default=int(os.getenv("COINEX_MAX_QUEUE", "256")),
+        help="HTTP/SSE mode: calls allowed to wait for a slot; beyond that calls are rejected immediately (default 256)",
+    )
+    parser.add_argument(
+        "--upstream-concurrency",
+        type=int,
+        default=int(os.getenv("COINEX_UPSTREAM_CONCURRENCY", "32")),
+        help="HTTP auth mode: upstream requests in flight at once, shared fairly between tenants (default 32)",
+    )
+    parser.add_argument(
+        "--tenant-concurrency",
+        type=int,
+        default=int(os.getenv("COINEX_TENANT_CONCURRENCY", "8")),
+        help="HTTP auth mode: upstream requests one tenant (access id or bearer token) may have in flight (default 8)",
+    )
+    parser.add_argument(
+        "--tenant-rate",
+        type=float,
+        default=float(os.getenv("COINEX_TENANT_RATE", "0")) or None,
+        help="HTTP auth mode: upstream requests per second per tenant (default unlimited)",
+    )
+    parser.add_argument(
+        "--tenant-weights",
+        default=os.getenv("COINEX_TENANT_WEIGHTS"),
+        help="HTTP auth mode: relative shares, e.g. '<access id>=2,<bearer token>=0.5' (default 1 each)",
+    )
+    parser.add_argument(
+        "--warmup",
+        action="store_true",
+        default=os.getenv("COINEX_WARMUP", "false").lower() in ("1", "true", "yes", "on"),
+        help="Preload market metadata and ticker snapshots (spot/futures) at start; /ready reports 503 until done",
+    )
+    parser.add_argument(
+        "--hot-symbols",
+        default=os.getenv("COINEX_HOT_SYMBOLS"),
+        help="Comma-separated base currencies (BASE or BASE/QUOTE) whose tickers and order books are kept warm, e.g. BTC,ETH",
+    )
+    parser.add_argument(
+        "--hot-refresh-seconds",
+        type=float,
+        default=1.0,
+        help="Refresh interval for ticker snapshots and hot-symbol order books, "
+             "also the polling interval of subscribed resources and alerts (default 1)",
+    )
+    parser.add_argument(
+        "--resource-update-interval",
+        type=float,
+        default=float(os.getenv("COINEX_RESOURCE_UPDATE_INTERVAL", "1")),
+        help="Minimum seconds between two resources/updated notifications to one subscriber of a resource; "
+             "subscribed resources are polled every --hot-refresh-seconds (default 1)",
+    )
+    parser.add_argument(
+        "--execution-poll-seconds",
+        type=float,
+        default=float(os.getenv("COINEX_EXECUTION_POLL_SECONDS", "0.25")),
+        help="How often server-side conditional/sliced orders check the last trade price (default 0.25)",
+    )
+    parser.add_argument(
+        "--backtest-workers",
+        type=int,
+        default=int(os.getenv("COINEX_BACKTEST_WORKERS", str(min(4, os.cpu_count() or 1)))),
+        help="Worker processes for multi-market backtests; 0 runs them in the server process "
+             "(default min(4, CPU count))",
+    )
+    parser.add_argument(
+        "--public-metrics",
+        action="store_true",
+        default=os.getenv("COINEX_PUBLIC_METRICS", "false").lower() in ("1", "true", "yes", "on"),
+        help="Serve GET /metrics without a bearer token (default off: requires API_TOKEN)",
+    )
+    parser.add_argument(
+        "--loop-lag-threshold",
+        type=float,
+        default=float(os.getenv("COINEX_LOOP_LAG_THRESHOLD", str(DEFAULT_LAG_THRESHOLD))),
+        help="Event loop stalls longer than this many seconds are recorded with the blocking stack "
+             f"(see get_event_loop_lag); 0 disables the monitor (default {DEFAULT_LAG_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--trace-exporter",
+        choices=TRACE_EXPORTERS,
+        default=os.getenv("COINEX_TRACE_EXPORTER", "none"),
+        help="Export OpenTelemetry spans of tool calls and CoinEx requests: none, console or otlp "
+             "(OTLP/HTTP; requires the 'tracing' extra; default none)",
+    )
+    parser.add_argument(
+        "--trace-endpoint",
+        default=os.getenv("COINEX_TRACE_ENDPOINT"),
+        help="OTLP/HTTP traces endpoint, e.g. http://localhost:4318/v1/traces "
+             "(default: OTEL_EXPORTER_OTLP_* environment, else the local collector)",
+    )
+    parser.add_argument(
+        "--tape-capacity",
+        type=int,
+        default=int(os.getenv("COINEX_TAPE_CAPACITY", str(DEFAULT_TAPE_CAPACITY))),
+        help=f"Trades kept per market for get_trades_since (default {DEFAULT_TAPE_CAPACITY})",
+    )
+    parser.add_argument(
+        "--tape-windows",
+        default=os.getenv("COINEX_TAPE_WINDOWS", "60,300,900"),
+        help="Rolling windows in seconds for get_trades_since aggregates (default 60,300,900)",
+    )
+    parser.add_argument(
+        "--tape-poll-seconds",
+        type=float,
+        default=float(os.getenv("COINEX_TAPE_POLL_SECONDS", "1")),
+        help="How often the trades of markets queried through get_trades_since are polled (default 1)",
+    )
+    parser.add_argument(
+        "--no-market-cache",
+        action="store_true",
+        help="Disable the in-process cache for public market data",
+    )
+    parser.add_argument(
+        "--no-serve-stale",
+        action="store_true",
+        help="Don't answer get_ticker/get_index_price/list_markets/get_funding_rate with stale cached data "
+             "while refreshing it, or when upstream fails",
+    )
+    parser.add_argument(
+        "--shared-cache-dir",
+        default=os.getenv("COINEX_SHARED_CACHE_DIR"),
+        help="Share the public market data cache between server processes on this host through this directory "
+             "(use a tmpfs path such as /dev/shm/coinex-mcp-server-cache); only one process fetches each entry. "
+             "Defaults to $COINEX_SHARED_CACHE_DIR, or a /dev/shm directory with --reuse-port",
+    )
+    parser.add_argument(
+        "--persistent-cache-dir",
+        default=os.getenv("COINEX_PERSISTENT_CACHE_DIR"),
+        help="Keep market lists and margin tiers in this directory across restarts; stale entries are served "
+             "and revalidated in the background (default $COINEX_PERSISTENT_CACHE_DIR)",
+    )
+    parser.add_argument(
+        "--snapshot-fetcher",
+        action="store_true",
+        default=os.getenv("COINEX_SNAPSHOT_FETCHER", "false").lower() in ("1", "true", "yes", "on"),
+        help="Launch a fetcher process that polls tickers and --hot-symbols order books every --hot-refresh-seconds "
+             "and publishes them to shared memory for all server processes on this host (one fetcher per path)",
+    )
+    parser.add_argument(
+        "--snapshot-path",
+        default=os.getenv("COINEX_SNAPSHOT_PATH"),
+        help="Memory-mapped snapshot file used with --snapshot-fetcher (default under /dev/shm)",
+    )
+    parser.add_argument(
+        "--history-dir",
+        default=os.getenv("COINEX_HISTORY_DIR"),
+        help="Serve backfilled futures history from this local store (see `sync`); default $COINEX_HISTORY_DIR",
+    )
     args = parser.parse_args()
 
     # Compatible with common "http" notation in documentation
@@ -577,22 +1888,74 @@ def main():
     http_auth_enabled = args.enable_http_auth or env_http_auth_enabled
 
     # Declare global variables to modify module-level variables
-    global coinex_client, is_http_like
+    global coinex_client, is_http_like, history_store, tenant_scheduler, tape_feed, alert_monitor, execution_engine
+    global backtest_workers, loop_monitor, public_metrics
+
+    if args.history_dir:
+        history_store = HistoryStore(args.history_dir)
+        print(f"Serving futures history from local store {args.history_dir}", file=sys.stderr)
 
     # Apply switch under HTTP/SSE transport
     is_http_like = transport in ("streamable-http", "sse")
 
+    shared_cache_dir = args.shared_cache_dir
+    # Several servers behind one port are separate processes (FastMCP runs a single uvicorn.Server and so
+    # ignores --workers); each would fetch the same market data otherwise
+    if shared_cache_dir is None and is_http_like and args.reuse_port:
+        shared_cache_dir = default_shared_cache_dir()
+    if args.no_market_cache:
+        market_cache = None
+    elif shared_cache_dir:
+        market_cache = SharedCache(shared_cache_dir, maxsize=4096)
+        print(f"Sharing market data cache through {shared_cache_dir}", file=sys.stderr)
+    else:
+        market_cache = TTLCache(maxsize=4096)
+
+    hot_symbols = parse_hot_symbols(args.hot_symbols)
+    snapshots = None
+    if args.snapshot_fetcher:
+        snapshot_path = args.snapshot_path or default_snapshot_path()
+        start_fetcher(snapshot_path, hot_symbols, args.hot_refresh_seconds)
+        # Snapshots older than a few fetch intervals mean the fetcher is gone; tools then go upstream
+        snapshots = SnapshotReader(snapshot_path, max_age=max(2.0, 3 * args.hot_refresh_seconds))
+        print(f"Reading ticker/depth snapshots from {snapshot_path}", file=sys.stderr)
+
+    persistent_cache = None
+    if args.persistent_cache_dir:
+        persistent_cache = PersistentCache(args.persistent_cache_dir)
+        print(f"Loaded {len(persistent_cache)} cached responses from {args.persistent_cache_dir}", file=sys.stderr)
+
+    if is_http_like and http_auth_enabled:
+        tenant_scheduler = FairScheduler(args.upstream_concurrency, args.tenant_concurrency, args.max_queue,
+                                         args.tenant_rate, parse_tenant_weights(args.tenant_weights))
+
     # Initialize client for public data access based on mode (will not carry credentials)
     if is_http_like:
         # Disable environment credential fallback in any HTTP/SSE mode
-        coinex_client = CoinExClient(enable_env_credentials=False)
+        coinex_client = CoinExClient(enable_env_credentials=False, cache=market_cache, snapshots=snapshots,
+                                     persistent=persistent_cache, scheduler=tenant_scheduler,
+                                     serve_stale=not args.no_serve_stale)
         print("HTTP/SSE mode: Environment credential fallback disabled.", file=sys.stderr)
     else:
         # Only non-HTTP mode allows loading from environment (common scenario for local stdio development/self-hosting)
-        coinex_client = CoinExClient(enable_env_credentials=True)
+        coinex_client = CoinExClient(enable_env_credentials=True, cache=market_cache, snapshots=snapshots,
+                                     persistent=persistent_cache, serve_stale=not args.no_serve_stale)
         has_credentials = validate_environment()
         if not has_credentials:
             print("Error: CoinEx API credentials not found, some features will be unavailable", file=sys.stderr)
+    tape_feed = TapeFeed(coinex_client, args.tape_capacity, parse_windows(args.tape_windows), args.tape_poll_seconds)
+    resource_feed.poll_interval = args.hot_refresh_seconds
+    alert_monitor = AlertMonitor(alert_engine, coinex_client, args.hot_refresh_seconds)
+    execution_engine = ExecutionEngine(coinex_client, args.execution_poll_seconds)
+    backtest_workers = max(0, args.backtest_workers)
+    public_metrics = args.public_metrics
+    if args.loop_lag_threshold > 0:
+        loop_monitor = LoopLagMonitor(threshold=args.loop_lag_threshold)
+    try:
+        configure_tracing(args.trace_exporter, args.trace_endpoint)
+    except RuntimeError as e:
+        parser.error(str(e))
+    resource_feed.min_interval = args.resource_update_interval
 
     if is_http_like:
         if not http_auth_enabled:
@@ -603,6 +1966,7 @@ def main():
             # Optional: Enable Bearer authentication based on environment variables (static Token)
             API_TOKEN = os.getenv("API_TOKEN")
             if API_TOKEN:
+                from fastmcp.server.auth import StaticTokenVerifier
                 scopes_env = os.getenv("API_SCOPES", "").replace(",", " ").split()
                 mcp.auth = StaticTokenVerifier(
                     tokens={
@@ -615,6 +1979,22 @@ def main():
                 )
                 print("Bearer authentication enabled (API_TOKEN)", file=sys.stderr)
 
+    if tracing_enabled():
+        # Middleware added first runs outermost: the root span covers deadline, admission and tenant queueing
+        mcp.add_middleware(TracingMiddleware())
+        print(f"Tracing enabled ({args.trace_exporter} exporter)", file=sys.stderr)
+    # Outermost after tracing, so time spent queued for a slot counts against the deadline
+    _, tool_deadlines = parse_tool_limits(args.tool_deadlines, default=0, cast=float)
+    # Sampling lasts as long as requested
+    tool_deadlines.setdefault("profile_server", 0)
+    mcp.add_middleware(DeadlineMiddleware(args.market_deadline, args.trading_deadline, tool_deadlines))
+    if is_http_like and args.max_concurrency > 0:
+        tool_limit, tool_limits = parse_tool_limits(args.tool_concurrency, default=16)
+        mcp.add_middleware(ConcurrencyLimitMiddleware(args.max_concurrency, tool_limit, args.max_queue, tool_limits))
+    if tenant_scheduler is not None:
+        mcp.add_middleware(TenantMiddleware(tenant_scheduler))
+        print("Per-tenant fair scheduling of upstream requests enabled", file=sys.stderr)
+
     # Assemble uvicorn configuration (only effective in HTTP/SSE mode)
     uvicorn_config = None
     if is_http_like:
@@ -627,18 +2007,62 @@ def main():
         if not uvicorn_config:
             uvicorn_config = None
 
+    if (args.warmup or hot_symbols) and market_cache is None:
+        print("Warm-up requires the market cache; ignoring --warmup/--hot-symbols", file=sys.stderr)
+        args.warmup, hot_symbols = False, []
+
     # Start (2.x: only pass HTTP params for HTTP transports)
     if transport == "stdio":
-        mcp.run(transport=transport)
+        run_kwargs = {}
     else:
-        mcp.run(
-            transport=transport,
+        run_kwargs = dict(
             host=args.host,
             port=args.port,
             path=args.path,
             # Only pass when configured, avoid affecting stdio
             **({"uvicorn_config": uvicorn_config} if uvicorn_config is not None else {})
         )
+    # With the snapshot fetcher running, it keeps tickers and hot order books fresh instead
+    hot_refresh_seconds = None if args.snapshot_fetcher else args.hot_refresh_seconds
+    asyncio.run(_serve(transport, run_kwargs, args.warmup, hot_symbols, hot_refresh_seconds))
+
+
+async def _serve(transport: str, run_kwargs: dict[str, Any], warmup: bool, hot_symbols: list[tuple[str, str]],
+                 hot_refresh_seconds: float | None):
+    """Run the server on this event loop, so warm-up opens connections in the same pool the tools use.
+
+    Warm-up runs in the background: the server starts accepting immediately, /ready flips to 200 when it completes.
+    """
+    background: list[asyncio.Task] = []
+
+    async def warm():
+        readiness.mark_ready(await warm_up(coinex_client, hot_symbols))
+
+    if warmup or hot_symbols:
+        background.append(asyncio.create_task(warm()))
+    else:
+        readiness.mark_ready()
+    if hot_symbols and hot_refresh_seconds:
+        background.append(asyncio.create_task(keep_hot(coinex_client, hot_symbols, hot_refresh_seconds)))
+    if loop_monitor is not None:
+        background.append(asyncio.create_task(loop_monitor.run()))
+
+    try:
+        await mcp.run_async(transport=transport, **run_kwargs)
+    finally:
+        for task in background:
+            task.cancel()
+        if tape_feed is not None:
+            tape_feed.close()
+        resource_feed.close()
+        if alert_monitor is not None:
+            alert_monitor.close()
+        if execution_engine is not None:
+            execution_engine.close()
+        shutdown_pool()
+        shutdown_tracing()
+        # Connections of the pooled HTTP client (see coinex_client.get_http_client)
+        await close_http_client()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,97 @@
+"""
+Server metrics
+Process-wide counters, timings and gauges, served as JSON by the /metrics endpoint in HTTP/SSE mode
+"""
+
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Tuple
+
+# Recent observations kept per timing for quantiles
+TIMING_WINDOW = 1024
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Timing:
+    """Count, sum and max of all observations, plus quantiles over the most recent ones."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent: deque = deque(maxlen=TIMING_WINDOW)
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def summary(self) -> Dict[str, Any]:
+        ordered = sorted(self.recent)
+
+        def quantile(q: float) -> float:
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3) if ordered else 0.0
+
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": quantile(0.5),
+            "p95_ms": quantile(0.95),
+            "p99_ms": quantile(0.99),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class Metrics:
+    """Registry of labelled counters and timings, and gauges read when a snapshot is taken."""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._timings: Dict[Tuple[str, Labels], Timing] = {}
+        self._gauges: Dict[str, Callable[[], Any]] = {}
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, Any]) -> Tuple[str, Labels]:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = self._key(name, labels)
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = self._key(name, labels)
+        timing = self._timings.get(key)
+        if timing is None:
+            timing = self._timings[key] = Timing()
+        timing.observe(seconds)
+
+    def gauge(self, name: str, read: Callable[[], Any]):
+        """Register a callable evaluated on every snapshot (e.g. current queue lengths)."""
+        self._gauges[name] = read
+
+    def counter_value(self, name: str, **labels) -> float:
+        return self._counters.get(self._key(name, labels), 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        def entries(items):
+            out: Dict[str, list] = {}
+            for (name, labels), value in sorted(items, key=lambda item: item[0]):
+                out.setdefault(name, []).append({"labels": dict(labels), "value": value})
+            return out
+
+        return {
+            "uptime_seconds": round(time.time() - self.started_at, 3),
+            "counters": entries(self._counters.items()),
+            "timings": entries((key, timing.summary()) for key, timing in self._timings.items()),
+            "gauges": {name: read() for name, read in self._gauges.items()},
+        }
+
+    def reset(self):
+        self._counters.clear()
+        self._timings.clear()
+
+
+metrics = Metrics()
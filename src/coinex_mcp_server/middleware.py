@@ -0,0 +1,220 @@
+"""
+MCP middleware
+Deadlines, admission control, per-tenant accounting and tracing for tool calls
+"""
+
+import time
+import asyncio
+import hashlib
+import logging
+from typing import Any, Dict
+
+from fastmcp.server.dependencies import get_access_token, get_http_headers
+from fastmcp.server.middleware import CallNext, Middleware, MiddlewareContext
+from fastmcp.tools.tool import ToolResult
+
+from .limits import ConcurrencyLimiter, FairScheduler, QueueFullError, current_deadline, current_tenant
+from .metrics import metrics
+from .tracing import span
+
+# CoinEx error code "rate limit triggered", also used when the server itself sheds load
+OVERLOADED_CODE = 4213
+
+
+def error_result(code: int, message: str) -> ToolResult:
+    """Tool result in the CoinEx {code, message, data} shape, for calls rejected before reaching the tool."""
+    return ToolResult(structured_content={"code": code, "message": message, "data": None})
+
+
+def parse_tool_limits(value: str | None, default: int, cast=int) -> tuple[Any, Dict[str, Any]]:
+    """'8,scan_markets=2' -> (8, {'scan_markets': 2}); a bare number replaces the default."""
+    overrides: Dict[str, Any] = {}
+    for item in (value or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, sep, limit = item.partition("=")
+        if sep:
+            overrides[name.strip()] = cast(limit)
+        else:
+            default = cast(name)
+    return default, overrides
+
+
+class DeadlineMiddleware(Middleware):
+    """Gives every tool call a deadline and cancels it when the deadline passes.
+
+    Public (market data) tools get market_seconds, authenticated (account/trading) tools trading_seconds,
+    unless overridden per tool; 0 means no deadline. The deadline is published through current_deadline,
+    so upstream requests shorten their HTTP timeout to the time that is left. On expiry the call is
+    cancelled, which aborts in-flight httpx requests and gives their connection and rate budget back.
+    Cancellation by the MCP client propagates the same way.
+
+    Like every context variable, current_deadline is copied into tasks created during the call: work that must
+    outlive the call (pollers, refreshes, executions) is started with limits.create_background_task instead.
+    """
+
+    def __init__(self, market_seconds: float, trading_seconds: float, overrides: Dict[str, float] | None = None):
+        self.market_seconds = market_seconds
+        self.trading_seconds = trading_seconds
+        self._budgets: Dict[str, float] = dict(overrides or {})
+
+    async def _budget(self, context: MiddlewareContext) -> float:
+        tool = context.message.name
+        if tool not in self._budgets:
+            tags = set()
+            if context.fastmcp_context is not None:
+                try:
+                    tags = (await context.fastmcp_context.fastmcp.get_tool(tool)).tags
+                except Exception:
+                    # Unknown tool: the server reports it, don't cache a budget for it
+                    return self.market_seconds
+            self._budgets[tool] = self.trading_seconds if "auth" in tags else self.market_seconds
+        return self._budgets[tool]
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next: CallNext) -> Any:
+        tool = context.message.name
+        budget = await self._budget(context)
+        if not budget:
+            return await call_next(context)
+
+        token = current_deadline.set(time.monotonic() + budget)
+        try:
+            # wait_for rather than asyncio.timeout(), which needs Python 3.11
+            return await asyncio.wait_for(call_next(context), budget)
+        except asyncio.TimeoutError:
+            metrics.inc("tool_deadline_exceeded_total", tool=tool)
+            logging.error("%s error, deadline of %ss exceeded", tool, budget, extra={"tool": tool})
+            return error_result(-1, f"Request deadline of {budget}s exceeded")
+        except asyncio.CancelledError:
+            metrics.inc("tool_cancelled_total", tool=tool)
+            raise
+        finally:
+            current_deadline.reset(token)
+
+
+class ConcurrencyLimitMiddleware(Middleware):
+    """Caps concurrently executing tool calls, per tool and in total.
+
+    A call first takes a slot of its tool, then a global slot; while waiting it sits in a bounded queue.
+    When a queue is full the call is rejected at once with a {code, message} error instead of piling up,
+    so overload shows up as fast rejections rather than as growing latency for every caller.
+    Queue time, rejections and current queue lengths are reported through metrics.
+    """
+
+    def __init__(self, global_limit: int, tool_limit: int, max_queue: int,
+                 tool_limits: Dict[str, int] | None = None):
+        self.global_limiter = ConcurrencyLimiter(global_limit, max_queue)
+        self.tool_limit = tool_limit
+        self.tool_limits = tool_limits or {}
+        self.max_queue = max_queue
+        self._tool_limiters: Dict[str, ConcurrencyLimiter] = {}
+        metrics.gauge("tool_concurrency", self.state)
+
+    def _limiter(self, tool: str) -> ConcurrencyLimiter:
+        limiter = self._tool_limiters.get(tool)
+        if limiter is None:
+            limiter = ConcurrencyLimiter(self.tool_limits.get(tool, self.tool_limit), self.max_queue)
+            self._tool_limiters[tool] = limiter
+        return limiter
+
+    def state(self) -> Dict[str, Any]:
+        limiters = {"*": self.global_limiter, **self._tool_limiters}
+        return {name: {"in_flight": l.in_flight, "queued": l.waiting, "limit": l.limit} for name, l in limiters.items()}
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next: CallNext) -> Any:
+        tool = context.message.name
+        acquired = []
+        started = time.monotonic()
+        try:
+            for limiter in (self._limiter(tool), self.global_limiter):
+                await limiter.acquire()
+                acquired.append(limiter)
+        except QueueFullError as e:
+            for limiter in acquired:
+                limiter.release()
+            metrics.inc("tool_rejected_total", tool=tool)
+            logging.warning("%s rejected, server overloaded: %s", tool, e, extra={"tool": tool})
+            return error_result(OVERLOADED_CODE, "Server is busy, too many concurrent requests. Please retry later.")
+        except BaseException:
+            for limiter in acquired:
+                limiter.release()
+            raise
+
+        metrics.observe("tool_queue_seconds", time.monotonic() - started, tool=tool)
+        try:
+            return await call_next(context)
+        finally:
+            for limiter in acquired:
+                limiter.release()
+
+
+def tenant_key(kind: str, identity: str) -> str:
+    """Stable tenant name that does not expose the credential itself (it appears in /metrics)."""
+    return f"{kind}:{hashlib.sha256(identity.encode()).hexdigest()[:12]}"
+
+
+def parse_tenant_weights(value: str | None) -> Dict[str, float]:
+    """'<access id>=2,<bearer token>=0.5' -> weights keyed by tenant_key(); ids are matched as either kind."""
+    weights: Dict[str, float] = {}
+    for item in (value or "").split(","):
+        identity, sep, weight = item.strip().rpartition("=")
+        if sep and identity:
+            for kind in ("access", "token"):
+                weights[tenant_key(kind, identity)] = float(weight)
+    return weights
+
+
+def request_tenant() -> str:
+    """Tenant of the current HTTP request: the CoinEx access id header, else the bearer token, else anonymous."""
+    access_id = get_http_headers().get("x-coinex-access-id")
+    if access_id:
+        return tenant_key("access", access_id)
+    token = get_access_token()
+    if token is not None:
+        return tenant_key("token", token.token)
+    return "anonymous"
+
+
+class TenantMiddleware(Middleware):
+    """Runs each tool call on behalf of its tenant.
+
+    Upstream requests made during the call wait on the shared FairScheduler (see CoinExClient._request),
+    so every tenant gets a bounded, weighted share of upstream concurrency and rate budget.
+    Records per-tenant call latency, and answers with a {code, message} error when the tenant's queue is full.
+    """
+
+    def __init__(self, scheduler: FairScheduler):
+        self.scheduler = scheduler
+        metrics.gauge("tenants", scheduler.state)
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next: CallNext) -> Any:
+        tool = context.message.name
+        tenant = request_tenant()
+        token = current_tenant.set(tenant)
+        started = time.monotonic()
+        try:
+            return await call_next(context)
+        except Exception as e:
+            # Raised inside the tool, so it usually arrives wrapped in fastmcp's ToolError
+            cause = e if isinstance(e, QueueFullError) else e.__cause__
+            if not isinstance(cause, QueueFullError):
+                raise
+            metrics.inc("tenant_rejected_total", tenant=tenant)
+            logging.warning("%s rejected for %s: %s", tool, tenant, cause, extra={"tool": tool, "tenant": tenant})
+            return error_result(OVERLOADED_CODE, "Too many concurrent requests for this account. Please retry later.")
+        finally:
+            current_tenant.reset(token)
+            metrics.observe("tenant_tool_seconds", time.monotonic() - started, tenant=tenant)
+
+
+class TracingMiddleware(Middleware):
+    """Opens the root "mcp.call_tool" span of each tool call.
+
+    Installed outermost, so time spent waiting on deadlines, admission and tenant queues is part of the span;
+    the tool body ("mcp.tool") and its CoinEx requests ("coinex.request" and phases) become its children.
+    """
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next: CallNext) -> Any:
+        with span("mcp.call_tool", {"mcp.tool": context.message.name}):
+            return await call_next(context)
@@ -0,0 +1,74 @@
+"""
+Pagination cursors
+Opaque cursors over result snapshots: the first page stores the full sorted result once,
+later pages slice that snapshot until it expires
+"""
+
+import time
+import base64
+import secrets
+from typing import Any, Dict, List
+
+from .cache import TTLCache
+
+SNAPSHOT_TTL_SECONDS = 300
+MAX_SNAPSHOTS = 256
+
+
+def _encode(snapshot_id: str, offset: int, page_size: int) -> str:
+    raw = f"{snapshot_id}:{offset}:{page_size}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> tuple[str, int, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        snapshot_id, offset, page_size = raw.split(":")
+        offset, page_size = int(offset), int(page_size)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor") from None
+    if offset < 0 or page_size < 1:
+        raise ValueError("Invalid cursor")
+    return snapshot_id, offset, page_size
+
+
+class CursorPager:
+    """Pages through result snapshots.
+
+    first() keeps the materialized result and returns its first page; page() resumes from a cursor by slicing the
+    snapshot, so each further page costs O(page_size) and never goes upstream. Snapshots live ttl seconds from
+    creation (at most maxsize of them, least recently used evicted first); an expired cursor raises ValueError.
+    """
+
+    def __init__(self, ttl: float = SNAPSHOT_TTL_SECONDS, maxsize: int = MAX_SNAPSHOTS):
+        self.ttl = ttl
+        self._snapshots = TTLCache(maxsize)
+
+    def first(self, items: List[Any], page_size: int, age_ms: int | None = None) -> Dict[str, Any]:
+        """Snapshot items (age_ms: age of the data they came from) and return the first page."""
+        snapshot_id = secrets.token_urlsafe(12)
+        snapshot = (list(items), age_ms, time.monotonic())
+        self._snapshots.set(snapshot_id, snapshot)
+        return self._page(snapshot_id, snapshot, 0, page_size)
+
+    def page(self, cursor: str) -> Dict[str, Any]:
+        snapshot_id, offset, page_size = _decode(cursor)
+        hit, snapshot = self._snapshots.get(snapshot_id, self.ttl)
+        if not hit:
+            raise ValueError("Cursor expired or unknown; request the first page again")
+        return self._page(snapshot_id, snapshot, offset, page_size)
+
+    @staticmethod
+    def _page(snapshot_id: str, snapshot: tuple, offset: int, page_size: int) -> Dict[str, Any]:
+        items, age_ms, created = snapshot
+        end = offset + page_size
+        next_cursor = _encode(snapshot_id, end, page_size) if end < len(items) else None
+        result = {"code": 0, "message": "OK", "data": items[offset:end], "pagination": {
+            "total": len(items),
+            "offset": offset,
+            "has_next": next_cursor is not None,
+            "next_cursor": next_cursor,
+        }}
+        if age_ms is not None:
+            result["age_ms"] = age_ms + round((time.monotonic() - created) * 1000)
+        return result
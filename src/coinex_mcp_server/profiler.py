@@ -0,0 +1,167 @@
+"""
+Profiler
+Sampling profiler with collapsed-stack (flamegraph) output, and an event-loop lag monitor that captures
+the stack of whatever blocked the loop
+"""
+
+import sys
+import time
+import heapq
+import asyncio
+import threading
+from collections import Counter
+from itertools import count
+from typing import Any, Dict, List
+
+from .metrics import metrics
+
+DEFAULT_SAMPLE_INTERVAL = 0.01
+DEFAULT_LAG_INTERVAL = 0.1
+DEFAULT_LAG_THRESHOLD = 0.1
+
+
+def collapse(frame) -> str:
+    """Stack of frame as 'module:function;...' from the outermost call to frame, as flamegraph.pl expects."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{frame.f_globals.get('__name__', '?')}:{getattr(code, 'co_qualname', code.co_name)}")
+        frame = frame.f_back
+    names.reverse()
+    return ";".join(names)
+
+
+class SamplingProfiler:
+    """Samples thread stacks from a background thread while the profiled threads run undisturbed.
+
+    Every interval the sampler reads sys._current_frames() and counts the collapsed stack of each profiled
+    thread, so the overhead is one stack walk per thread per interval and nothing is instrumented.
+    One profile runs at a time.
+    """
+
+    def __init__(self):
+        self._running = False
+
+    @staticmethod
+    def sample(seconds: float, interval: float, thread_ids: set[int] | None = None,
+               stop: threading.Event | None = None) -> tuple[Counter, int]:
+        """Blocking sampling loop, until seconds have passed or stop is set:
+        (collapsed stack -> samples, number of sampling rounds)."""
+        stop = stop or threading.Event()
+        stacks: Counter = Counter()
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        rounds = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline and not stop.is_set():
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (thread_ids is not None and ident not in thread_ids):
+                    continue
+                stack = collapse(frame)
+                if thread_ids is None:
+                    stack = f"{names.get(ident, ident)};{stack}"
+                stacks[stack] += 1
+            frame = None
+            rounds += 1
+            stop.wait(interval)
+        return stacks, rounds
+
+    async def profile(self, seconds: float, interval: float = DEFAULT_SAMPLE_INTERVAL, all_threads: bool = False,
+                      max_stacks: int | None = None) -> Dict[str, Any]:
+        """Profile the event loop thread (or every thread) for seconds, without blocking the loop.
+
+        Returns the collapsed stacks, most sampled first, one 'stack count' line each; with max_stacks only
+        the most sampled stacks are listed and the rest are counted in truncated_samples.
+        """
+        if self._running:
+            raise RuntimeError("A profile is already running")
+        self._running = True
+        stop = threading.Event()
+        try:
+            thread_ids = None if all_threads else {threading.get_ident()}
+            stacks, rounds = await asyncio.to_thread(self.sample, seconds, interval, thread_ids, stop)
+        finally:
+            # A cancelled call (client gone, deadline) also ends the sampling thread
+            stop.set()
+            self._running = False
+        ranked = stacks.most_common(max_stacks)
+        return {
+            "seconds": seconds,
+            "interval_ms": round(interval * 1000, 3),
+            "samples": rounds,
+            "stacks": len(stacks),
+            "truncated_samples": sum(stacks.values()) - sum(n for _, n in ranked),
+            "collapsed": "\n".join(f"{stack} {n}" for stack, n in ranked),
+        }
+
+
+class LoopLagMonitor:
+    """Measures event-loop lag and records the slowest stalls with the stack that caused them.
+
+    A task on the loop sleeps for interval and records how late it woke up (event_loop_lag_seconds). A watchdog
+    thread checks that heartbeat; once it is more than threshold overdue, the loop is blocked by a callback, and the
+    watchdog captures the loop thread's stack. When the loop catches up the stall is recorded with that stack;
+    the `keep` slowest stalls are kept.
+    """
+
+    def __init__(self, interval: float = DEFAULT_LAG_INTERVAL, threshold: float = DEFAULT_LAG_THRESHOLD,
+                 keep: int = 20):
+        self.interval = interval
+        self.threshold = threshold
+        self.keep = keep
+        self.stalls = 0
+        self.max_lag = 0.0
+        self._slowest: List[tuple] = []
+        self._seq = count()
+        self._due = 0.0
+        # (heartbeat due time, stack) captured by the watchdog during the current stall
+        self._captured: tuple[float, str] | None = None
+        self._loop_thread: int | None = None
+        self._stopped = threading.Event()
+
+    async def run(self):
+        self._loop_thread = threading.get_ident()
+        self._stopped.clear()
+        self._due = time.monotonic() + self.interval
+        threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True).start()
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                now = time.monotonic()
+                due, self._due = self._due, now + self.interval
+                lag = max(0.0, now - due)
+                metrics.observe("event_loop_lag_seconds", lag)
+                captured, self._captured = self._captured, None
+                if lag >= self.threshold:
+                    self._record(lag, captured[1] if captured and captured[0] == due else None)
+        finally:
+            self._stopped.set()
+
+    def _watch(self):
+        while not self._stopped.wait(self.threshold / 2):
+            due = self._due
+            captured = self._captured
+            if (captured is None or captured[0] != due) and time.monotonic() - due > self.threshold:
+                frame = sys._current_frames().get(self._loop_thread)
+                if frame is not None:
+                    self._captured = (due, collapse(frame))
+                frame = None
+
+    def _record(self, lag: float, stack: str | None):
+        self.stalls += 1
+        self.max_lag = max(self.max_lag, lag)
+        entry = (lag, next(self._seq), time.time(), stack)
+        if len(self._slowest) < self.keep:
+            heapq.heappush(self._slowest, entry)
+        else:
+            heapq.heappushpop(self._slowest, entry)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "interval_ms": round(self.interval * 1000, 3),
+            "threshold_ms": round(self.threshold * 1000, 3),
+            "stalls": self.stalls,
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+            "slowest": [{"lag_ms": round(lag * 1000, 3), "at": int(at * 1000), "stack": stack}
+                        for lag, _, at, stack in sorted(self._slowest, reverse=True)],
+        }
@@ -0,0 +1,43 @@
+"""
+Response projection
+Field selection over tool results: dotted paths such as 'last' or 'depth.asks' pick keys of the data member,
+lists are projected element-wise and '*' matches every key of a mapping
+"""
+
+import re
+from typing import Any, Dict, Iterable
+
+_SEGMENT_RE = re.compile(r"^(\*|[A-Za-z0-9_]+)$")
+
+# Nested {segment: subtree}; an empty subtree keeps the whole value
+FieldTree = Dict[str, "FieldTree"]
+
+
+def parse_fields(fields: Iterable[str]) -> FieldTree:
+    """['market', 'depth.asks', 'depth.bids'] -> {'market': {}, 'depth': {'asks': {}, 'bids': {}}}"""
+    tree: FieldTree = {}
+    for path in fields:
+        segments = (path or "").strip().split(".")
+        if not all(_SEGMENT_RE.match(segment) for segment in segments):
+            raise ValueError(f"Invalid field {path!r}; expected dotted keys such as 'last' or 'depth.asks'")
+        node = tree
+        for segment in segments[:-1]:
+            if node.get(segment) == {}:
+                break  # a shorter path already keeps this whole value
+            node = node.setdefault(segment, {})
+        else:
+            node[segments[-1]] = {}
+    return tree
+
+
+def project(value: Any, tree: FieldTree) -> Any:
+    """New value holding only the paths in tree; the input (possibly a cached response) is left untouched."""
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [project(item, tree) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if "*" in tree:
+        return {key: project(item, tree["*"]) for key, item in value.items()}
+    return {key: project(value[key], subtree) for key, subtree in tree.items() if key in value}
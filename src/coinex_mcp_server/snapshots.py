@@ -0,0 +1,241 @@
+"""
+Shared market data snapshots
+A fetcher process polls tickers and hot-symbol order books and publishes them into a memory-mapped file;
+every server process on the host reads them from there instead of calling upstream itself
+
+Layout of the region file (tmpfs by default):
+- header: b"CXSS", format version (uint16), slot count (uint32), payload capacity per slot (uint32)
+- slot index: one 20 byte sha1 digest of the request key per slot
+- slots (8 byte aligned): sequence number (uint64), publish time ms (int64), payload length (uint32), padding,
+  followed by the JSON encoded API response
+
+Slots are seqlock protected: the writer makes the sequence odd, writes, then makes it even again;
+a reader retries until it sees the same even sequence before and after copying the payload.
+"""
+
+import os
+import sys
+import mmap
+import time
+import json
+import struct
+import asyncio
+import hashlib
+import logging
+import tempfile
+from typing import Any, Dict, Hashable, List, Tuple
+
+from .cache import default_shared_cache_dir
+from .coinex_client import CoinExClient, close_http_client
+from .warmup import HOT_DEPTH_PARAMS, WARMUP_MARKET_TYPES
+
+HEADER_MAGIC = b"CXSS"
+HEADER_VERSION = 1
+HEADER = struct.Struct("<4sHII")
+DIGEST_SIZE = 20
+SLOT_HEADER = struct.Struct("<QqI4x")
+SEQ = struct.Struct("<Q")
+
+# Big enough for the all-markets spot ticker response
+DEFAULT_SLOT_CAPACITY = 2 * 1024 * 1024
+READ_RETRIES = 100
+# How often readers check whether the fetcher has recreated the region
+REOPEN_CHECK_SECONDS = 1.0
+
+
+def default_snapshot_path() -> str:
+    return os.path.join(default_shared_cache_dir(), "snapshots.bin")
+
+
+def key_digest(key: Hashable) -> bytes:
+    return hashlib.sha1(repr(key).encode()).digest()
+
+
+def snapshot_requests(hot_symbols: List[Tuple[str, str]]) -> List[Tuple[Any, ...]]:
+    """Requests the fetcher keeps published: all-markets tickers, and order books of hot symbols.
+    Each entry is (endpoint, market_type, base, quote, extra_params)."""
+    requests = []
+    for mt in WARMUP_MARKET_TYPES:
+        requests.append(("ticker", mt, None, None, None))
+        for base, quote in hot_symbols:
+            requests.append(("depth", mt, base, quote, HOT_DEPTH_PARAMS))
+    return requests
+
+
+def _slots_offset(slot_count: int) -> int:
+    end = HEADER.size + slot_count * DIGEST_SIZE
+    return (end + 7) & ~7
+
+
+class SnapshotWriter:
+    """Creates the region for a fixed set of keys and publishes values into it (single writer)."""
+
+    def __init__(self, path: str, keys: List[Hashable], slot_capacity: int = DEFAULT_SLOT_CAPACITY):
+        self.path = path
+        self.slot_capacity = slot_capacity
+        self.slot_size = SLOT_HEADER.size + slot_capacity
+        digests = [key_digest(key) for key in keys]
+        base = _slots_offset(len(digests))
+        self._offsets = {digest: base + i * self.slot_size for i, digest in enumerate(digests)}
+
+        # Build the new region next to the old one and swap it in, readers notice the new inode
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(HEADER_MAGIC, HEADER_VERSION, len(digests), slot_capacity) + b"".join(digests))
+            f.truncate(base + len(digests) * self.slot_size)
+        os.replace(tmp, path)
+        self._file = open(path, "r+b")
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+
+    def publish(self, key: Hashable, value: Any) -> bool:
+        """Write value into key's slot; returns False if it does not fit (readers then fall back to upstream)."""
+        payload = json.dumps(value, separators=(",", ":")).encode()
+        if len(payload) > self.slot_capacity:
+            logging.warning("snapshot %r is %s bytes, larger than the slot capacity", key, len(payload))
+            return False
+        offset = self._offsets[key_digest(key)]
+        seq = SEQ.unpack_from(self._mm, offset)[0]
+        SEQ.pack_into(self._mm, offset, seq + 1)
+        self._mm[offset + SLOT_HEADER.size:offset + SLOT_HEADER.size + len(payload)] = payload
+        SLOT_HEADER.pack_into(self._mm, offset, seq + 1, int(time.time() * 1000), len(payload))
+        SEQ.pack_into(self._mm, offset, seq + 2)
+        return True
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+
+class SnapshotReader:
+    """Reads published snapshots; same get(key, ttl) -> (hit, value) interface as TTLCache.
+
+    Decoded values are kept per slot and reused until the slot's sequence changes,
+    so repeated reads of an unchanged snapshot neither copy nor parse it again.
+    """
+
+    def __init__(self, path: str, max_age: float):
+        self.path = path
+        self.max_age = max_age
+        self._mm: mmap.mmap | None = None
+        self._inode = None
+        self._offsets: Dict[bytes, int] = {}
+        self._decoded: Dict[int, Tuple[int, int, Any]] = {}
+        self._checked = 0.0
+
+    def _refresh_mapping(self):
+        now = time.monotonic()
+        if now - self._checked < REOPEN_CHECK_SECONDS:
+            return
+        self._checked = now
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            self._close()
+            return
+        if inode == self._inode:
+            return
+        self._close()
+        with open(self.path, "rb") as f:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # empty file
+                return
+        magic, version, count, capacity = HEADER.unpack_from(mm, 0)
+        if magic != HEADER_MAGIC or version != HEADER_VERSION:
+            mm.close()
+            return
+        base = _slots_offset(count)
+        slot_size = SLOT_HEADER.size + capacity
+        self._offsets = {
+            bytes(mm[HEADER.size + i * DIGEST_SIZE:HEADER.size + (i + 1) * DIGEST_SIZE]): base + i * slot_size
+            for i in range(count)
+        }
+        self._mm, self._inode = mm, inode
+
+    def _close(self):
+        if self._mm is not None:
+            self._mm.close()
+        self._mm, self._inode = None, None
+        self._offsets, self._decoded = {}, {}
+
+    def get(self, key: Hashable, ttl: float) -> Tuple[bool, Any]:
+        self._refresh_mapping()
+        offset = self._offsets.get(key_digest(key)) if self._mm is not None else None
+        if offset is None:
+            return False, None
+
+        mm = self._mm
+        for _ in range(READ_RETRIES):
+            seq, published_at, length = SLOT_HEADER.unpack_from(mm, offset)
+            if seq % 2:
+                continue
+            if seq == 0 or time.time() * 1000 - published_at > ttl * 1000:
+                return False, None
+            cached = self._decoded.get(offset)
+            if cached is not None and cached[0] == seq:
+                return True, cached[2]
+            payload = mm[offset + SLOT_HEADER.size:offset + SLOT_HEADER.size + length]
+            if SEQ.unpack_from(mm, offset)[0] != seq:
+                continue
+            value = json.loads(payload)
+            self._decoded[offset] = (seq, published_at, value)
+            return True, value
+        # The writer kept the slot busy; let the caller go upstream
+        return False, None
+
+    def close(self):
+        self._close()
+
+
+async def _poll(writer: SnapshotWriter, hot_symbols: List[Tuple[str, str]], interval: float):
+    client = CoinExClient(enable_env_credentials=False)
+    requests = snapshot_requests(hot_symbols)
+    parent = os.getppid()
+    try:
+        # Stop once the server process that launched us is gone, even if it was killed
+        while os.getppid() == parent:
+            started = time.monotonic()
+            results = await asyncio.gather(*(client.prefetch(*request) for request in requests),
+                                           return_exceptions=True)
+            for request, result in zip(requests, results):
+                if isinstance(result, Exception):
+                    logging.warning("snapshot fetch %s failed: %s", request[0], result)
+                elif result.get('code') == 0:
+                    writer.publish(CoinExClient.public_request_key(*request), result)
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+    finally:
+        await close_http_client()
+
+
+def run_fetcher(path: str, hot_symbols: List[Tuple[str, str]], interval: float,
+                slot_capacity: int = DEFAULT_SLOT_CAPACITY):
+    """Fetcher process entry point. Exits right away if another fetcher already serves path."""
+    import fcntl
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".lock", "a+b") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return
+        keys = [CoinExClient.public_request_key(*request) for request in snapshot_requests(hot_symbols)]
+        writer = SnapshotWriter(path, keys, slot_capacity)
+        print(f"Snapshot fetcher publishing {len(keys)} snapshots to {path}", file=sys.stderr)
+        try:
+            asyncio.run(_poll(writer, hot_symbols, interval))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            writer.close()
+
+
+def start_fetcher(path: str, hot_symbols: List[Tuple[str, str]], interval: float):
+    """Launch the fetcher as a daemon child process (dies with the server process that started it)."""
+    import multiprocessing
+
+    process = multiprocessing.get_context("spawn").Process(
+        target=run_fetcher, args=(path, hot_symbols, interval), name="coinex-snapshot-fetcher", daemon=True)
+    process.start()
+    return process
@@ -0,0 +1,171 @@
+"""
+Resource subscriptions
+Polls subscribed market data resources and pushes notifications/resources/updated to their subscribers,
+at most one notification per subscriber and resource every min_interval seconds
+"""
+
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Set, Tuple
+
+from pydantic import AnyUrl
+
+from .limits import create_background_task
+from .metrics import metrics
+
+# Each subscribed resource is polled upstream every poll_interval, so both counts are bounded
+MAX_SUBSCRIPTIONS_PER_SESSION = 50
+MAX_SUBSCRIBED_RESOURCES = 500
+
+
+class _Subscriber:
+    """Coalescing state of one session's subscription to one resource."""
+
+    def __init__(self):
+        self.last_sent = 0.0
+        self.pending: asyncio.Task | None = None
+
+
+class ResourceFeed:
+    """Shared ingestion for subscribed resources.
+
+    Each subscribed URI is read once per poll_interval, however many sessions subscribe to it; reads go through
+    the client's snapshot/cache layers. When the content changes every subscriber is notified, but no more often
+    than once per min_interval: changes arriving in between are folded into one delayed notification.
+    A session's subscriptions end when the session closes (or a notification to it fails).
+    """
+
+    def __init__(self, read: Callable[[str], Awaitable[Any]], poll_interval: float = 1.0, min_interval: float = 1.0,
+                 max_per_session: int = MAX_SUBSCRIPTIONS_PER_SESSION, max_resources: int = MAX_SUBSCRIBED_RESOURCES):
+        self.read = read
+        self.poll_interval = poll_interval
+        self.min_interval = min_interval
+        self.max_per_session = max_per_session
+        self.max_resources = max_resources
+        self._subscribers: Dict[str, Dict[Any, _Subscriber]] = {}
+        self._pollers: Dict[str, asyncio.Task] = {}
+        # Sessions whose close already drops their subscriptions
+        self._hooked: Set[Any] = set()
+        metrics.gauge("resource_subscriptions", lambda: {uri: len(s) for uri, s in self._subscribers.items()})
+
+    async def subscribe(self, session: Any, uri: str):
+        if session not in self._subscribers.get(uri, {}):
+            if sum(session in subscribers for subscribers in self._subscribers.values()) >= self.max_per_session:
+                raise ValueError(f"At most {self.max_per_session} resource subscriptions per session")
+            if uri not in self._subscribers and len(self._subscribers) >= self.max_resources:
+                raise ValueError("Too many subscribed resources on this server, try again later")
+        # Read once up front, so an unknown or invalid URI fails the subscribe request itself
+        await self.read(uri)
+        self._subscribers.setdefault(uri, {}).setdefault(session, _Subscriber())
+        self._hook_close(session)
+        poller = self._pollers.get(uri)
+        if poller is None or poller.done():
+            # Started by a subscribe request, but must not inherit its deadline
+            self._pollers[uri] = create_background_task(self._poll(uri))
+
+    def _hook_close(self, session: Any):
+        # The MCP SDK offers no close callback; ServerSession closes its exit stack when the connection ends
+        exit_stack = getattr(session, "_exit_stack", None)
+        if exit_stack is None or session in self._hooked:
+            return
+        self._hooked.add(session)
+        exit_stack.callback(self._drop_session, session)
+
+    def unsubscribe(self, session: Any, uri: str):
+        subscriber = self._subscribers.get(uri, {}).pop(session, None)
+        if subscriber is not None and subscriber.pending is not None:
+            subscriber.pending.cancel()
+        if uri in self._subscribers and not self._subscribers[uri]:
+            del self._subscribers[uri]
+            poller = self._pollers.pop(uri, None)
+            if poller is not None:
+                poller.cancel()
+
+    def _drop_session(self, session: Any):
+        self._hooked.discard(session)
+        for uri in [uri for uri, subscribers in self._subscribers.items() if session in subscribers]:
+            self.unsubscribe(session, uri)
+
+    @staticmethod
+    def _fingerprint(value: Any) -> Any:
+        # age_ms changes on every read of cached data and is not a change of the data itself
+        if isinstance(value, dict):
+            return {k: v for k, v in value.items() if k != "age_ms"}
+        return value
+
+    async def _poll(self, uri: str):
+        last: Tuple[bool, Any] = (False, None)
+        while uri in self._subscribers:
+            try:
+                value = self._fingerprint(await self.read(uri))
+            except Exception as e:
+                logging.warning("resource poll %s failed: %s", uri, e)
+            else:
+                if last[0] and value != last[1]:
+                    for session in list(self._subscribers.get(uri, {})):
+                        self._notify(session, uri)
+                last = (True, value)
+            await asyncio.sleep(self.poll_interval)
+
+    def _notify(self, session: Any, uri: str):
+        subscriber = self._subscribers.get(uri, {}).get(session)
+        if subscriber is None:
+            return
+        if subscriber.pending is not None:
+            # A notification is already scheduled and will cover this change too
+            metrics.inc("resource_updates_coalesced_total")
+            return
+        delay = subscriber.last_sent + self.min_interval - time.monotonic()
+        subscriber.pending = create_background_task(self._send(session, uri, subscriber, max(0.0, delay)))
+
+    async def _send(self, session: Any, uri: str, subscriber: _Subscriber, delay: float):
+        if delay:
+            await asyncio.sleep(delay)
+        subscriber.pending = None
+        subscriber.last_sent = time.monotonic()
+        try:
+            await session.send_resource_updated(AnyUrl(uri))
+            metrics.inc("resource_updates_sent_total")
+        except Exception as e:
+            # The session is gone; forget all of its subscriptions
+            logging.info("dropping subscriptions of closed session: %s", e)
+            self._drop_session(session)
+
+    def close(self):
+        for task in self._pollers.values():
+            task.cancel()
+        for subscribers in self._subscribers.values():
+            for subscriber in subscribers.values():
+                if subscriber.pending is not None:
+                    subscriber.pending.cancel()
+        self._pollers.clear()
+        self._subscribers.clear()
+        self._hooked.clear()
+
+
+def enable_subscriptions(server, feed: ResourceFeed):
+    """Answer resources/subscribe and resources/unsubscribe through feed, and advertise resources.subscribe.
+
+    FastMCP registers no subscription handlers, and the MCP SDK reports subscribe=False unconditionally,
+    so both are attached to the underlying low-level server here.
+    """
+    low_level = server._mcp_server
+
+    @low_level.subscribe_resource()
+    async def subscribe(uri: AnyUrl):
+        await feed.subscribe(low_level.request_context.session, str(uri))
+
+    @low_level.unsubscribe_resource()
+    async def unsubscribe(uri: AnyUrl):
+        feed.unsubscribe(low_level.request_context.session, str(uri))
+
+    get_capabilities = low_level.get_capabilities
+
+    def capabilities(*args, **kwargs):
+        result = get_capabilities(*args, **kwargs)
+        if result.resources is not None:
+            result.resources.subscribe = True
+        return result
+
+    low_level.get_capabilities = capabilities
@@ -0,0 +1,226 @@
+"""
+Trade tape
+Per-market ring buffer of recent deals, filled by polling the deals endpoint and keeping track of the last deal id,
+with rolling VWAP / buy and sell volume / trade count over fixed windows maintained as deals arrive
+"""
+
+import time
+import asyncio
+import logging
+from collections import deque
+from decimal import Decimal
+from typing import Any, Deque, Dict, Iterable, List, Tuple
+
+from .coinex_client import CoinExClient
+from .limits import create_background_task
+
+DEFAULT_TAPE_CAPACITY = 5000
+DEFAULT_TAPE_WINDOWS = (60, 300, 900)
+# Largest page of the deals endpoint; more new deals than this between two polls leaves a gap in the tape
+POLL_LIMIT = 1000
+# Markets nobody has queried for this long stop being polled
+IDLE_SECONDS = 600
+# Markets polled at once; a new market beyond this replaces the least recently queried one
+MAX_TAPES = 50
+
+
+def parse_windows(value: str | None) -> Tuple[int, ...]:
+    """'60,300,900' -> (60, 300, 900)"""
+    windows = sorted({int(item) for item in (value or "").split(",") if item.strip()})
+    return tuple(windows) or DEFAULT_TAPE_WINDOWS
+
+
+class RollingWindow:
+    """Aggregates of the deals of the last `seconds`, updated per deal and per eviction rather than recomputed.
+
+    Sums are kept as Decimal, so adding and later subtracting the same deal leaves no rounding residue.
+    """
+
+    def __init__(self, seconds: int):
+        self.seconds = seconds
+        self._deals: Deque[Tuple[int, Decimal, Decimal, bool]] = deque()
+        self.count = 0
+        self.volume = Decimal(0)
+        self.notional = Decimal(0)
+        self.buy_volume = Decimal(0)
+
+    def add(self, created_at: int, price: Decimal, amount: Decimal, is_buy: bool):
+        self._deals.append((created_at, price, amount, is_buy))
+        self._apply(price, amount, is_buy, 1)
+
+    def evict(self, now_ms: int):
+        cutoff = now_ms - self.seconds * 1000
+        while self._deals and self._deals[0][0] <= cutoff:
+            _, price, amount, is_buy = self._deals.popleft()
+            self._apply(price, amount, is_buy, -1)
+
+    def _apply(self, price: Decimal, amount: Decimal, is_buy: bool, sign: int):
+        self.count += sign
+        self.volume += sign * amount
+        self.notional += sign * price * amount
+        if is_buy:
+            self.buy_volume += sign * amount
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "window_seconds": self.seconds,
+            "trade_count": self.count,
+            "volume": str(self.volume),
+            "buy_volume": str(self.buy_volume),
+            "sell_volume": str(self.volume - self.buy_volume),
+            "vwap": f"{(self.notional / self.volume).normalize():f}" if self.volume else None,
+        }
+
+
+class TradeTape:
+    """Most recent deals of one market in ascending deal id order, at most `capacity` of them."""
+
+    def __init__(self, capacity: int = DEFAULT_TAPE_CAPACITY, windows: Iterable[int] = DEFAULT_TAPE_WINDOWS):
+        self._deals: Deque[Dict[str, Any]] = deque(maxlen=capacity)
+        self.windows = [RollingWindow(seconds) for seconds in windows]
+        self.last_id = 0
+        self.gaps = 0
+
+    def __len__(self):
+        return len(self._deals)
+
+    def extend(self, page: List[Dict[str, Any]]) -> int:
+        """Append the deals of a newest-first page that are newer than last_id; returns how many were new."""
+        new = [deal for deal in page if int(deal["deal_id"]) > self.last_id]
+        if not new:
+            return 0
+        if self.last_id and len(new) == len(page) and len(page) >= POLL_LIMIT:
+            # Nothing in the page was seen before, so deals between the two polls may be missing
+            self.gaps += 1
+        new.sort(key=lambda deal: int(deal["deal_id"]))
+        for deal in new:
+            self._deals.append(deal)
+            price, amount = Decimal(deal["price"]), Decimal(deal["amount"])
+            for window in self.windows:
+                window.add(int(deal["created_at"]), price, amount, deal.get("side") == "buy")
+        for window in self.windows:
+            window.evict(int(new[-1]["created_at"]))
+        self.last_id = int(new[-1]["deal_id"])
+        return len(new)
+
+    def since(self, deal_id: int | None = None, since_ms: int | None = None,
+              limit: int = 100) -> Tuple[List[Dict[str, Any]], bool]:
+        """Deals after deal_id (or created after since_ms), oldest first, at most limit of them.
+
+        Walks back from the newest deal, so a client polling for deltas pays only for what is new.
+        The flag is True when the tape no longer holds everything after the given point.
+        Without either point the latest limit deals are returned.
+        """
+        if deal_id is None and since_ms is None:
+            start = max(0, len(self._deals) - limit)
+            return [self._deals[i] for i in range(start, len(self._deals))], False
+        newer: List[Dict[str, Any]] = []
+        for deal in reversed(self._deals):
+            if deal_id is not None and int(deal["deal_id"]) <= deal_id:
+                break
+            if since_ms is not None and int(deal["created_at"]) <= since_ms:
+                break
+            newer.append(deal)
+        else:
+            # Ran off the start of the tape: deals between the given point and the oldest one held are unknown
+            truncated = bool(self._deals)
+            newer.reverse()
+            return newer[:limit], truncated
+        newer.reverse()
+        return newer[:limit], False
+
+    def aggregates(self, now_ms: int | None = None) -> List[Dict[str, Any]]:
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        for window in self.windows:
+            window.evict(now_ms)
+        return [window.summary() for window in self.windows]
+
+
+class TapeFeed:
+    """Keeps a TradeTape per queried market up to date by polling the deals endpoint every `interval` seconds.
+
+    A market is tracked from its first successful query on and dropped after IDLE_SECONDS without queries,
+    or when max_tapes other markets were queried since, so at most max_tapes markets are polled upstream.
+    """
+
+    def __init__(self, client: CoinExClient, capacity: int = DEFAULT_TAPE_CAPACITY,
+                 windows: Iterable[int] = DEFAULT_TAPE_WINDOWS, interval: float = 1.0, max_tapes: int = MAX_TAPES):
+        self.client = client
+        self.capacity = capacity
+        self.windows = tuple(windows)
+        self.interval = interval
+        self.max_tapes = max_tapes
+        self._tapes: Dict[Tuple[str, str, str], TradeTape] = {}
+        self._queried: Dict[Tuple[str, str, str], float] = {}
+        # First loads in progress, shared by concurrent first queries of a market
+        self._loading: Dict[Tuple[str, str, str], asyncio.Future] = {}
+        self._poller: asyncio.Task | None = None
+
+    async def tape(self, base: str, quote: str, market_type: CoinExClient.MarketType) -> TradeTape:
+        """The market's tape; the first query fills it before returning and starts background polling."""
+        key = (base.upper(), quote.upper(), market_type.value)
+        tape = self._tapes.get(key)
+        if tape is None:
+            tape = await self._load(key)
+        self._queried[key] = time.monotonic()
+        if self._poller is None or self._poller.done():
+            # Started by a get_trades_since call, but must not inherit its deadline
+            self._poller = create_background_task(self._run())
+        return tape
+
+    async def _load(self, key: Tuple[str, str, str]) -> TradeTape:
+        while (loading := self._loading.get(key)) is not None:
+            try:
+                return await asyncio.shield(loading)
+            except asyncio.CancelledError:
+                if not loading.cancelled():
+                    raise
+                # The query that owned the load was cancelled; take over
+
+        loading = self._loading[key] = asyncio.get_running_loop().create_future()
+        try:
+            tape = TradeTape(self.capacity, self.windows)
+            await self._poll(key, tape)
+        except asyncio.CancelledError:
+            loading.cancel()
+            raise
+        except BaseException as e:
+            loading.set_exception(e)
+            # Mark retrieved so an unshared failure doesn't log "exception was never retrieved"
+            loading.exception()
+            raise
+        else:
+            while len(self._tapes) >= self.max_tapes:
+                oldest = min(self._tapes, key=lambda k: self._queried.get(k, 0.0))
+                self._tapes.pop(oldest)
+                self._queried.pop(oldest, None)
+            self._tapes[key] = tape
+            loading.set_result(tape)
+            return tape
+        finally:
+            del self._loading[key]
+
+    async def _poll(self, key: Tuple[str, str, str], tape: TradeTape):
+        base, quote, market_type = key
+        result = await self.client.get_deal(base, quote, CoinExClient.MarketType(market_type), limit=POLL_LIMIT)
+        if result.get('code') != 0:
+            raise RuntimeError(f"code:{result.get('code')}, message:{result.get('message')}")
+        tape.extend(result.get('data') or [])
+
+    async def _run(self):
+        while self._tapes:
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            for key in [key for key, at in self._queried.items() if now - at > IDLE_SECONDS]:
+                self._tapes.pop(key, None)
+                self._queried.pop(key, None)
+            keys = list(self._tapes)
+            results = await asyncio.gather(*(self._poll(key, self._tapes[key]) for key in keys),
+                                           return_exceptions=True)
+            for key, result in zip(keys, results):
+                if isinstance(result, Exception):
+                    logging.warning("trade tape poll %s%s failed: %s", key[0], key[1], result)
+
+    def close(self):
+        if self._poller is not None:
+            self._poller.cancel()
@@ -0,0 +1,74 @@
+"""
+Tracing
+Optional OpenTelemetry spans around MCP dispatch, tool calls and the phases of CoinEx API requests;
+until configure_tracing() enables an exporter every span is one shared no-op object
+"""
+
+from typing import Any, Dict
+
+TRACE_EXPORTERS = ("none", "console", "otlp")
+
+_tracer = None
+_provider = None
+
+
+class _NoopSpan:
+    """Stands in for both the span context manager and the span while tracing is off."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def span(name: str, attributes: Dict[str, Any] | None = None):
+    """Context manager for a child span of the current one (the shared no-op while tracing is off)."""
+    if _tracer is None:
+        return _NOOP
+    return _tracer.start_as_current_span(name, attributes=attributes)
+
+
+def configure_tracing(exporter: str, endpoint: str | None = None, service_name: str = "coinex-mcp-server"):
+    """Export spans to the console or an OTLP/HTTP collector (endpoint defaults to the OTEL_* environment)."""
+    global _tracer, _provider
+    if exporter not in TRACE_EXPORTERS:
+        raise ValueError(f"Unknown trace exporter {exporter!r}; expected one of {', '.join(TRACE_EXPORTERS)}")
+    if exporter == "none":
+        return
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+        if exporter == "otlp":
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    except ImportError as e:
+        raise RuntimeError("Tracing requires OpenTelemetry: pip install 'coinex-mcp-server[tracing]'") from e
+
+    if exporter == "console":
+        span_exporter = ConsoleSpanExporter()
+    else:
+        span_exporter = OTLPSpanExporter(endpoint=endpoint) if endpoint else OTLPSpanExporter()
+    _provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    _provider.add_span_processor(BatchSpanProcessor(span_exporter))
+    trace.set_tracer_provider(_provider)
+    _tracer = trace.get_tracer("coinex_mcp_server")
+
+
+def shutdown_tracing():
+    """Flush pending spans."""
+    global _tracer, _provider
+    if _provider is not None:
+        _provider.shutdown()
+    _tracer = _provider = None
@@ -0,0 +1,92 @@
+"""
+Server warm-up
+Pre-opens pooled upstream connections and preloads market metadata / ticker snapshots before the server reports ready
+"""
+
+import sys
+import time
+import asyncio
+import logging
+from typing import Any, Dict, List, Tuple
+
+from .coinex_client import CoinExClient
+
+WARMUP_MARKET_TYPES = (CoinExClient.MarketType.SPOT, CoinExClient.MarketType.FUTURES)
+# Order book parameters matching the get_orderbook tool defaults, so preloaded books are cache hits
+HOT_DEPTH_PARAMS = {"limit": 20, "interval": "0"}
+
+
+class Readiness:
+    """Readiness state reported by the /ready endpoint."""
+
+    def __init__(self):
+        self.ready = False
+        self.report: Dict[str, Any] = {}
+
+    def mark_ready(self, report: Dict[str, Any] | None = None):
+        self.report = report or {}
+        self.ready = True
+
+
+def parse_hot_symbols(value: str | None, default_quote: str = "USDT") -> List[Tuple[str, str]]:
+    """'BTC,ETH/BTC' -> [('BTC', 'USDT'), ('ETH', 'BTC')]"""
+    pairs = []
+    for item in (value or "").split(","):
+        item = item.strip().upper()
+        if item:
+            base, _, quote = item.partition("/")
+            pairs.append((base, quote or default_quote))
+    return pairs
+
+
+def _snapshot_jobs(client: CoinExClient, hot_symbols: List[Tuple[str, str]], include_metadata: bool,
+                   max_age: float | None = None):
+    """Prefetch coroutines by report name. max_age=None reuses entries younger than the endpoint's cache TTL,
+    so workers starting together behind a shared cache fetch each snapshot once."""
+    def age(endpoint: str) -> float:
+        return CoinExClient.PUBLIC_CACHE_TTLS[endpoint] if max_age is None else max_age
+
+    jobs = {}
+    for mt in WARMUP_MARKET_TYPES:
+        if include_metadata:
+            jobs[f"market:{mt.value}"] = client.prefetch("market", mt, max_age=age("market"))
+        jobs[f"ticker:{mt.value}"] = client.prefetch("ticker", mt, max_age=age("ticker"))
+        for base, quote in hot_symbols:
+            jobs[f"depth:{mt.value}:{base}{quote}"] = client.prefetch("depth", mt, base, quote, HOT_DEPTH_PARAMS,
+                                                                      max_age=age("depth"))
+    return jobs
+
+
+async def warm_up(client: CoinExClient, hot_symbols: List[Tuple[str, str]]) -> Dict[str, Any]:
+    """Preload spot/futures market metadata, ticker snapshots and hot-symbol order books concurrently.
+
+    The concurrent requests also open pooled keep-alive connections to api.coinex.com.
+    Returns a per-item report ("ok" or an error message) plus the elapsed time.
+    """
+    started = time.monotonic()
+    jobs = _snapshot_jobs(client, hot_symbols, include_metadata=True)
+    results = await asyncio.gather(*jobs.values(), return_exceptions=True)
+
+    report: Dict[str, Any] = {}
+    for name, result in zip(jobs, results):
+        if isinstance(result, Exception):
+            report[name] = str(result)
+        elif result.get('code') != 0:
+            report[name] = f"code:{result.get('code')}, message:{result.get('message')}"
+        else:
+            report[name] = "ok"
+    report["elapsed_ms"] = round((time.monotonic() - started) * 1000)
+    print(f"Warm-up finished in {report['elapsed_ms']} ms", file=sys.stderr)
+    return report
+
+
+async def keep_hot(client: CoinExClient, hot_symbols: List[Tuple[str, str]], interval: float):
+    """Refresh ticker snapshots and hot-symbol order books every interval seconds until cancelled.
+    Snapshots refreshed less than half an interval ago (by another process sharing the cache) are skipped.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        jobs = _snapshot_jobs(client, hot_symbols, include_metadata=False, max_age=interval / 2)
+        for name, result in zip(jobs, await asyncio.gather(*jobs.values(), return_exceptions=True)):
+            if isinstance(result, Exception):
+                logging.warning("hot refresh %s failed: %s", name, result)
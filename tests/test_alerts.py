@@ -0,0 +1,210 @@
+"""
+Test cases for the alert engine and alert tools (no network access required)
+"""
+import time
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from fastmcp import Client
+
+from coinex_mcp_server import main
+from coinex_mcp_server.alerts import TRIGGERED_RETENTION_SECONDS, AlertEngine, AlertMonitor, parse_condition
+from coinex_mcp_server.coinex_client import CoinExClient
+from coinex_mcp_server.limits import current_deadline, deadline_remaining
+
+
+def triggered_ids(records):
+    return sorted(record["alert_id"] for _, record in records)
+
+
+class TestAlertEngine:
+    """Test the threshold index and per-owner queues"""
+
+    def test_parse_condition(self):
+        assert parse_condition("last>=70000") == ("last", ">=", 70000.0)
+        assert parse_condition(" funding_rate < -0.001 ") == ("funding_rate", "<", -0.001)
+        for bad in ("last==1", "price>1", "last>", ""):
+            with pytest.raises(ValueError):
+                parse_condition(bad)
+
+    def test_only_crossed_thresholds_trigger(self):
+        engine = AlertEngine()
+        above = [engine.add("s1", "spot", "BTC", "USDT", f"last>={p}").alert_id for p in (100, 110, 120)]
+        strict = engine.add("s1", "spot", "BTC", "USDT", "last>110").alert_id
+        below = [engine.add("s1", "spot", "BTC", "USDT", f"last<={p}").alert_id for p in (90, 80)]
+        other = engine.add("s1", "spot", "ETH", "USDT", "last>=1").alert_id
+
+        assert triggered_ids(engine.evaluate("spot", "BTCUSDT", "last", 105)) == above[:1]
+        assert triggered_ids(engine.evaluate("spot", "BTCUSDT", "last", 110)) == above[1:2]
+        assert triggered_ids(engine.evaluate("spot", "BTCUSDT", "last", 110.5)) == [strict]
+        assert triggered_ids(engine.evaluate("spot", "BTCUSDT", "last", 85)) == below[:1]
+        assert engine.evaluate("spot", "BTCUSDT", "last", float("nan")) == []
+        assert [a.alert_id for a in engine.alerts("s1")] == [above[2], below[1], other]
+
+    def test_triggers_once_and_queues_per_owner(self):
+        engine = AlertEngine()
+        mine = engine.add("s1", "futures", "BTC", "USDT", "funding_rate>0.001", note="hot").alert_id
+        theirs = engine.add("s2", "futures", "BTC", "USDT", "funding_rate>0.002").alert_id
+
+        records = engine.evaluate("futures", "BTCUSDT", "funding_rate", 0.003)
+        assert triggered_ids(records) == [mine, theirs]
+        assert engine.evaluate("futures", "BTCUSDT", "funding_rate", 0.004) == []
+        assert len(engine) == 0 and engine.watched() == {}
+
+        polled = engine.drain("s1")
+        assert [(r["alert_id"], r["note"], r["value"]) for r in polled] == [(mine, "hot", 0.003)]
+        assert polled[0]["condition"] == "funding_rate>0.001"
+        assert engine.drain("s1") == []
+        assert [r["alert_id"] for r in engine.drain("s2")] == [theirs]
+
+    def test_cancel_is_owner_scoped(self):
+        engine = AlertEngine()
+        alert_id = engine.add("s1", "spot", "BTC", "USDT", "last<50000").alert_id
+
+        assert engine.cancel("s2", alert_id) is False
+        assert engine.cancel("s1", alert_id) is True
+        assert engine.cancel("s1", alert_id) is False
+        assert engine.evaluate("spot", "BTCUSDT", "last", 1) == []
+
+    def test_unpolled_triggers_expire(self):
+        engine = AlertEngine()
+        engine.add("s1", "spot", "BTC", "USDT", "last>1")
+        engine.add("s2", "spot", "BTC", "USDT", "last>2")
+        triggered_at = engine.evaluate("spot", "BTCUSDT", "last", 3)[0][1]["triggered_at"]
+
+        engine.expire_triggered(triggered_at + 1000)
+        assert len(engine.drain("s1")) == 1
+        engine.expire_triggered(triggered_at + TRIGGERED_RETENTION_SECONDS * 1000 + 1)
+        assert engine._triggered == {} and engine.drain("s2") == []
+
+
+class TestAlertMonitor:
+    """Test evaluation against ticker, funding-rate and depth snapshots"""
+
+    @pytest.mark.asyncio
+    async def test_check_uses_bulk_snapshots(self):
+        client = AsyncMock(spec=CoinExClient)
+        client.get_tickers.return_value = {"code": 0, "data": [
+            {"market": "BTCUSDT", "last": "71000", "open": "70000"},
+            {"market": "ETHUSDT", "last": "3000", "open": "3000"},
+        ]}
+        client.futures_get_funding_rate.return_value = {"code": 0, "data": [
+            {"market": "BTCUSDT", "latest_funding_rate": "0.0002"}]}
+        client.get_depth.return_value = {"code": 0, "data": {"depth": {"asks": [["101", "1"]], "bids": [["99", "1"]]}}}
+
+        engine = AlertEngine()
+        price = engine.add("s1", "spot", "BTC", "USDT", "last>=70500").alert_id
+        change = engine.add("s1", "spot", "ETH", "USDT", "change_pct>1").alert_id
+        funding = engine.add("s1", "futures", "BTC", "USDT", "funding_rate>=0.0002").alert_id
+        spread = engine.add("s2", "spot", "BTC", "USDT", "spread_pct>1.5").alert_id
+        notified = []
+
+        async def notify(record):
+            notified.append(record["alert_id"])
+
+        monitor = AlertMonitor(engine, client)
+        monitor._notifiers["s1"] = notify
+        await monitor.check()
+
+        assert sorted(notified) == [price, funding]
+        assert [a.alert_id for a in engine.alerts("s1")] == [change]
+        assert [r["alert_id"] for r in engine.drain("s2")] == [spread]
+        # One all-markets ticker request per market type, however many alerts
+        assert client.get_tickers.await_count == 2
+        client.get_depth.assert_awaited_once_with("BTC", "USDT", CoinExClient.MarketType.SPOT, 20, "0")
+
+    @pytest.mark.asyncio
+    async def test_notifiers_dropped_without_active_alerts(self):
+        client = AsyncMock(spec=CoinExClient)
+        client.get_tickers.return_value = {"code": 0, "data": [{"market": "BTCUSDT", "last": "71000"}]}
+        engine = AlertEngine()
+        engine.add("s1", "spot", "BTC", "USDT", "last>=70000")
+        cancelled = engine.add("s2", "spot", "BTC", "USDT", "last>=80000").alert_id
+        monitor = AlertMonitor(engine, client, interval=0.01)
+        notify = AsyncMock()
+        monitor._notifiers.update(s1=notify, s2=AsyncMock())
+
+        # s1's only alert triggers and is delivered
+        await monitor.check()
+        notify.assert_awaited_once()
+        assert list(monitor._notifiers) == ["s2"]
+
+        # s2 cancels its only alert: the monitor stops and forgets it
+        engine.cancel("s2", cancelled)
+        monitor.watch("s3")
+        await monitor._task
+        assert monitor._notifiers == {}
+
+    @pytest.mark.asyncio
+    async def test_monitor_outlives_deadline_of_creating_call(self):
+        ticker = {"market": "BTCUSDT", "last": "70000"}
+
+        async def get_tickers(*args):
+            # Like CoinExClient._request: nothing is sent once the current MCP request's deadline has passed
+            if deadline_remaining(10) <= 0:
+                raise Exception("Request timeout")
+            return {"code": 0, "data": [dict(ticker)]}
+
+        client = AsyncMock(spec=CoinExClient)
+        client.get_tickers.side_effect = get_tickers
+        engine = AlertEngine()
+        alert_id = engine.add("s1", "spot", "BTC", "USDT", "last>=80000").alert_id
+        monitor = AlertMonitor(engine, client, interval=0.01)
+        token = current_deadline.set(time.monotonic() + 0.05)
+        try:
+            monitor.watch("s1")
+        finally:
+            current_deadline.reset(token)
+
+        await asyncio.sleep(0.1)
+        ticker["last"] = "81000"
+        for _ in range(100):
+            if not len(engine):
+                break
+            await asyncio.sleep(0.01)
+        monitor.close()
+
+        assert [r["alert_id"] for r in engine.drain("s1")] == [alert_id]
+
+
+class TestAlertTools:
+    """Test the alert tools through an MCP client"""
+
+    def setup_method(self):
+        main.coinex_client = AsyncMock(spec=CoinExClient)
+        main.coinex_client.get_tickers.return_value = {"code": 0, "data": [{"market": "BTCUSDT", "last": "70000"}]}
+        main.alert_engine = main.AlertEngine()
+        main.alert_monitor = main.AlertMonitor(main.alert_engine, main.coinex_client, interval=0.01)
+
+    def teardown_method(self):
+        main.alert_monitor.close()
+        main.alert_monitor = None
+
+    @pytest.mark.asyncio
+    async def test_create_trigger_notify_and_poll(self):
+        logged = []
+
+        async def log_handler(message):
+            logged.append(message)
+
+        async with Client(main.mcp, log_handler=log_handler) as client:
+            created = (await client.call_tool("create_alert", {"base": "BTC", "condition": "last>=69000"})).data
+            pending = (await client.call_tool("create_alert", {"base": "BTC", "condition": "last>=80000"})).data
+            assert created["code"] == 0 and created["data"]["market"] == "BTCUSDT"
+
+            for _ in range(100):
+                if logged:
+                    break
+                await asyncio.sleep(0.01)
+            polled = (await client.call_tool("poll_alerts", {})).data
+            listed = (await client.call_tool("list_alerts", {})).data
+            cancelled = (await client.call_tool("cancel_alert", {"alert_id": pending["data"]["alert_id"]})).data
+            invalid = (await client.call_tool("create_alert", {"base": "BTC", "condition": "last=1"})).data
+
+        assert logged[0].logger == "coinex.alerts"
+        assert logged[0].data["alert_id"] == created["data"]["alert_id"]
+        assert [r["alert_id"] for r in polled["data"]] == [created["data"]["alert_id"]]
+        assert polled["data"][0]["value"] == 70000
+        assert [a["alert_id"] for a in listed["data"]] == [pending["data"]["alert_id"]]
+        assert cancelled["code"] == 0
+        assert invalid["code"] == -1
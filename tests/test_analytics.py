@@ -0,0 +1,185 @@
+"""
+Test cases for analytics helpers (pure computations, no network access required)
+"""
+import math
+import statistics
+import pytest
+from array import array
+from decimal import Decimal
+
+from coinex_mcp_server import analytics
+
+
+TICKERS = [
+    {"market": "BTCUSDT", "last": "50000"},
+    {"market": "ETHUSDT", "last": "2500"},
+    {"market": "ETHBTC", "last": "0.05"},
+    {"market": "USDCUSDT", "last": "1"},
+]
+
+
+class TestPortfolioValuation:
+    """Test balance normalization and valuation"""
+
+    def test_price_in_direct_inverse_and_bridged(self):
+        prices = analytics.build_price_table(TICKERS)
+
+        assert analytics.price_in("BTC", "USDT", prices) == Decimal("50000")
+        assert analytics.price_in("USDT", "BTC", prices) == Decimal(1) / Decimal("50000")
+        assert analytics.price_in("USDC", "BTC", prices) == Decimal(1) / Decimal("50000")
+        assert analytics.price_in("XYZ", "USDT", prices) is None
+
+    def test_balance_holdings_per_account_type(self):
+        spot = analytics.balance_holdings("spot", [{"ccy": "BTC", "available": "1", "frozen": "0.5"}])
+        futures = analytics.balance_holdings("futures", [
+            {"ccy": "USDT", "available": "100", "frozen": "0", "margin": "50", "unrealized_pnl": "-10"}
+        ])
+        margin = analytics.balance_holdings("margin", [{
+            "base_ccy": "ETH", "quote_ccy": "USDT",
+            "available": {"ETH": "2", "USDT": "0"}, "frozen": {"ETH": "0", "USDT": "0"},
+            "repaid": {"ETH": "0", "USDT": "1000"}, "interest": {"ETH": "0", "USDT": "1"},
+        }])
+
+        assert spot == {"BTC": Decimal("1.5")}
+        assert futures == {"USDT": Decimal("140")}
+        assert margin == {"ETH": Decimal("2"), "USDT": Decimal("-1001")}
+
+    def test_value_portfolio_summary(self):
+        holdings = {
+            "spot": {"BTC": Decimal("1"), "XYZ": Decimal("10")},
+            "futures": {"USDT": Decimal("100")},
+        }
+
+        summary = analytics.value_portfolio(holdings, TICKERS, "USDT")
+
+        assert summary["total_value"] == "50100.00000000"
+        assert summary["accounts"] == {"spot": "50000.00000000", "futures": "100.00000000"}
+        assert [a["ccy"] for a in summary["assets"]] == ["BTC", "USDT"]
+        assert summary["unpriced"] == ["XYZ"]
+
+    def test_value_portfolio_min_value_hides_dust(self):
+        holdings = {"spot": {"BTC": Decimal("1"), "USDT": Decimal("0.5")}}
+
+        summary = analytics.value_portfolio(holdings, TICKERS, "USDT", Decimal("1"))
+
+        assert [a["ccy"] for a in summary["assets"]] == ["BTC"]
+        assert summary["total_value"] == "50000.50000000"
+
+
+class TestMarketScanner:
+    """Test columnar ticker scanning"""
+
+    TICKERS = [
+        {"market": "AAAUSDT", "last": "11", "open": "10", "high": "12", "low": "9", "volume": "5", "value": "50"},
+        {"market": "BBBUSDT", "last": "8", "open": "10", "high": "10", "low": "8", "volume": "50", "value": "400"},
+        {"market": "CCCUSDT", "last": "30", "open": "20", "high": "30", "low": "20", "volume": "10", "value": "300"},
+        {"market": "DDDBTC", "last": "1", "open": "1", "high": "1", "low": "1", "volume": "1", "value": "1"},
+    ]
+
+    def test_columns_and_quote_filter(self):
+        columns = analytics.ticker_columns(self.TICKERS, quote="USDT")
+
+        assert columns["market"] == ["AAAUSDT", "BBBUSDT", "CCCUSDT"]
+        assert columns["change_pct"][0] == pytest.approx(10.0)
+        assert columns["range_pct"][2] == pytest.approx(50.0)
+
+    def test_top_k_by_metric(self):
+        columns = analytics.ticker_columns(self.TICKERS, quote="USDT")
+
+        rows = analytics.scan(columns, sort_by="change_pct", top_k=2)
+        assert [r["market"] for r in rows] == ["CCCUSDT", "AAAUSDT"]
+
+        rows = analytics.scan(columns, sort_by="change_pct", descending=False, top_k=1)
+        assert [r["market"] for r in rows] == ["BBBUSDT"]
+
+    def test_filters(self):
+        columns = analytics.ticker_columns(self.TICKERS, quote="USDT")
+
+        rows = analytics.scan(columns, filters=["value>=300", "change_pct > 0"], top_k=10)
+
+        assert [r["market"] for r in rows] == ["CCCUSDT"]
+
+    def test_funding_rate_join_skips_missing(self):
+        funding = [{"market": "AAAUSDT", "latest_funding_rate": "0.001"}]
+        columns = analytics.ticker_columns(self.TICKERS, funding, quote="USDT")
+
+        rows = analytics.scan(columns, sort_by="funding_rate", top_k=10)
+
+        assert [r["market"] for r in rows] == ["AAAUSDT"]
+        assert rows[0]["funding_rate"] == 0.001
+
+    @pytest.mark.parametrize("expression", ["value>>1", "unknown>1", "value>abc", ""])
+    def test_invalid_filter(self, expression):
+        columns = analytics.ticker_columns(self.TICKERS)
+
+        with pytest.raises(ValueError):
+            analytics.scan(columns, filters=[expression])
+
+
+class TestFundingBasisScreener:
+    """Test the funding / basis join"""
+
+    FUTURES = [
+        {"market": "AAAUSDT", "last": "101", "mark_price": "101", "index_price": "100"},
+        {"market": "BBBUSDT", "last": "50", "mark_price": "49", "index_price": "50"},
+    ]
+    FUNDING = [
+        {"market": "AAAUSDT", "latest_funding_rate": "0.0001",
+         "latest_funding_time": 0, "next_funding_time": 8 * 3600 * 1000},
+        {"market": "BBBUSDT", "latest_funding_rate": "-0.001",
+         "latest_funding_time": 0, "next_funding_time": 4 * 3600 * 1000},
+    ]
+    SPOT = [{"market": "AAAUSDT", "last": "100"}]
+
+    def test_join_and_derived_metrics(self):
+        columns = analytics.funding_basis_columns(self.FUTURES, self.FUNDING, self.SPOT, "USDT")
+
+        assert columns["annualized_funding_pct"][0] == pytest.approx(0.0001 * 3 * 365 * 100)
+        assert columns["annualized_funding_pct"][1] == pytest.approx(-0.001 * 6 * 365 * 100)
+        assert columns["basis_pct"][0] == pytest.approx(1.0)
+        assert columns["spot_perp_spread_pct"][0] == pytest.approx(1.0)
+
+    def test_ranked_by_absolute_value(self):
+        columns = analytics.funding_basis_columns(self.FUTURES, self.FUNDING, self.SPOT, "USDT")
+
+        rows = analytics.screen(columns, "annualized_funding_pct", top_k=2)
+
+        assert [r["market"] for r in rows] == ["BBBUSDT", "AAAUSDT"]
+        assert "spot_perp_spread_pct" not in rows[0]
+
+
+def candles(times, closes):
+    return {"created_at": array("d", times), "close": array("d", closes)}
+
+
+class TestCorrelationVolatility:
+    """Test timestamp alignment, rolling volatility and the covariance/correlation matrices"""
+
+    def test_align_on_common_timestamps(self):
+        timestamps, closes = analytics.align_closes({
+            "AAAUSDT": candles([1, 2, 3, 4], [10, 11, 12, 13]),
+            "BBBUSDT": candles([2, 3, 4, 5], [20, 21, 22, 23]),
+        })
+
+        assert list(timestamps) == [2, 3, 4]
+        assert list(closes["AAAUSDT"]) == [11, 12, 13] and list(closes["BBBUSDT"]) == [20, 21, 22]
+
+    def test_rolling_volatility(self):
+        returns = array("d", [0.01, -0.01, 0.02, 0.0])
+        rolling = analytics.rolling_volatility(returns, 2)
+
+        assert math.isnan(rolling[0])
+        assert rolling[1] == pytest.approx(statistics.stdev([0.01, -0.01]))
+        assert rolling[3] == pytest.approx(statistics.stdev([0.02, 0.0]))
+
+    def test_covariance_and_correlation(self):
+        a = array("d", [0.01, -0.02, 0.03, 0.0])
+        markets, covariance, correlation = analytics.covariance_matrix({
+            "A": a, "B": array("d", (2 * r for r in a)), "C": array("d", (-r for r in a)), "D": array("d", [0.0] * 4),
+        })
+
+        assert markets == ["A", "B", "C", "D"]
+        assert covariance[0][0] == pytest.approx(statistics.variance(a))
+        assert covariance[0][1] == pytest.approx(2 * covariance[0][0])
+        assert correlation[0][1] == pytest.approx(1) and correlation[0][2] == pytest.approx(-1)
+        assert math.isnan(correlation[0][3])
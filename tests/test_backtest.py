@@ -0,0 +1,117 @@
+"""
+Test cases for the backtest engine and backtest tool (no network access required)
+"""
+import math
+from array import array
+import pytest
+from unittest.mock import AsyncMock
+from fastmcp import Client
+
+from coinex_mcp_server import main
+from coinex_mcp_server.backtest import (BacktestSpec, candle_columns, ema, rsi, run_backtest, run_many, shutdown_pool,
+                                        signal, sma)
+from coinex_mcp_server.coinex_client import CoinExClient
+
+
+def klines(closes, spread=0.0):
+    return [{"created_at": i * 3600000, "open": str(c), "high": str(c + spread), "low": str(c - spread),
+             "close": str(c), "volume": "1"} for i, c in enumerate(closes)]
+
+
+def wave(size=200):
+    return candle_columns(klines([100 + 10 * math.sin(i / 5) for i in range(size)], spread=1))
+
+
+class TestIndicators:
+    """Test column-wise indicators and rule evaluation"""
+
+    def test_moving_averages_and_rsi(self):
+        values = candle_columns(klines([1, 2, 3, 4, 5, 4]))["close"]
+
+        assert list(sma(values, 3))[2:] == [2, 3, 4, 13 / 3]
+        assert math.isnan(sma(values, 3)[1])
+        gap = sma(array("d", [1, 2, math.nan, 4, 5, 6, 7]), 2)
+        assert [v == v for v in gap] == [False, True, False, False, True, True, True] and gap[-1] == 6.5
+        assert list(ema(values, 3))[2:4] == [2, 3]
+        assert rsi(values, 3)[3] == 100 and 0 < rsi(values, 3)[5] < 100
+
+    def test_rules(self):
+        columns = candle_columns(klines([5, 4, 3, 4, 5, 6]))
+
+        assert signal(columns, "close crosses_above sma(2)") == [False, False, False, True, False, False]
+        assert signal(columns, "close >= 5") == [True, False, False, False, True, True]
+        for bad in ("close == 5", "macd(3) > 1", "close > ", "sma > 1"):
+            with pytest.raises(ValueError):
+                signal(columns, bad)
+
+
+class TestSimulation:
+    """Test the simulation and the statistics it reports"""
+
+    def test_buy_and_hold_matches_market(self):
+        columns = candle_columns(klines([100, 110, 99, 121]))
+        stats = run_backtest(BacktestSpec("close > 0", "close < 0", fee_rate=0), columns)
+
+        assert stats["trades"] == 1 and stats["total_return_pct"] == stats["buy_and_hold_pct"] == 21
+        assert stats["max_drawdown_pct"] == 10 and stats["exposure_pct"] == 75
+
+    def test_fees_position_size_and_stop_loss(self):
+        columns = candle_columns(klines([100, 100, 90, 120], spread=5))
+        spec = BacktestSpec("close > 0", "close < 0", position_pct=50, fee_rate=0.001, stop_loss_pct=3)
+        stats = run_backtest(spec, columns)
+
+        # Entry at 100 with half the equity, stopped at 97 on the next bar; re-entered at 90, closed at the end at 120
+        equity = 1 - 0.5 * 0.001
+        equity += 0.005 * (97 - 100) - 0.005 * 97 * 0.001
+        after_stop = equity
+        units = equity * 0.5 / 90
+        equity += -equity * 0.5 * 0.001 + units * (120 - 90) - units * 120 * 0.001
+        assert stats["trades"] == 2 and stats["win_rate_pct"] == 50
+        assert stats["total_return_pct"] == round((equity - 1) * 100, 4)
+        assert stats["avg_trade_pct"] == round(((after_stop - 1) + (equity / after_stop - 1)) / 2 * 100, 4)
+        assert run_backtest(BacktestSpec("close > 0", "close < 0", side="short"), columns)["total_return_pct"] < -20
+
+    @pytest.mark.asyncio
+    async def test_process_pool_matches_inline(self):
+        spec = BacktestSpec("sma(3) crosses_above sma(10)", "sma(3) crosses_below sma(10)")
+        markets = {"AUSDT": wave(), "BUSDT": wave(150)}
+        try:
+            pooled = await run_many(spec, markets, workers=2)
+        finally:
+            shutdown_pool()
+
+        assert pooled == await run_many(spec, markets, workers=0)
+        assert pooled["AUSDT"]["trades"] > 0
+
+
+class TestBacktestTool:
+    """Test the backtest tool through an MCP client"""
+
+    def setup_method(self):
+        main.coinex_client = AsyncMock(spec=CoinExClient)
+        main.candle_cache.invalidate()
+        main.tool_cache.invalidate()
+
+        async def get_kline(period, base, quote, market_type, limit):
+            if base == "BAD":
+                return {"code": 3639, "message": "market not found"}
+            return {"code": 0, "message": "OK", "data": klines([100, 105, 103, 110][:limit] * 5)}
+
+        main.coinex_client.get_kline.side_effect = get_kline
+
+    @pytest.mark.asyncio
+    async def test_backtest_markets_with_cached_candles(self):
+        args = {"markets": ["BTC", "eth", "BAD"], "entry": "close > sma(2)", "exit": "close < sma(2)"}
+        async with Client(main.mcp) as client:
+            first = (await client.call_tool("backtest", args)).data
+            short = (await client.call_tool("backtest", {**args, "side": "short"})).data
+            repeated = (await client.call_tool("backtest", args)).data
+            invalid = (await client.call_tool("backtest", {**args, "entry": "close ~ 1"})).data
+
+        assert first["code"] == 0 and first == repeated
+        assert set(first["data"]["markets"]) == {"BTCUSDT", "ETHUSDT", "BADUSDT"}
+        assert first["data"]["markets"]["BTCUSDT"]["bars"] == short["data"]["markets"]["BTCUSDT"]["bars"] == 20
+        assert "3639" in first["data"]["markets"]["BADUSDT"]["error"]
+        # Candles are reused across specs and calls; failed loads are not cached
+        assert main.coinex_client.get_kline.await_count == 5
+        assert invalid["code"] == -1
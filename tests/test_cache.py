@@ -0,0 +1,418 @@
+"""
+Test cases for the response cache (no network access required)
+"""
+import os
+import time
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from coinex_mcp_server.cache import TTLCache
+
+
+class TestTTLCache:
+    """Test TTL expiry, eviction and single-flight loading"""
+
+    @pytest.mark.asyncio
+    async def test_hit_until_expired(self):
+        cache = TTLCache()
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            return len(calls)
+
+        with patch("coinex_mcp_server.cache.time.monotonic", return_value=100.0):
+            assert await cache.get_or_load("k", loader, ttl=5) == 1
+            assert await cache.get_or_load("k", loader, ttl=5) == 1
+        with patch("coinex_mcp_server.cache.time.monotonic", return_value=106.0):
+            assert await cache.get_or_load("k", loader, ttl=5) == 2
+
+    @pytest.mark.asyncio
+    async def test_single_flight(self):
+        cache = TTLCache()
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "value"
+
+        results = await asyncio.gather(*(cache.get_or_load("k", loader, ttl=5) for _ in range(10)))
+
+        assert results == ["value"] * 10
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_cache_if_and_errors_are_not_stored(self):
+        cache = TTLCache()
+
+        async def error_result():
+            return {"code": 3008}
+
+        async def failing():
+            raise RuntimeError("boom")
+
+        await cache.get_or_load("k", error_result, ttl=5, cache_if=lambda v: v.get("code") == 0)
+        assert cache.get("k", ttl=5) == (False, None)
+
+        with pytest.raises(RuntimeError):
+            await cache.get_or_load("k", failing, ttl=5)
+        assert cache.get("k", ttl=5) == (False, None)
+
+    @pytest.mark.asyncio
+    async def test_waiter_takes_over_when_owner_cancelled(self):
+        cache = TTLCache()
+
+        async def slow():
+            await asyncio.sleep(10)
+
+        async def fast():
+            return "fresh"
+
+        owner = asyncio.ensure_future(cache.get_or_load("k", slow, ttl=5))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(cache.get_or_load("k", fast, ttl=5))
+        await asyncio.sleep(0)
+        owner.cancel()
+
+        assert await waiter == "fresh"
+
+    def test_lru_eviction(self):
+        cache = TTLCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a", ttl=5)
+        cache.set("c", 3)
+
+        assert cache.get("b", ttl=5) == (False, None)
+        assert cache.get("a", ttl=5) == (True, 1)
+
+
+class TestClientCache:
+    """Test public market data caching in CoinExClient"""
+
+    @staticmethod
+    def _client(responses):
+        from coinex_mcp_server.coinex_client import CoinExClient
+        client = CoinExClient(enable_env_credentials=False, cache=TTLCache())
+        calls = []
+
+        async def fake_request(method, path, data=None):
+            calls.append((path, dict(data or {})))
+            return responses[path]
+
+        client._request = fake_request
+        return client, calls
+
+    @pytest.mark.asyncio
+    async def test_single_market_lookup_served_from_snapshot(self):
+        from coinex_mcp_server.coinex_client import CoinExClient
+        snapshot = {"code": 0, "message": "OK", "data": [{"market": "BTCUSDT", "last": "1"},
+                                                         {"market": "ETHUSDT", "last": "2"}]}
+        client, calls = self._client({"/v2/spot/ticker": snapshot})
+
+        await client.prefetch("ticker", CoinExClient.MarketType.SPOT)
+        result = await client.get_tickers("ETH", "USDT", CoinExClient.MarketType.SPOT)
+
+        assert result["data"] == [{"market": "ETHUSDT", "last": "2"}]
+        assert calls == [("/v2/spot/ticker", {})]
+
+    @pytest.mark.asyncio
+    async def test_returned_copy_does_not_mutate_cache(self):
+        from coinex_mcp_server.coinex_client import CoinExClient
+        client, calls = self._client({"/v2/spot/market": {"code": 0, "message": "OK", "data": [{"market": "BTCUSDT"}]}})
+
+        first = await client.get_market_info(None, None, CoinExClient.MarketType.SPOT)
+        first["data"] = []
+        second = await client.get_market_info(None, None, CoinExClient.MarketType.SPOT)
+
+        assert second["data"] == [{"market": "BTCUSDT"}]
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_errors_are_not_cached(self):
+        from coinex_mcp_server.coinex_client import CoinExClient
+        client, calls = self._client({"/v2/spot/ticker": {"code": 3008, "message": "busy"}})
+
+        await client.get_tickers(None, None, CoinExClient.MarketType.SPOT)
+        await client.get_tickers(None, None, CoinExClient.MarketType.SPOT)
+
+        assert len(calls) == 2
+
+
+class TestWarmUp:
+    """Test start-up preloading and readiness"""
+
+    @pytest.mark.asyncio
+    async def test_report_lists_each_snapshot(self):
+        from unittest.mock import AsyncMock
+        from coinex_mcp_server import warmup
+
+        client = AsyncMock()
+        client.prefetch.side_effect = lambda endpoint, mt, *args, **kwargs: (
+            {"code": 0} if endpoint != "depth" else {"code": 3639, "message": "market not found"})
+
+        report = await warmup.warm_up(client, warmup.parse_hot_symbols("btc"))
+
+        assert report["market:spot"] == "ok"
+        assert report["ticker:futures"] == "ok"
+        assert report["depth:spot:BTCUSDT"] == "code:3639, message:market not found"
+        assert "elapsed_ms" in report
+
+    def test_parse_hot_symbols(self):
+        from coinex_mcp_server.warmup import parse_hot_symbols
+
+        assert parse_hot_symbols("btc, ETH/BTC,,") == [("BTC", "USDT"), ("ETH", "BTC")]
+        assert parse_hot_symbols(None) == []
+
+    @pytest.mark.asyncio
+    async def test_ready_endpoint(self):
+        from coinex_mcp_server import main
+        from coinex_mcp_server.warmup import Readiness
+
+        original = main.readiness
+        try:
+            main.readiness = Readiness()
+            response = await main.ready_endpoint(None)
+            assert response.status_code == 503
+
+            main.readiness.mark_ready({"elapsed_ms": 5})
+            response = await main.ready_endpoint(None)
+            assert response.status_code == 200
+        finally:
+            main.readiness = original
+
+    @pytest.mark.asyncio
+    async def test_metrics_endpoint_requires_token(self):
+        from starlette.requests import Request
+        from fastmcp.server.auth import StaticTokenVerifier
+        from coinex_mcp_server import main
+
+        def request(*headers):
+            return Request({"type": "http", "headers": [(b"authorization", h.encode()) for h in headers]})
+
+        original = main.mcp.auth
+        try:
+            main.mcp.auth = None
+            assert (await main.metrics_endpoint(request())).status_code == 401
+            main.mcp.auth = StaticTokenVerifier(tokens={"secret": {"client_id": "api-token", "scopes": []}})
+            assert (await main.metrics_endpoint(request("Bearer wrong"))).status_code == 401
+            assert (await main.metrics_endpoint(request("Bearer secret"))).status_code == 200
+            main.public_metrics = True
+            assert (await main.metrics_endpoint(request())).status_code == 200
+        finally:
+            main.mcp.auth = original
+            main.public_metrics = False
+
+
+class TestSharedCache:
+    """Test the file-backed cache shared between processes (two instances stand in for two workers)"""
+
+    @pytest.mark.asyncio
+    async def test_value_visible_to_other_instance(self, tmp_path):
+        from coinex_mcp_server.cache import SharedCache
+        first, second = SharedCache(str(tmp_path)), SharedCache(str(tmp_path))
+
+        first.set(("path", ()), {"code": 0, "data": [1]})
+
+        assert second.get(("path", ()), ttl=5) == (True, {"code": 0, "data": [1]})
+        second.invalidate()
+        assert first.get(("path", ()), ttl=5) == (False, None)
+
+    @pytest.mark.asyncio
+    async def test_one_designated_fetcher_per_key(self, tmp_path):
+        from coinex_mcp_server.cache import SharedCache
+        first, second = SharedCache(str(tmp_path)), SharedCache(str(tmp_path))
+        calls = []
+
+        async def slow_loader():
+            calls.append("first")
+            await asyncio.sleep(0.1)
+            return {"code": 0}
+
+        async def loader():
+            calls.append("second")
+            return {"code": 0}
+
+        results = await asyncio.gather(
+            first.get_or_load("k", slow_loader, ttl=5),
+            second.get_or_load("k", loader, ttl=5),
+        )
+
+        assert results == [{"code": 0}, {"code": 0}]
+        assert calls == ["first"]
+
+    @pytest.mark.asyncio
+    async def test_rejected_results_are_not_shared(self, tmp_path):
+        from coinex_mcp_server.cache import SharedCache
+        first, second = SharedCache(str(tmp_path)), SharedCache(str(tmp_path))
+
+        async def loader():
+            return {"code": 3008}
+
+        await first.get_or_load("k", loader, ttl=5, cache_if=lambda r: r["code"] == 0)
+
+        assert second.get("k", ttl=5) == (False, None)
+
+    def test_sweep_removes_expired_and_excess_files(self, tmp_path):
+        from coinex_mcp_server.cache import SharedCache
+        writer = SharedCache(str(tmp_path), maxsize=2, max_age=3600)
+        for age, key in ((7200, "expired"), (30, "oldest"), (20, "older"), (10, "newest")):
+            writer.set(key, {"code": 0})
+            stamp = time.time() - age
+            os.utime(writer._path(key), (stamp, stamp))
+        stale_lock = writer._path("expired")[:-len(".json")] + ".lock"
+        open(stale_lock, "w").close()
+        os.utime(stale_lock, (time.time() - 7200,) * 2)
+
+        # A restarted worker sweeps at startup
+        reader = SharedCache(str(tmp_path), maxsize=2, max_age=3600)
+
+        assert [reader.get(key, ttl=3600)[0] for key in ("expired", "oldest", "older", "newest")] == [
+            False, False, True, True]
+        assert not os.path.exists(stale_lock)
+        assert len([name for name in os.listdir(tmp_path) if name.endswith(".json")]) == 2
+
+
+class TestPersistentCache:
+    """Test the on-disk cache for slow-changing responses"""
+
+    MARKETS = {"code": 0, "message": "OK", "data": [{"market": "BTCUSDT"}, {"market": "ETHUSDT"}]}
+
+    def test_entries_survive_restart(self, tmp_path):
+        from coinex_mcp_server.cache import PersistentCache
+        key = ("/v2/spot/market", ())
+
+        PersistentCache(str(tmp_path)).set(key, self.MARKETS, etag='"v1"')
+        (tmp_path / "garbage.json").write_bytes(b"not json")
+        restarted = PersistentCache(str(tmp_path))
+
+        assert len(restarted) == 1
+        assert restarted.get(key, ttl=60) == (True, self.MARKETS)
+        assert restarted._meta[key]["etag"] == '"v1"'
+
+    def test_least_recently_used_entry_evicted(self, tmp_path):
+        from coinex_mcp_server.cache import PersistentCache
+        cache = PersistentCache(str(tmp_path), maxsize=2)
+        cache.set("a", {"code": 0})
+        cache.set("b", {"code": 0})
+        assert cache.get("a", ttl=60)[0]
+
+        cache.set("c", {"code": 0})
+
+        assert [cache.get(key, ttl=60)[0] for key in ("a", "b", "c")] == [True, False, True]
+        assert len(os.listdir(tmp_path)) == 2
+        # On restart with a smaller maxsize, the most recently stored entries are kept
+        restarted = PersistentCache(str(tmp_path), maxsize=1)
+        assert [restarted.get(key, ttl=60)[0] for key in ("a", "c")] == [False, True]
+        assert len(os.listdir(tmp_path)) == 1
+
+    @pytest.mark.asyncio
+    async def test_not_modified_renews_store_time(self, tmp_path):
+        from coinex_mcp_server.cache import PersistentCache
+        cache = PersistentCache(str(tmp_path))
+        with patch("coinex_mcp_server.cache.time.time", return_value=1000.0):
+            cache.set("k", {"code": 0}, etag='"v1"')
+        sent = []
+
+        async def fetch(etag):
+            sent.append(etag)
+            return None, None
+
+        await cache.revalidate("k", fetch)
+
+        assert sent == ['"v1"']
+        assert cache.age("k") < 60
+        assert cache.get("k", ttl=60) == (True, {"code": 0})
+
+    @pytest.mark.asyncio
+    async def test_client_serves_stale_and_revalidates(self, tmp_path):
+        from coinex_mcp_server.cache import PersistentCache
+        from coinex_mcp_server.coinex_client import CoinExClient
+        key = ("/v2/spot/market", ())
+        with patch("coinex_mcp_server.cache.time.time", return_value=1000.0):
+            PersistentCache(str(tmp_path)).set(key, self.MARKETS, etag='"v1"')
+
+        client = CoinExClient(enable_env_credentials=False, persistent=PersistentCache(str(tmp_path), max_age=10 ** 10))
+        calls = []
+
+        async def fake_request(method, path, data=None, response_meta=None):
+            calls.append(response_meta.get("etag"))
+            response_meta["etag"] = '"v2"'
+            return {"code": 0, "message": "OK", "data": [{"market": "BTCUSDT"}]}
+
+        client._request = fake_request
+        result = await client.get_market_info("ETH", "USDT", CoinExClient.MarketType.SPOT)
+        assert result["data"] == [{"market": "ETHUSDT"}]
+
+        await asyncio.sleep(0)
+        assert calls == ['"v1"']
+        assert client.persistent.get(key, ttl=60) == (True, {"code": 0, "message": "OK", "data": [{"market": "BTCUSDT"}]})
+
+
+class TestStaleWhileRevalidate:
+    """Test stale serving with background refresh and stale-if-error"""
+
+    @staticmethod
+    def _clock(now):
+        return patch("coinex_mcp_server.cache.time.monotonic", return_value=now)
+
+    @pytest.mark.asyncio
+    async def test_stale_value_returned_while_one_refresh_runs(self):
+        cache = TTLCache()
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            return {"code": 0, "n": len(calls)}
+
+        with self._clock(100.0):
+            assert await cache.get_stale_while_revalidate("k", loader, 2, 30, 300) == ({"code": 0, "n": 1}, 0.0)
+        with self._clock(110.0):
+            first = await cache.get_stale_while_revalidate("k", loader, 2, 30, 300)
+            second = await cache.get_stale_while_revalidate("k", loader, 2, 30, 300)
+            await asyncio.sleep(0)
+
+        assert first == second == ({"code": 0, "n": 1}, 10.0)
+        assert len(calls) == 2
+        with self._clock(110.0):
+            assert cache.get("k", ttl=2) == (True, {"code": 0, "n": 2})
+
+    @pytest.mark.asyncio
+    async def test_stale_if_error(self):
+        cache = TTLCache()
+        with self._clock(100.0):
+            cache.set("k", {"code": 0})
+
+        async def failing():
+            raise Exception("Request timeout")
+
+        async def busy():
+            return {"code": 3008}
+
+        with self._clock(200.0):
+            assert await cache.get_stale_while_revalidate("k", failing, 2, 30, 300) == ({"code": 0}, 100.0)
+            assert await cache.get_stale_while_revalidate("k", busy, 2, 30, 300,
+                                                          cache_if=lambda r: r["code"] == 0) == ({"code": 0}, 100.0)
+        with self._clock(500.0):
+            with pytest.raises(Exception, match="timeout"):
+                await cache.get_stale_while_revalidate("k", failing, 2, 30, 300)
+
+    @pytest.mark.asyncio
+    async def test_client_reports_age_ms(self):
+        from coinex_mcp_server.coinex_client import CoinExClient
+        client = CoinExClient(enable_env_credentials=False, cache=TTLCache())
+
+        async def fake_request(method, path, data=None):
+            return {"code": 0, "message": "OK", "data": [{"market": "BTCUSDT"}]}
+
+        client._request = fake_request
+        with self._clock(100.0):
+            await client.get_index_price(None, None, CoinExClient.MarketType.SPOT)
+        with self._clock(105.0):
+            result = await client.get_index_price(None, None, CoinExClient.MarketType.SPOT)
+            single = await client.get_tickers("BTC", "USDT", CoinExClient.MarketType.SPOT)
+
+        assert result["age_ms"] == 5000
+        assert single["age_ms"] == 0
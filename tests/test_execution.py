@@ -0,0 +1,283 @@
+"""
+Test cases for the server-side execution engine against a local mock exchange (no network access required)
+"""
+import time
+import asyncio
+import pytest
+from decimal import Decimal
+from fastmcp import Client
+
+from coinex_mcp_server import main
+from coinex_mcp_server.coinex_client import CoinExClient
+from coinex_mcp_server.limits import current_deadline, deadline_remaining
+from coinex_mcp_server.execution import (CANCELLED, DONE, FAILED, BracketStrategy, ExecutionEngine, IcebergStrategy,
+                                         OCOStrategy, TrailingStopStrategy, TWAPStrategy, split_amount)
+
+BUY, SELL = CoinExClient.OrderSide.BUY, CoinExClient.OrderSide.SELL
+SPOT = CoinExClient.MarketType.SPOT
+
+
+class MockExchange:
+    """Implements the CoinExClient calls the engine makes; market orders fill at once, limit orders rest."""
+
+    def __init__(self, price="100"):
+        self.access_id = "test-key"
+        self.price = price
+        self.orders = []
+        self.pending = set()
+        self.cancelled = []
+        self.reject = False
+
+    @staticmethod
+    def _check_deadline():
+        # Like CoinExClient._request: nothing is sent once the current MCP request's deadline has passed
+        if deadline_remaining(10) <= 0:
+            raise Exception("Request timeout")
+
+    async def get_deal(self, base, quote, market_type=None, limit=100):
+        self._check_deadline()
+        return {"code": 0, "message": "OK", "data": [{"deal_id": 1, "price": self.price}]}
+
+    async def place_order(self, side, base, quote, amount, market_type=SPOT, price=None, **kwargs):
+        self._check_deadline()
+        if self.reject:
+            return {"code": 3109, "message": "balance not enough"}
+        order_id = len(self.orders) + 1
+        self.orders.append({"order_id": order_id, "side": side.value, "market": base + quote, "amount": amount,
+                            "price": price})
+        if price is not None:
+            self.pending.add(order_id)
+        return {"code": 0, "message": "OK", "data": {"order_id": order_id}}
+
+    async def cancel_order(self, base, quote, market_type=SPOT, order_id=None):
+        self.pending.discard(order_id)
+        self.cancelled.append(order_id)
+        return {"code": 0, "message": "OK", "data": {}}
+
+    async def get_orders(self, base=None, quote=None, market_type=SPOT, side=None, status=None, **kwargs):
+        return {"code": 0, "message": "OK", "data": [{"order_id": order_id} for order_id in sorted(self.pending)]}
+
+    async def get_order_status(self, base, quote, market_type=SPOT, order_id=None):
+        # Orders that are neither resting nor cancelled have filled
+        order = self.orders[order_id - 1]
+        status = "open" if order_id in self.pending else "canceled" if order_id in self.cancelled else "filled"
+        return {"code": 0, "message": "OK", "data": {"order_id": order_id, "status": status,
+                                                     "filled_amount": order["amount"] if status == "filled" else "0"}}
+
+
+def make(cls, exchange, side=SELL, amount="1", **kwargs):
+    return cls(exchange, "owner", SPOT, "btc", "usdt", side, amount, **kwargs)
+
+
+async def run_prices(engine, exchange, prices):
+    for price in prices:
+        exchange.price = price
+        await engine.tick()
+
+
+class TestStrategies:
+    """Test trigger logic of each strategy, ticking the engine by hand (its background loop is closed)"""
+
+    def test_split_amount_keeps_precision(self):
+        assert split_amount(Decimal("1.00"), 3) == [Decimal("0.33"), Decimal("0.33"), Decimal("0.34")]
+        with pytest.raises(ValueError):
+            split_amount(Decimal("0.01"), 3)
+
+    @pytest.mark.asyncio
+    async def test_oco_first_leg_wins(self):
+        exchange = MockExchange()
+        engine = ExecutionEngine(exchange)
+        oco = engine.submit(make(OCOStrategy, exchange, take_profit="110", stop_loss="95"))
+        engine.close()
+
+        await run_prices(engine, exchange, ["105", "96", "94.5", "120"])
+
+        assert oco.state == DONE and oco.children[0]["purpose"] == "stop_loss"
+        assert exchange.orders == [{"order_id": 1, "side": "sell", "market": "BTCUSDT", "amount": "1", "price": None}]
+        with pytest.raises(ValueError):
+            make(OCOStrategy, exchange, take_profit="90", stop_loss="95")
+
+    @pytest.mark.asyncio
+    async def test_bracket_entry_then_exit(self):
+        exchange = MockExchange()
+        engine = ExecutionEngine(exchange)
+        bracket = engine.submit(make(BracketStrategy, exchange, side=BUY, entry_price="98",
+                                     take_profit="105", stop_loss="90"))
+        engine.close()
+
+        await run_prices(engine, exchange, ["100", "97.5"])
+        assert bracket.entered and [o["side"] for o in exchange.orders] == ["buy"]
+        await run_prices(engine, exchange, ["104", "106"])
+
+        assert bracket.state == DONE
+        assert [(c["purpose"], c["side"]) for c in bracket.children] == [("entry", "buy"), ("take_profit", "sell")]
+
+    @pytest.mark.asyncio
+    async def test_bracket_retries_rejected_exit(self):
+        exchange = MockExchange()
+        engine = ExecutionEngine(exchange)
+        retried = engine.submit(make(BracketStrategy, exchange, side=BUY, take_profit="105", stop_loss="90"))
+        engine.close()
+
+        await run_prices(engine, exchange, ["100"])
+        exchange.reject = True
+        await run_prices(engine, exchange, ["89", "89"])
+        assert retried.state == "active" and "position is open" in retried.message
+        exchange.reject = False
+        await run_prices(engine, exchange, ["89"])
+        assert retried.state == DONE and retried.exit_failures == 2
+
+        given_up = engine.submit(make(BracketStrategy, exchange, side=BUY, take_profit="105", stop_loss="90"))
+        await run_prices(engine, exchange, ["100"])
+        exchange.reject = True
+        await run_prices(engine, exchange, ["89"] * BracketStrategy.MAX_EXIT_ATTEMPTS)
+        assert given_up.state == FAILED and "still open" in given_up.message
+
+    @pytest.mark.asyncio
+    async def test_trailing_stop_follows_best_price(self):
+        exchange = MockExchange()
+        engine = ExecutionEngine(exchange)
+        stop = engine.submit(make(TrailingStopStrategy, exchange, trail_pct=5, activation_price="102"))
+        engine.close()
+
+        await run_prices(engine, exchange, ["95", "102", "110", "105"])
+        assert stop.state == "active" and stop.best == Decimal("110")
+        await run_prices(engine, exchange, ["104.4"])
+
+        assert stop.state == DONE and len(exchange.orders) == 1
+
+    @pytest.mark.asyncio
+    async def test_twap_slices_over_time(self):
+        exchange = MockExchange()
+        engine = ExecutionEngine(exchange)
+        twap = engine.submit(make(TWAPStrategy, exchange, side=BUY, amount="1.0", slices=4, duration_seconds=0.2))
+        engine.close()
+
+        for _ in range(20):
+            await engine.tick()
+            if twap.state != "active":
+                break
+            await asyncio.sleep(0.02)
+
+        assert twap.state == DONE
+        assert [o["amount"] for o in exchange.orders] == ["0.2", "0.2", "0.2", "0.4"]
+
+    @pytest.mark.asyncio
+    async def test_iceberg_replenishes_and_cancels(self):
+        exchange = MockExchange()
+        engine = ExecutionEngine(exchange)
+        iceberg = engine.submit(make(IcebergStrategy, exchange, amount="3", visible_amount="1", price="99"))
+        iceberg.CHECK_SECONDS = 0
+        engine.close()
+
+        await engine.tick()
+        await engine.tick()
+        assert len(exchange.orders) == 1 and exchange.orders[0]["price"] == "99"
+        exchange.pending.clear()  # first slice filled
+        await engine.tick()
+        assert len(exchange.orders) == 2 and iceberg.filled == Decimal("1")
+
+        assert (await engine.cancel("other", iceberg.execution_id)) is None
+        await engine.cancel("owner", iceberg.execution_id)
+        assert iceberg.state == CANCELLED and exchange.cancelled == [2]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_twap_cancels_open_limit_slices(self):
+        exchange = MockExchange()
+        engine = ExecutionEngine(exchange)
+        twap = engine.submit(make(TWAPStrategy, exchange, side=BUY, amount="3", slices=3, duration_seconds=0,
+                                  limit_price="99"))
+        engine.close()
+
+        await engine.tick()
+        exchange.pending.clear()  # first slice filled
+        await engine.tick()
+        await engine.cancel("owner", twap.execution_id)
+
+        assert twap.state == CANCELLED and twap.message == "cancelled"
+        assert [o["price"] for o in exchange.orders] == ["99", "99"] and exchange.cancelled == [2]
+
+    @pytest.mark.asyncio
+    async def test_iceberg_stops_when_slice_cancelled_outside(self):
+        exchange = MockExchange()
+        engine = ExecutionEngine(exchange)
+        iceberg = engine.submit(make(IcebergStrategy, exchange, amount="3", visible_amount="1", price="99"))
+        iceberg.CHECK_SECONDS = 0
+        engine.close()
+
+        await engine.tick()
+        await exchange.cancel_order("btc", "usdt", order_id=1)
+        await engine.tick()
+
+        assert iceberg.state == CANCELLED and "canceled outside" in iceberg.message
+        assert len(exchange.orders) == 1 and iceberg.filled == 0
+
+    @pytest.mark.asyncio
+    async def test_engine_outlives_deadline_of_submitting_call(self):
+        exchange = MockExchange()
+        engine = ExecutionEngine(exchange, interval=0.01)
+        token = current_deadline.set(time.monotonic() + 0.05)
+        try:
+            twap = engine.submit(make(TWAPStrategy, exchange, side=BUY, amount="1.0", slices=5, duration_seconds=0.25))
+        finally:
+            current_deadline.reset(token)
+
+        for _ in range(100):
+            if twap.state != "active":
+                break
+            await asyncio.sleep(0.01)
+        engine.close()
+
+        assert twap.state == DONE and len(exchange.orders) == 5
+
+    @pytest.mark.asyncio
+    async def test_rejected_child_order_fails_execution(self):
+        exchange = MockExchange()
+        exchange.reject = True
+        engine = ExecutionEngine(exchange)
+        oco = engine.submit(make(OCOStrategy, exchange, take_profit="100", stop_loss="90"))
+        engine.close()
+
+        await engine.tick()
+
+        assert oco.state == FAILED and "3109" in oco.message
+        assert engine.executions("owner") == [oco]
+
+
+class TestExecutionTools:
+    """Test the execution tools through an MCP client"""
+
+    def setup_method(self):
+        self.exchange = MockExchange()
+        main.coinex_client = self.exchange
+        main.is_http_like = False
+        main.execution_engine = ExecutionEngine(self.exchange, interval=0.01)
+
+    def teardown_method(self):
+        main.execution_engine.close()
+        main.execution_engine = None
+
+    @pytest.mark.asyncio
+    async def test_place_list_cancel(self):
+        async with Client(main.mcp) as client:
+            oco = (await client.call_tool("place_conditional_order", {
+                "base": "BTC", "side": "sell", "amount": "0.5", "kind": "oco",
+                "take_profit": "110", "stop_loss": "90"})).data
+            missing = (await client.call_tool("place_sliced_order", {
+                "base": "BTC", "side": "buy", "amount": "1", "kind": "iceberg", "price": "99"})).data
+            self.exchange.price = "111"
+            for _ in range(100):
+                if self.exchange.orders:
+                    break
+                await asyncio.sleep(0.01)
+            twap = (await client.call_tool("place_sliced_order", {
+                "base": "BTC", "side": "buy", "amount": "1.00", "kind": "twap", "slices": 2,
+                "duration_seconds": 60})).data
+            cancelled = (await client.call_tool("cancel_execution", {"execution_id": twap["data"]["execution_id"]})).data
+            listed = (await client.call_tool("list_executions", {})).data
+
+        assert oco["code"] == 0 and oco["data"]["kind"] == "oco"
+        assert missing["code"] == -1
+        assert self.exchange.orders[0]["side"] == "sell" and self.exchange.orders[0]["amount"] == "0.5"
+        assert cancelled["data"]["state"] == CANCELLED
+        assert [(e["kind"], e["state"]) for e in listed["data"]] == [("twap", CANCELLED), ("oco", DONE)]
@@ -0,0 +1,142 @@
+"""
+Test cases for the local futures history store (no network access required)
+"""
+import os
+import fcntl
+import threading
+import pytest
+from unittest.mock import AsyncMock
+
+from coinex_mcp_server import main
+from coinex_mcp_server.coinex_client import CoinExClient
+from coinex_mcp_server.history_store import HEADER, SERIES, HistoryStore, run_sync
+
+
+def _premium(times):
+    return [{"market": "BTCUSDT", "premium_index": f"0.000{t % 10}", "created_at": t} for t in times]
+
+
+class TestHistoryStore:
+    """Test append-only storage and time-range queries"""
+
+    def test_append_is_idempotent_and_ordered(self, tmp_path):
+        store = HistoryStore(str(tmp_path))
+
+        assert store.append("premium", "BTCUSDT", _premium([300, 100, 200])) == 3
+        assert store.append("premium", "BTCUSDT", _premium([200, 300, 400])) == 1
+
+        assert store.first_time("premium", "BTCUSDT") == 100
+        assert store.last_time("premium", "BTCUSDT") == 400
+        assert [r["created_at"] for r in store.query("premium", "BTCUSDT")] == [400, 300, 200, 100]
+
+    def test_query_time_range_and_window(self, tmp_path):
+        store = HistoryStore(str(tmp_path))
+        store.append("premium", "BTCUSDT", _premium(range(100, 1100, 100)))
+
+        rows = store.query("premium", "BTCUSDT", start_time=250, end_time=700)
+        assert [r["created_at"] for r in rows] == [700, 600, 500, 400, 300]
+
+        rows = store.query("premium", "BTCUSDT", start_time=250, end_time=700, offset=1, limit=2)
+        assert [r["created_at"] for r in rows] == [600, 500]
+        assert rows[0]["premium_index"] == "0"
+
+    def test_append_rechecks_last_record_under_lock(self, tmp_path):
+        writer, other = HistoryStore(str(tmp_path)), HistoryStore(str(tmp_path))
+        writer.append("funding", "BTCUSDT", [{"funding_time": 100, "actual_funding_rate": "0.00001",
+                                              "theoretical_funding_rate": "-0.00012"}])
+
+        # Another process (here: another store) appends what this one already wrote, plus one newer record
+        assert other.append("funding", "BTCUSDT", [{"funding_time": t, "actual_funding_rate": "0.0001"}
+                                                   for t in (100, 200)]) == 1
+
+        rows = writer.query("funding", "BTCUSDT")
+        assert [r["funding_time"] for r in rows] == [200, 100]
+        assert rows[1]["actual_funding_rate"] == "0.00001" and rows[1]["theoretical_funding_rate"] == "-0.00012"
+        assert rows[0]["theoretical_funding_rate"] == "NaN"
+
+    def test_append_waits_for_lock_of_other_writer(self, tmp_path):
+        store = HistoryStore(str(tmp_path))
+        store.append("premium", "BTCUSDT", _premium([100]))
+        with open(store.path("premium", "BTCUSDT"), "a+b") as held:
+            fcntl.flock(held, fcntl.LOCK_EX)
+            writer = threading.Thread(target=store.append, args=("premium", "BTCUSDT", _premium([200])))
+            writer.start()
+            writer.join(0.1)
+            assert writer.is_alive() and store.last_time("premium", "BTCUSDT") == 100
+        writer.join(1)
+
+        assert store.last_time("premium", "BTCUSDT") == 200
+
+    def test_partial_trailing_record_is_dropped(self, tmp_path):
+        store = HistoryStore(str(tmp_path))
+        store.append("premium", "BTCUSDT", _premium([100]))
+        with open(store.path("premium", "BTCUSDT"), "ab") as f:
+            f.write(b"\x01\x02\x03")
+
+        store.append("premium", "BTCUSDT", _premium([200]))
+
+        size = os.path.getsize(store.path("premium", "BTCUSDT"))
+        assert size == HEADER.size + 2 * SERIES["premium"].record.size
+        assert [r["created_at"] for r in store.query("premium", "BTCUSDT")] == [200, 100]
+
+    @pytest.mark.asyncio
+    async def test_sync_fetches_only_after_last_record(self, tmp_path):
+        store = HistoryStore(str(tmp_path))
+        store.append("premium", "BTCUSDT", _premium([100, 200]))
+        client = AsyncMock(spec=CoinExClient)
+        client.futures_get_premium_history.side_effect = [
+            {"code": 0, "data": _premium([400, 300]), "pagination": {"has_next": True}},
+            {"code": 0, "data": _premium([250]), "pagination": {"has_next": False}},
+        ]
+
+        report = await run_sync(store, client, [("BTC", "USDT")], ["premium"])
+
+        assert report == {"premium:BTCUSDT": 3}
+        assert client.futures_get_premium_history.call_args_list[0].kwargs["start_time"] == 201
+        assert store.last_time("premium", "BTCUSDT") == 400
+
+    @pytest.mark.asyncio
+    async def test_sync_reports_api_errors(self, tmp_path):
+        store = HistoryStore(str(tmp_path))
+        client = AsyncMock(spec=CoinExClient)
+        client.futures_get_funding_rate_history.return_value = {"code": 3008, "message": "Service busy"}
+
+        report = await run_sync(store, client, [("BTC", "USDT")], ["funding"])
+
+        assert "Service busy" in report["funding:BTCUSDT"]
+        assert not store.has("funding", "BTCUSDT")
+
+
+class TestHistoryTools:
+    """Test history tools answering from the local store"""
+
+    def setup_method(self):
+        main.coinex_client = AsyncMock(spec=CoinExClient)
+
+    def teardown_method(self):
+        main.history_store = None
+
+    @pytest.mark.asyncio
+    async def test_served_locally_with_tail_refresh(self, tmp_path):
+        main.history_store = HistoryStore(str(tmp_path))
+        main.history_store.append("basis", "BTCUSDT",
+                                  [{"basis_rate": "0.01", "created_at": t} for t in (100, 200, 300)])
+        main.coinex_client.futures_basis_index_history.return_value = {
+            "code": 0, "data": [{"basis_rate": "0.02", "created_at": 400}], "pagination": {"has_next": False}
+        }
+
+        result = await main.get_basis_history.fn("BTC", "USDT", 150, None, 1, 2)
+
+        assert main.coinex_client.futures_basis_index_history.call_args.kwargs["start_time"] == 301
+        assert [r["created_at"] for r in result["data"]] == [400, 300]
+        assert result["pagination"]["has_next"] is True
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_api_before_first_record(self, tmp_path):
+        main.history_store = HistoryStore(str(tmp_path))
+        main.history_store.append("basis", "BTCUSDT", [{"basis_rate": "0.01", "created_at": 1000}])
+        main.coinex_client.futures_basis_index_history.return_value = {"code": 0, "data": []}
+
+        await main.get_basis_history.fn("BTC", "USDT", 10, 500, 1, 100)
+
+        main.coinex_client.futures_basis_index_history.assert_called_once_with("BTC", "USDT", 10, 500, 1, 100)
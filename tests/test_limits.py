@@ -0,0 +1,121 @@
+"""
+Test cases for upstream rate and concurrency limiting (no network access required)
+"""
+import time
+import asyncio
+import pytest
+
+from coinex_mcp_server.limits import ConcurrencyLimiter, FairScheduler, QueueFullError, RateLimiter
+
+
+class TestRateLimiter:
+    """Test token bucket behaviour"""
+
+    @pytest.mark.asyncio
+    async def test_burst_then_throttled(self):
+        limiter = RateLimiter(rate=50, burst=5)
+
+        started = time.monotonic()
+        await asyncio.gather(*(limiter.acquire() for _ in range(10)))
+        elapsed = time.monotonic() - started
+
+        # 5 tokens are free, the other 5 arrive at 50/s
+        assert 0.08 <= elapsed < 0.5
+
+    def test_invalid_rate(self):
+        with pytest.raises(ValueError):
+            RateLimiter(rate=0)
+
+
+class TestConcurrencyLimiter:
+    """Test bounded concurrency with a bounded wait queue"""
+
+    @pytest.mark.asyncio
+    async def test_queue_then_reject(self):
+        limiter = ConcurrencyLimiter(limit=1, max_queue=1)
+
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+
+        assert (limiter.in_flight, limiter.waiting) == (1, 1)
+        with pytest.raises(QueueFullError):
+            await limiter.acquire()
+
+        limiter.release()
+        assert await waiter >= 0
+        assert (limiter.in_flight, limiter.waiting) == (1, 0)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_queue(self):
+        limiter = ConcurrencyLimiter(limit=1, max_queue=1)
+        await limiter.acquire()
+
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        assert limiter.waiting == 0
+        limiter.release()
+        assert limiter.in_flight == 0
+
+
+class TestFairScheduler:
+    """Test weighted fair sharing of upstream slots between tenants"""
+
+    @staticmethod
+    async def _queue(scheduler, tenant, order):
+        await scheduler.acquire(tenant)
+        order.append(tenant)
+
+    @pytest.mark.asyncio
+    async def test_quiet_tenant_not_starved_by_backlog(self):
+        scheduler = FairScheduler(capacity=1, tenant_limit=1, max_queue=10)
+        order = []
+        await scheduler.acquire("a")
+        tasks = [asyncio.create_task(self._queue(scheduler, "a", order)) for _ in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(self._queue(scheduler, "b", order)))
+        await asyncio.sleep(0)
+
+        for _ in range(4):
+            scheduler.release(order[-1] if order else "a")
+            await asyncio.sleep(0)
+
+        assert order[:2] == ["b", "a"]
+        await asyncio.gather(*tasks)
+
+    @pytest.mark.asyncio
+    async def test_weights_and_tenant_limit(self):
+        scheduler = FairScheduler(capacity=3, tenant_limit=2, max_queue=10, weights={"a": 2})
+        order = []
+        tasks = [asyncio.create_task(self._queue(scheduler, t, order)) for t in ["a"] * 4 + ["b"] * 4]
+        await asyncio.sleep(0)
+
+        # a may not exceed its share of 2 slots even though capacity is 3
+        assert scheduler.state() == {"a": {"in_flight": 2, "queued": 2}, "b": {"in_flight": 1, "queued": 3}}
+
+        scheduler.release("a")
+        scheduler.release("b")
+        scheduler.release("a")
+        await asyncio.sleep(0)
+        # a (weight 2) advances its virtual time half as fast, so it wins the contended slots
+        assert order[3:] == ["a", "b", "a"]
+        for task in tasks:
+            task.cancel()
+
+    @pytest.mark.asyncio
+    async def test_per_tenant_queue_bound(self):
+        scheduler = FairScheduler(capacity=1, tenant_limit=1, max_queue=1)
+        await scheduler.acquire("a")
+        waiter = asyncio.create_task(scheduler.acquire("a"))
+        await asyncio.sleep(0)
+
+        with pytest.raises(QueueFullError):
+            await scheduler.acquire("a")
+
+        waiter.cancel()
+        await asyncio.sleep(0)
+        assert scheduler.state()["a"] == {"in_flight": 1, "queued": 0}
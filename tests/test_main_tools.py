@@ -4,6 +4,7 @@ Test cases for main.py MCP tools
 This module tests the actual MCP tool functions defined in main.py,
 accessing them through the .fn attribute to bypass the FastMCP decorator.
 """
+import threading
 import pytest
 from unittest.mock import AsyncMock, patch
 
@@ -108,6 +109,64 @@ class TestPublicTools:
         assert result["code"] == 0
         assert len(result["data"]) == 3
 
+    @pytest.mark.asyncio
+    async def test_scan_markets_returns_top_k(self):
+        """Test scan_markets ranks the whole ticker list and only returns top_k rows"""
+        mock_data = [{"market": f"COIN{i}USDT", "last": "1", "open": "1", "value": f"{i}"} for i in range(50)]
+        main.coinex_client.get_tickers.return_value = {"code": 0, "message": "OK", "data": mock_data}
+
+        result = await main.scan_markets.fn("spot", "USDT", ["value>10"], "value", "desc", 3)
+
+        main.coinex_client.get_tickers.assert_called_once_with(None, None, CoinExClient.MarketType.SPOT)
+        main.coinex_client.futures_get_funding_rate.assert_not_called()
+        assert result["data"]["scanned"] == 50
+        assert [r["market"] for r in result["data"]["markets"]] == ["COIN49USDT", "COIN48USDT", "COIN47USDT"]
+
+    @pytest.mark.asyncio
+    async def test_scan_markets_invalid_filter(self):
+        """Test scan_markets reports invalid filter expressions CoinEx-style"""
+        main.coinex_client.get_tickers.return_value = {"code": 0, "message": "OK", "data": []}
+
+        result = await main.scan_markets.fn("spot", "USDT", ["bogus"])
+
+        assert result["code"] == -1
+
+    @pytest.mark.asyncio
+    async def test_get_correlation_matrix_aligns_markets(self):
+        """Test get_correlation_matrix aligns candles on common timestamps and reports failed markets"""
+        closes = {"BTC": [100, 110, 99, 120, 118], "ETH": [10, 11, 9.9, 12, 11.8], "SOL": [5, 4.5, 5, 4, 4.1]}
+
+        async def get_kline(period, base, quote, market_type, limit):
+            if base not in closes:
+                return {"code": 3639, "message": "market not found"}
+            start = 1 if base == "SOL" else 0
+            return {"code": 0, "message": "OK", "data": [
+                {"created_at": i * 86400000, "close": str(c)} for i, c in enumerate(closes[base]) if i >= start]}
+
+        main.candle_cache.invalidate()
+        main.coinex_client.get_kline.side_effect = get_kline
+        threads = []
+        covariance_matrix = main.analytics.covariance_matrix
+
+        def record_thread(returns):
+            threads.append(threading.get_ident())
+            return covariance_matrix(returns)
+
+        with patch.object(main.analytics, "covariance_matrix", side_effect=record_thread):
+            result = await main.get_correlation_matrix.fn(["BTC", "ETH", "SOL", "XYZ"], include_covariance=True)
+
+        assert threads and threads[0] != threading.get_ident()
+        assert result["code"] == 0
+        assert result["data"]["markets"] == ["BTCUSDT", "ETHUSDT", "SOLUSDT"]
+        assert result["data"]["aligned_bars"] == 4
+        assert result["data"]["correlation"][0][1] == 1 and result["data"]["correlation"][0][2] < 0
+        assert len(result["data"]["covariance"]) == 3
+        assert "3639" in result["data"]["errors"]["XYZUSDT"]["error"]
+
+        volatility = await main.get_volatility.fn(["BTC"], window=2)
+        assert volatility["data"]["markets"]["BTCUSDT"]["return_pct"] == 18
+        assert volatility["data"]["markets"]["BTCUSDT"]["volatility_pct"] > 0
+
 
 class TestFuturesTools:
     """Test futures-specific MCP tools"""
@@ -150,6 +209,26 @@ class TestFuturesTools:
         main.coinex_client.futures_get_funding_rate.assert_called_once_with("BTC", "USDT")
         assert result["code"] == 0
 
+    @pytest.mark.asyncio
+    async def test_screen_funding_basis_cached(self):
+        """Test screen_funding_basis joins bulk snapshots and reuses them within the TTL"""
+        main.aggregate_cache.invalidate()
+        futures = [{"market": "BTCUSDT", "last": "101", "mark_price": "101", "index_price": "100"}]
+        spot = [{"market": "BTCUSDT", "last": "100"}]
+        main.coinex_client.get_tickers.side_effect = lambda base, quote, mt: {
+            "code": 0, "data": futures if mt == CoinExClient.MarketType.FUTURES else spot
+        }
+        main.coinex_client.futures_get_funding_rate.return_value = {
+            "code": 0, "data": [{"market": "BTCUSDT", "latest_funding_rate": "0.0001"}]
+        }
+
+        first = await main.screen_funding_basis.fn()
+        second = await main.screen_funding_basis.fn(sort_by="basis_pct")
+
+        assert main.coinex_client.get_tickers.call_count == 2
+        assert first["data"]["markets"][0]["market"] == "BTCUSDT"
+        assert second["data"]["markets"][0]["basis_pct"] == 1.0
+
     @pytest.mark.asyncio
     async def test_get_liquidation_history_placeholder(self):
         """Test get_liquidation_history returns placeholder response"""
@@ -230,6 +309,35 @@ class TestAuthTools:
         mock_client.get_orders.assert_called_once()
         assert result["code"] == 0
 
+    @pytest.mark.asyncio
+    @patch('coinex_mcp_server.main.get_secret_client')
+    async def test_get_portfolio_value(self, mock_get_client):
+        """Test get_portfolio_value prices all accounts, margin included, against one ticker snapshot"""
+        client = CoinExClient("access-id", "secret-key", enable_env_credentials=False)
+        balances = {
+            "/v2/assets/spot/balance": {"code": 0, "data": [{"ccy": "BTC", "available": "0.1", "frozen": "0"}]},
+            "/v2/assets/margin/balance": {"code": 0, "data": [{
+                "margin_account": "BTCUSDT", "base_ccy": "BTC", "quote_ccy": "USDT",
+                "available": {"BTC": "0.02", "USDT": "100"}, "frozen": {"BTC": "0", "USDT": "0"},
+                "repaid": {"BTC": "0", "USDT": "50"}, "interest": {"BTC": "0", "USDT": "0"}}]},
+            "/v2/assets/futures/balance": {"code": 0, "data": [{"ccy": "USDT", "available": "10", "frozen": "0"}]},
+        }
+        client._request = AsyncMock(side_effect=lambda method, path, data=None: balances[path])
+        mock_get_client.return_value = client
+        main.coinex_client = AsyncMock(spec=CoinExClient)
+        main.coinex_client.get_tickers.return_value = {
+            "code": 0, "message": "OK", "data": [{"market": "BTCUSDT", "last": "50000"}]
+        }
+
+        result = await main.get_portfolio_value.fn("USDT")
+
+        main.coinex_client.get_tickers.assert_called_once_with(None, None, CoinExClient.MarketType.SPOT)
+        assert sorted(call.args[1] for call in client._request.await_args_list) == sorted(balances)
+        assert result["code"] == 0
+        assert result["data"]["accounts"] == {"spot": "5000.00000000", "margin": "1050.00000000",
+                                              "futures": "10.00000000"}
+        assert result["data"]["total_value"] == "6060.00000000"
+
 
 class TestErrorHandling:
     """Test error handling in MCP tools"""
@@ -0,0 +1,196 @@
+"""
+Test cases for tool-call middleware (in-memory MCP client, no network access required)
+"""
+import asyncio
+import pytest
+from fastmcp import Client, FastMCP
+
+from coinex_mcp_server.metrics import metrics
+from coinex_mcp_server.middleware import ConcurrencyLimitMiddleware, OVERLOADED_CODE, parse_tool_limits
+
+
+def make_server(middleware):
+    server = FastMCP("test")
+    release = asyncio.Event()
+
+    @server.tool
+    async def slow() -> dict:
+        await release.wait()
+        return {"code": 0, "message": "OK", "data": None}
+
+    @server.tool
+    async def fast() -> dict:
+        return {"code": 0, "message": "OK", "data": None}
+
+    server.add_middleware(middleware)
+    return server, release
+
+
+class TestConcurrencyLimitMiddleware:
+    """Test admission control for tool calls"""
+
+    def setup_method(self):
+        metrics.reset()
+
+    @pytest.mark.asyncio
+    async def test_rejects_when_tool_queue_full(self):
+        server, release = make_server(ConcurrencyLimitMiddleware(global_limit=10, tool_limit=1, max_queue=1))
+
+        async with Client(server) as client:
+            running = asyncio.create_task(client.call_tool("slow", {}))
+            queued = asyncio.create_task(client.call_tool("slow", {}))
+            await asyncio.sleep(0.05)
+
+            rejected = await client.call_tool("slow", {})
+            other = await client.call_tool("fast", {})
+            release.set()
+            await asyncio.gather(running, queued)
+
+        assert rejected.structured_content["code"] == OVERLOADED_CODE
+        assert other.structured_content["code"] == 0
+        assert metrics.counter_value("tool_rejected_total", tool="slow") == 1
+
+    @pytest.mark.asyncio
+    async def test_global_limit_queues_other_tools(self):
+        middleware = ConcurrencyLimitMiddleware(global_limit=1, tool_limit=5, max_queue=5)
+        server, release = make_server(middleware)
+
+        async with Client(server) as client:
+            running = asyncio.create_task(client.call_tool("slow", {}))
+            await asyncio.sleep(0.05)
+            queued = asyncio.create_task(client.call_tool("fast", {}))
+            await asyncio.sleep(0.05)
+
+            assert middleware.state()["*"] == {"in_flight": 1, "queued": 1, "limit": 1}
+            release.set()
+            results = await asyncio.gather(running, queued)
+
+        assert [r.structured_content["code"] for r in results] == [0, 0]
+        assert metrics.snapshot()["timings"]["tool_queue_seconds"]
+
+    def test_parse_tool_limits(self):
+        assert parse_tool_limits("8, scan_markets=2", default=16) == (8, {"scan_markets": 2})
+        assert parse_tool_limits("", default=16) == (16, {})
+
+
+class TestTenantMiddleware:
+    """Test tenant identification and per-tenant rejection"""
+
+    def setup_method(self):
+        metrics.reset()
+
+    def test_request_tenant_prefers_access_id(self):
+        from unittest.mock import MagicMock, patch
+        from coinex_mcp_server import middleware
+
+        with patch.object(middleware, "get_http_headers", return_value={"x-coinex-access-id": "AID"}):
+            assert middleware.request_tenant() == middleware.tenant_key("access", "AID")
+        with patch.object(middleware, "get_http_headers", return_value={}), \
+                patch.object(middleware, "get_access_token", return_value=MagicMock(token="secret-token")):
+            tenant = middleware.request_tenant()
+        assert tenant == middleware.tenant_key("token", "secret-token")
+        assert "secret-token" not in tenant
+
+    def test_weights_keyed_like_tenants(self):
+        from coinex_mcp_server.middleware import parse_tenant_weights, tenant_key
+
+        weights = parse_tenant_weights("AID=2")
+
+        assert weights[tenant_key("access", "AID")] == 2.0
+
+    @pytest.mark.asyncio
+    async def test_upstream_calls_scheduled_per_tenant(self):
+        from coinex_mcp_server.coinex_client import CoinExClient
+        from coinex_mcp_server.limits import FairScheduler
+        from coinex_mcp_server.middleware import TenantMiddleware
+
+        scheduler = FairScheduler(capacity=1, tenant_limit=1, max_queue=0)
+        client = CoinExClient(enable_env_credentials=False, scheduler=scheduler)
+        release = asyncio.Event()
+
+        async def send(*args, **kwargs):
+            await release.wait()
+            return {"code": 0, "message": "OK", "data": []}
+
+        client._send = send
+        server = FastMCP("test")
+
+        @server.tool
+        async def ticker() -> dict:
+            return await client.get_tickers("BTC", "USDT", CoinExClient.MarketType.SPOT)
+
+        server.add_middleware(TenantMiddleware(scheduler))
+
+        async with Client(server) as mcp_client:
+            running = asyncio.create_task(mcp_client.call_tool("ticker", {}))
+            await asyncio.sleep(0.05)
+            rejected = await mcp_client.call_tool("ticker", {})
+            release.set()
+            first = await running
+
+        assert first.structured_content["code"] == 0
+        assert rejected.structured_content["code"] == OVERLOADED_CODE
+        assert metrics.counter_value("tenant_rejected_total", tenant="anonymous") == 1
+        assert metrics.snapshot()["timings"]["upstream_queue_seconds"][0]["labels"] == {"tenant": "anonymous"}
+
+
+class TestDeadlineMiddleware:
+    """Test per-tool deadlines and their propagation to upstream requests"""
+
+    def setup_method(self):
+        metrics.reset()
+
+    @pytest.mark.asyncio
+    async def test_deadline_by_tag_cancels_upstream_request(self):
+        from coinex_mcp_server.coinex_client import CoinExClient
+        from coinex_mcp_server.middleware import DeadlineMiddleware
+
+        client = CoinExClient(enable_env_credentials=False)
+        seen = {}
+
+        async def send(*args, **kwargs):
+            from coinex_mcp_server.limits import deadline_remaining
+            seen["timeout"] = deadline_remaining(client.timeout)
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                seen["cancelled"] = True
+                raise
+
+        client._send = send
+        server = FastMCP("test")
+
+        @server.tool(tags={"public"})
+        async def ticker() -> dict:
+            return await client.get_tickers("BTC", "USDT", CoinExClient.MarketType.SPOT)
+
+        @server.tool(tags={"auth"})
+        async def balance() -> dict:
+            await asyncio.sleep(0.2)
+            return {"code": 0, "message": "OK", "data": None}
+
+        server.add_middleware(DeadlineMiddleware(market_seconds=0.1, trading_seconds=5))
+
+        async with Client(server) as mcp_client:
+            timed_out = await mcp_client.call_tool("ticker", {})
+            slow_but_allowed = await mcp_client.call_tool("balance", {})
+
+        assert timed_out.structured_content["code"] == -1
+        assert 0 < seen["timeout"] <= 0.1
+        assert seen["cancelled"] is True
+        assert slow_but_allowed.structured_content["code"] == 0
+        assert metrics.counter_value("tool_deadline_exceeded_total", tool="ticker") == 1
+
+    @pytest.mark.asyncio
+    async def test_expired_deadline_skips_upstream(self):
+        import time
+        from coinex_mcp_server.coinex_client import CoinExClient
+        from coinex_mcp_server.limits import current_deadline
+
+        client = CoinExClient(enable_env_credentials=False)
+        token = current_deadline.set(time.monotonic() - 1)
+        try:
+            with pytest.raises(Exception, match="Request timeout"):
+                await client.get_tickers("BTC", "USDT", CoinExClient.MarketType.SPOT)
+        finally:
+            current_deadline.reset(token)
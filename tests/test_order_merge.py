@@ -0,0 +1,98 @@
+"""
+Test cases for merged multi-market order history (no network access required)
+"""
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from coinex_mcp_server import main
+from coinex_mcp_server.coinex_client import CoinExClient
+
+
+def _page(orders, has_next=False):
+    return {"code": 0, "message": "OK", "data": orders, "pagination": {"has_next": has_next}}
+
+
+def _orders(prefix, times):
+    return [{"order_id": f"{prefix}{t}", "created_at": t} for t in times]
+
+
+class TestMergedOrders:
+    """Test CoinExClient.get_merged_orders"""
+
+    def setup_method(self):
+        self.client = CoinExClient(access_id="id", secret_key="secret", enable_env_credentials=False)
+
+    @pytest.mark.asyncio
+    async def test_merges_streams_by_time_desc(self):
+        pages = {
+            (CoinExClient.MarketType.SPOT, 1): _page(_orders("s", [900, 500]), has_next=True),
+            (CoinExClient.MarketType.SPOT, 2): _page(_orders("s", [100])),
+            (CoinExClient.MarketType.FUTURES, 1): _page(_orders("f", [700, 300])),
+        }
+
+        async def fake_get_orders(base, quote, market_type, side, status, is_stop, page, limit):
+            return pages.get((market_type, page), _page([]))
+
+        with patch.object(self.client, "get_orders", side_effect=fake_get_orders):
+            result = await self.client.get_merged_orders(
+                market_types=[CoinExClient.MarketType.SPOT, CoinExClient.MarketType.FUTURES],
+                statuses=[CoinExClient.OrderStatus.FINISHED], include_stop=False, limit=10,
+            )
+
+        assert result["code"] == 0
+        assert [o["created_at"] for o in result["data"]] == [900, 700, 500, 300, 100]
+        assert result["data"][1]["market_type"] == "FUTURES"
+
+    @pytest.mark.asyncio
+    async def test_truncates_without_fetching_unneeded_pages(self):
+        mock = AsyncMock(side_effect=[_page(_orders("s", [900, 800]), has_next=True)])
+
+        with patch.object(self.client, "get_orders", mock):
+            result = await self.client.get_merged_orders(
+                market_types=[CoinExClient.MarketType.SPOT],
+                statuses=[CoinExClient.OrderStatus.FINISHED], include_stop=False, limit=2,
+            )
+
+        assert [o["order_id"] for o in result["data"]] == ["s900", "s800"]
+        assert mock.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_deduplicates_pending_and_finished(self):
+        async def fake_get_orders(base, quote, market_type, side, status, is_stop, page, limit):
+            return _page([{"order_id": 42, "created_at": 1000}])
+
+        with patch.object(self.client, "get_orders", side_effect=fake_get_orders):
+            result = await self.client.get_merged_orders(
+                market_types=[CoinExClient.MarketType.SPOT], include_stop=False, limit=10,
+            )
+
+        assert len(result["data"]) == 1
+
+    @pytest.mark.asyncio
+    async def test_api_error_is_returned(self):
+        error = {"code": 3008, "message": "Service busy"}
+
+        with patch.object(self.client, "get_orders", AsyncMock(return_value=error)):
+            result = await self.client.get_merged_orders(limit=10)
+
+        assert result["code"] == 3008
+        assert result["message"] == "Service busy"
+
+
+class TestMergedOrderHistoryTool:
+    """Test the get_merged_order_history MCP tool"""
+
+    @pytest.mark.asyncio
+    @patch('coinex_mcp_server.main.get_secret_client')
+    async def test_defaults_query_all_streams(self, mock_get_client):
+        mock_client = AsyncMock(spec=CoinExClient)
+        mock_get_client.return_value = mock_client
+        mock_client.get_merged_orders.return_value = {"code": 0, "message": "OK", "data": []}
+
+        result = await main.get_merged_order_history.fn()
+
+        call_args = mock_client.get_merged_orders.call_args
+        assert call_args.kwargs["market_types"] == list(CoinExClient.MarketType)
+        assert call_args.kwargs["statuses"] == list(CoinExClient.OrderStatus)
+        assert call_args.kwargs["base"] is None
+        assert result["code"] == 0
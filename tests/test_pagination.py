@@ -0,0 +1,88 @@
+"""
+Test cases for pagination cursors (no network access required)
+"""
+import pytest
+from unittest.mock import AsyncMock
+
+from coinex_mcp_server import main
+from coinex_mcp_server.cache import TTLCache
+from coinex_mcp_server.coinex_client import CoinExClient
+from coinex_mcp_server.pagination import CursorPager
+
+
+class TestCursorPager:
+    """Test paging through snapshots, expiry and invalid cursors"""
+
+    def test_pages_until_exhausted(self):
+        pager = CursorPager()
+        page = pager.first(list(range(7)), 3, age_ms=10)
+        pages = [page["data"]]
+        while page["pagination"]["has_next"]:
+            page = pager.page(page["pagination"]["next_cursor"])
+            pages.append(page["data"])
+
+        assert pages == [[0, 1, 2], [3, 4, 5], [6]]
+        assert page["pagination"] == {"total": 7, "offset": 6, "has_next": False, "next_cursor": None}
+        assert page["age_ms"] >= 10
+
+    def test_expired_and_invalid_cursors(self):
+        pager = CursorPager(ttl=0)
+        cursor = pager.first([1, 2], 1)["pagination"]["next_cursor"]
+
+        with pytest.raises(ValueError, match="expired"):
+            pager.page(cursor)
+        for bad in ("not-a-cursor", "", "!!!"):
+            with pytest.raises(ValueError):
+                pager.page(bad)
+
+
+class TestPaginatedTools:
+    """Test cursors on list_markets and get_ticker"""
+
+    def setup_method(self):
+        main.coinex_client = AsyncMock(spec=CoinExClient)
+        main.pager = CursorPager()
+
+    @pytest.mark.asyncio
+    async def test_list_markets_pages_sorted_snapshot(self):
+        markets = [{"market": name} for name in ("ETHUSDT", "BTCUSDT", "SOLUSDT", "ADAUSDT", "XRPUSDT")]
+        main.coinex_client.get_market_info.return_value = {"code": 0, "message": "OK", "data": markets, "age_ms": 0}
+
+        first = await main.list_markets.fn(page_size=2)
+        second = await main.list_markets.fn(cursor=first["pagination"]["next_cursor"])
+        third = await main.list_markets.fn(cursor=second["pagination"]["next_cursor"])
+        everything = await main.list_markets.fn()
+
+        assert [m["market"] for m in first["data"] + second["data"] + third["data"]] == [
+            "ADAUSDT", "BTCUSDT", "ETHUSDT", "SOLUSDT", "XRPUSDT"]
+        assert third["pagination"]["has_next"] is False
+        # Later pages come from the snapshot, not from upstream
+        assert main.coinex_client.get_market_info.await_count == 2
+        assert len(everything["data"]) == 5 and "pagination" not in everything
+        assert (await main.list_markets.fn(cursor="bogus"))["code"] == -1
+
+    @pytest.mark.asyncio
+    async def test_get_ticker_pages_by_value(self):
+        tickers = [{"market": f"COIN{i}USDT", "value": str(i)} for i in range(12)]
+        main.coinex_client.get_tickers.return_value = {"code": 0, "message": "OK", "data": tickers}
+
+        first = await main.get_ticker.fn(page_size=10)
+        second = await main.get_ticker.fn(cursor=first["pagination"]["next_cursor"])
+
+        assert first["data"][0]["market"] == "COIN11USDT" and first["pagination"]["total"] == 12
+        assert [t["market"] for t in second["data"]] == ["COIN1USDT", "COIN0USDT"]
+
+    @pytest.mark.asyncio
+    async def test_list_calls_through_real_client(self):
+        """Without base, the tools query every market and filter by quote locally"""
+        data = [{"market": "BTCUSDT", "value": "5"}, {"market": "ETHBTC", "value": "9"}, {"market": "ETHUSDT", "value": "7"}]
+        main.coinex_client = CoinExClient(enable_env_credentials=False, cache=TTLCache())
+        main.coinex_client._request = AsyncMock(return_value={"code": 0, "message": "OK", "data": data})
+
+        for tool in (main.get_ticker, main.list_markets, main.get_index_price):
+            result = await tool.fn(page_size=5)
+            assert sorted(entry["market"] for entry in result["data"]) == ["BTCUSDT", "ETHUSDT"]
+            assert result["pagination"]["total"] == 2 and result["age_ms"] is not None
+        assert (await main.get_ticker.fn(quote=""))["data"] == data
+        # No market parameter is sent for list calls
+        assert all(not call.kwargs.get("data") for call in main.coinex_client._request.await_args_list)
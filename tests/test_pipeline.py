@@ -0,0 +1,59 @@
+"""
+Test cases for the shared tool pipeline: logging, metrics and result caching (no network access required)
+"""
+import logging
+import pytest
+from unittest.mock import AsyncMock
+
+from coinex_mcp_server import main
+from coinex_mcp_server.coinex_client import CoinExClient
+from coinex_mcp_server.metrics import metrics
+
+
+class TestToolPipeline:
+    """Test what tool_pipeline adds around every tool body"""
+
+    def setup_method(self):
+        metrics.reset()
+        main.tool_cache.invalidate()
+        main.coinex_client = AsyncMock(spec=CoinExClient)
+
+    @pytest.mark.asyncio
+    async def test_api_error_logged_once_and_counted(self, caplog):
+        main.coinex_client.get_kline.return_value = {"code": 3639, "message": "market not found"}
+
+        with caplog.at_level(logging.ERROR):
+            result = await main.get_kline.fn("NOPE")
+
+        assert result["code"] == 3639
+        records = [r for r in caplog.records if getattr(r, "tool", None) == "get_kline"]
+        assert len(records) == 1 and records[0].code == 3639
+        assert records[0].getMessage() == "get_kline error, code:3639, message:market not found"
+        assert metrics.counter_value("tool_calls_total", tool="get_kline", outcome="error") == 1
+        assert metrics.snapshot()["timings"]["tool_seconds"][0]["value"]["count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_exceptions_are_counted_and_reraised(self):
+        main.coinex_client.get_tickers.side_effect = RuntimeError("connection reset")
+
+        with pytest.raises(RuntimeError, match="connection reset"):
+            await main.get_ticker.fn("BTC")
+
+        assert metrics.counter_value("tool_calls_total", tool="get_ticker", outcome="exception") == 1
+
+    @pytest.mark.asyncio
+    async def test_cache_ttl_serves_equal_arguments(self):
+        calls = []
+
+        @main.tool_pipeline(cache_ttl=60)
+        async def tool(base: str, limit: int = 10):
+            calls.append((base, limit))
+            return {"code": 0 if base != "BAD" else -1, "message": "OK", "data": [base] * limit}
+
+        assert await tool("BTC") == await tool("BTC", limit=10) == await tool(base="BTC")
+        await tool("BTC", 2)
+        await tool("BAD")
+        await tool("BAD")
+
+        assert calls == [("BTC", 10), ("BTC", 2), ("BAD", 10), ("BAD", 10)]
+        assert metrics.counter_value("tool_calls_total", tool="tool", outcome="ok") == 4
@@ -0,0 +1,89 @@
+"""
+Test cases for the sampling profiler, event loop lag monitor and diagnostics tools (no network access required)
+"""
+import time
+import asyncio
+import pytest
+from unittest.mock import patch
+from fastmcp.server.auth import AccessToken
+
+from coinex_mcp_server import main
+from coinex_mcp_server.profiler import LoopLagMonitor, SamplingProfiler
+
+
+def _spin(seconds):
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        pass
+
+
+def _stall(seconds):
+    time.sleep(seconds)
+
+
+class TestProfiler:
+    """Test collapsed stacks of the loop thread and stall capture"""
+
+    @pytest.mark.asyncio
+    async def test_profile_collapses_loop_stacks(self):
+        profiler = SamplingProfiler()
+        task = asyncio.create_task(profiler.profile(0.3, 0.005))
+        await asyncio.sleep(0.02)
+        with pytest.raises(RuntimeError, match="already running"):
+            await profiler.profile(0.1)
+        _spin(0.2)
+        report = await task
+
+        lines = report["collapsed"].splitlines()
+        spinning = sum(int(line.rsplit(" ", 1)[1]) for line in lines if line.split(" ")[0].endswith(":_spin"))
+        assert report["samples"] > 10 and spinning >= report["samples"] // 3
+        # Outermost frame first: _spin is a leaf called by the test coroutine
+        assert any([frame.split(":")[1] for frame in line.split(" ")[0].split(";")[-2:]] == [
+            "TestProfiler.test_profile_collapses_loop_stacks", "_spin"] for line in lines)
+        assert (await profiler.profile(0.05, 0.005, max_stacks=1))["collapsed"].count("\n") == 0
+
+    @pytest.mark.asyncio
+    async def test_loop_lag_monitor_records_blocking_stack(self):
+        monitor = LoopLagMonitor(interval=0.02, threshold=0.05, keep=2)
+        task = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0.05)
+        _stall(0.1)
+        await asyncio.sleep(0.05)
+        _stall(0.25)
+        await asyncio.sleep(0.05)
+        _stall(0.15)
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        report = monitor.report()
+        # keep=2: the 0.25s and 0.15s stalls
+        first, second = (s["lag_ms"] for s in report["slowest"])
+        assert report["stalls"] == 3 and report["max_lag_ms"] == first >= 200 and 100 < second < 200
+        assert all(s["stack"].endswith("test_profiler:_stall") for s in report["slowest"])
+
+
+class TestDiagnosticsTools:
+    """Test the admin scope gate of profile_server / get_event_loop_lag"""
+
+    def teardown_method(self):
+        main.is_http_like = False
+        main.loop_monitor = None
+
+    @pytest.mark.asyncio
+    async def test_admin_scope_required_in_http_mode(self):
+        main.loop_monitor = LoopLagMonitor()
+        assert (await main.get_event_loop_lag.fn())["data"]["stalls"] == 0
+
+        main.is_http_like = True
+        with pytest.raises(ValueError, match="admin"):
+            await main.profile_server.fn(seconds=0.05)
+        token = AccessToken(token="t", client_id="api-token", scopes=["read"])
+        with patch.object(main, "get_access_token", return_value=token), pytest.raises(ValueError):
+            await main.get_event_loop_lag.fn()
+
+        token.scopes.append(main.ADMIN_SCOPE)
+        with patch.object(main, "get_access_token", return_value=token):
+            result = await main.profile_server.fn(seconds=0.05, interval_ms=5)
+        assert result["code"] == 0 and result["data"]["samples"] > 0
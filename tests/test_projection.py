@@ -0,0 +1,62 @@
+"""
+Test cases for response projection (fields / summary tool arguments, no network access required)
+"""
+import pytest
+from unittest.mock import AsyncMock
+from fastmcp import Client
+
+from coinex_mcp_server import main
+from coinex_mcp_server.coinex_client import CoinExClient
+from coinex_mcp_server.projection import parse_fields, project
+
+
+class TestProjection:
+    """Test field paths and their application to nested data"""
+
+    def test_parse_fields(self):
+        assert parse_fields(["market", "depth.asks", "depth.bids"]) == {"market": {}, "depth": {"asks": {}, "bids": {}}}
+        assert parse_fields(["depth", "depth.asks"]) == {"depth": {}}
+        assert parse_fields(["depth.asks", "depth"]) == {"depth": {}}
+        for bad in ("", "a..b", "a.b-c"):
+            with pytest.raises(ValueError):
+                parse_fields([bad])
+
+    def test_project_lists_mappings_and_wildcards(self):
+        data = {"scanned": 2, "markets": {"BTCUSDT": {"trades": 3, "sharpe": 1.5}, "ETHUSDT": {"error": "x"}},
+                "rows": [{"market": "BTCUSDT", "last": "1", "open": "2"}, {"market": "ETHUSDT"}]}
+
+        assert project(data, parse_fields(["rows.market", "markets.*.trades"])) == {
+            "markets": {"BTCUSDT": {"trades": 3}, "ETHUSDT": {}},
+            "rows": [{"market": "BTCUSDT"}, {"market": "ETHUSDT"}],
+        }
+        assert project(data, parse_fields(["missing"])) == {}
+        assert data["rows"][0] == {"market": "BTCUSDT", "last": "1", "open": "2"}
+
+
+class TestProjectedTools:
+    """Test the fields / summary arguments every tool accepts"""
+
+    def setup_method(self):
+        main.coinex_client = AsyncMock(spec=CoinExClient)
+        self.response = {"code": 0, "message": "OK", "age_ms": 5, "data": [
+            {"market": "BTCUSDT", "last": "70000", "open": "69000", "high": "71000", "low": "68000",
+             "volume": "10", "value": "700000", "volume_buy": "6", "volume_sell": "4", "period": 86400}]}
+        main.coinex_client.get_tickers.return_value = self.response
+
+    @pytest.mark.asyncio
+    async def test_fields_summary_and_schema(self):
+        async with Client(main.mcp) as client:
+            tools = {tool.name: tool for tool in await client.list_tools()}
+            selected = (await client.call_tool("get_ticker", {"base": "BTC", "fields": ["market", "last"]})).data
+            summary = (await client.call_tool("get_ticker", {"base": "BTC", "summary": True})).data
+            full = (await client.call_tool("get_ticker", {"base": "BTC"})).data
+            invalid = (await client.call_tool("get_ticker", {"base": "BTC", "fields": ["last!"]})).data
+
+        assert all("fields" in tool.inputSchema["properties"] for tool in tools.values())
+        assert "summary" in tools["get_ticker"].inputSchema["properties"]
+        assert "summary" not in tools["scan_markets"].inputSchema["properties"]
+        assert selected == {"code": 0, "message": "OK", "age_ms": 5, "data": [{"market": "BTCUSDT", "last": "70000"}]}
+        assert set(summary["data"][0]) == {"market", "last", "open", "high", "low", "volume", "value"}
+        assert full == self.response and len(self.response["data"][0]) == 10
+        assert invalid["code"] == -1
+        main.coinex_client.get_tickers.assert_awaited_with("BTC", "USDT", CoinExClient.MarketType.SPOT)
@@ -0,0 +1,100 @@
+"""
+Test cases for shared-memory market data snapshots (no network access required)
+"""
+import pytest
+from unittest.mock import patch
+
+from coinex_mcp_server import snapshots
+from coinex_mcp_server.coinex_client import CoinExClient
+from coinex_mcp_server.snapshots import SnapshotReader, SnapshotWriter
+
+
+TICKER_KEY = CoinExClient.public_request_key("ticker", CoinExClient.MarketType.SPOT)
+DEPTH_KEY = CoinExClient.public_request_key("depth", CoinExClient.MarketType.SPOT, "BTC", "USDT",
+                                            snapshots.HOT_DEPTH_PARAMS)
+TICKERS = {"code": 0, "message": "OK", "data": [{"market": "BTCUSDT", "last": "1"}, {"market": "ETHUSDT", "last": "2"}]}
+
+
+@pytest.fixture
+def region(tmp_path):
+    path = str(tmp_path / "snapshots.bin")
+    writer = SnapshotWriter(path, [TICKER_KEY, DEPTH_KEY], slot_capacity=4096)
+    yield path, writer
+    writer.close()
+
+
+class TestSnapshotRegion:
+    """Test publishing and seqlock-protected reads"""
+
+    def test_publish_and_read(self, region):
+        path, writer = region
+        reader = SnapshotReader(path, max_age=5)
+
+        assert reader.get(TICKER_KEY, 5) == (False, None)
+        writer.publish(TICKER_KEY, TICKERS)
+
+        assert reader.get(TICKER_KEY, 5) == (True, TICKERS)
+        assert reader.get(("/v2/spot/unknown", ()), 5) == (False, None)
+
+    def test_decoded_value_reused_until_republished(self, region):
+        path, writer = region
+        reader = SnapshotReader(path, max_age=5)
+        writer.publish(TICKER_KEY, TICKERS)
+
+        first = reader.get(TICKER_KEY, 5)[1]
+        assert reader.get(TICKER_KEY, 5)[1] is first
+
+        writer.publish(TICKER_KEY, {"code": 0, "data": []})
+        assert reader.get(TICKER_KEY, 5)[1] == {"code": 0, "data": []}
+
+    def test_slot_being_written_is_a_miss(self, region):
+        path, writer = region
+        reader = SnapshotReader(path, max_age=5)
+        writer.publish(DEPTH_KEY, {"code": 0})
+
+        offset = writer._offsets[snapshots.key_digest(DEPTH_KEY)]
+        snapshots.SEQ.pack_into(writer._mm, offset, 3)
+
+        assert reader.get(DEPTH_KEY, 5) == (False, None)
+
+    def test_stale_snapshot_is_a_miss(self, region):
+        path, writer = region
+        reader = SnapshotReader(path, max_age=5)
+        writer.publish(TICKER_KEY, TICKERS)
+
+        with patch("coinex_mcp_server.snapshots.time.time", return_value=10 ** 12):
+            assert reader.get(TICKER_KEY, 5) == (False, None)
+
+    def test_oversized_payload_is_skipped(self, region):
+        path, writer = region
+
+        assert writer.publish(TICKER_KEY, {"data": "x" * 5000}) is False
+
+
+class TestClientSnapshots:
+    """Test that public tools read published snapshots before going upstream"""
+
+    @pytest.mark.asyncio
+    async def test_single_market_ticker_from_snapshot(self, region):
+        path, writer = region
+        writer.publish(TICKER_KEY, TICKERS)
+        client = CoinExClient(enable_env_credentials=False, snapshots=SnapshotReader(path, max_age=5))
+
+        async def fail(*args, **kwargs):
+            raise AssertionError("should not call upstream")
+
+        client._request = fail
+        result = await client.get_tickers("ETH", "USDT", CoinExClient.MarketType.SPOT)
+
+        assert result["data"] == [{"market": "ETHUSDT", "last": "2"}]
+
+    def test_second_fetcher_exits_when_path_is_served(self, tmp_path):
+        import fcntl
+        path = str(tmp_path / "snapshots.bin")
+
+        with open(path + ".lock", "a+b") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            with patch("coinex_mcp_server.snapshots.asyncio.run") as run:
+                snapshots.run_fetcher(path, [], 1.0)
+
+        run.assert_not_called()
@@ -0,0 +1,61 @@
+"""
+Test cases guarding stdio cold start (spawns fresh interpreters, no network access required)
+"""
+import os
+import sys
+import asyncio
+import subprocess
+import pytest
+from unittest.mock import patch
+
+BENCH_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "benchmarks")
+
+
+def _run_python(code: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+
+class TestLazyStartup:
+    """Test that import-time work stays deferred"""
+
+    def test_client_import_does_not_load_httpx(self):
+        result = _run_python("import sys, coinex_mcp_server; print('httpx' in sys.modules)")
+
+        assert result.stdout.strip() == "False"
+
+    def test_main_import_is_silent(self):
+        # .env discovery happens in main(); stdout must stay clean for the stdio protocol
+        result = _run_python("import coinex_mcp_server.main")
+
+        assert result.stdout == ""
+        assert ".env" not in result.stderr
+
+    @pytest.mark.slow
+    def test_stdio_answers_tools_list(self):
+        sys.path.insert(0, BENCH_DIR)
+        try:
+            from bench_startup import measure_tools_list
+        finally:
+            sys.path.remove(BENCH_DIR)
+
+        elapsed_ms, tool_count = measure_tools_list()
+
+        assert tool_count > 0
+        assert elapsed_ms < 15000
+
+
+class TestShutdown:
+    """Test that serving releases what it opened"""
+
+    @pytest.mark.asyncio
+    async def test_serve_closes_pooled_http_client(self):
+        from coinex_mcp_server import coinex_client, main
+        opened = []
+
+        async def run_async(**kwargs):
+            opened.append(coinex_client.get_http_client())
+
+        with patch.object(main.mcp, "run_async", side_effect=run_async):
+            await main._serve("stdio", {}, False, [], None)
+
+        assert opened[0].is_closed and asyncio.get_running_loop() not in coinex_client._http_clients
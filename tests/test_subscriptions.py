@@ -0,0 +1,170 @@
+"""
+Test cases for market data resources and their subscriptions (in-memory MCP client, no network access required)
+"""
+import json
+import asyncio
+import contextlib
+import pytest
+from unittest.mock import AsyncMock
+from fastmcp import Client
+from fastmcp.client.messages import MessageHandler
+
+from coinex_mcp_server import main
+from coinex_mcp_server.coinex_client import CoinExClient
+from coinex_mcp_server.subscriptions import ResourceFeed
+
+
+class FakeSession:
+    def __init__(self, fail=False):
+        self.sent = []
+        self.fail = fail
+
+    async def send_resource_updated(self, uri):
+        if self.fail:
+            raise ConnectionError("closed")
+        self.sent.append(str(uri))
+
+
+class TestResourceFeed:
+    """Test change detection and per-subscriber coalescing"""
+
+    @pytest.mark.asyncio
+    async def test_notifies_on_change_only(self):
+        values = iter([1, 1, 2, 2, 3])
+        reads = []
+
+        async def read(uri):
+            reads.append(uri)
+            return {"code": 0, "data": next(values, 3), "age_ms": len(reads)}
+
+        feed = ResourceFeed(read, poll_interval=0.01, min_interval=0)
+        session = FakeSession()
+        await feed.subscribe(session, "coinex://spot/BTCUSDT/ticker")
+        await asyncio.sleep(0.1)
+        feed.close()
+
+        # Changes 1->2 and 2->3; age_ms alone is not a change
+        assert session.sent == ["coinex://spot/BTCUSDT/ticker"] * 2
+
+    @pytest.mark.asyncio
+    async def test_coalesces_to_min_interval(self):
+        counter = iter(range(1000))
+
+        async def read(uri):
+            return next(counter)
+
+        feed = ResourceFeed(read, poll_interval=0.01, min_interval=0.2)
+        fast, slow = FakeSession(), FakeSession()
+        await feed.subscribe(fast, "coinex://spot/BTCUSDT/ticker")
+        await feed.subscribe(slow, "coinex://spot/BTCUSDT/ticker")
+        await asyncio.sleep(0.3)
+        feed.close()
+
+        # Every poll is a change, but each subscriber gets one now and one coalesced notification
+        assert len(fast.sent) == 2 and len(slow.sent) == 2
+
+    @pytest.mark.asyncio
+    async def test_unsubscribe_and_closed_sessions(self):
+        counter = iter(range(1000))
+
+        async def read(uri):
+            return next(counter)
+
+        feed = ResourceFeed(read, poll_interval=0.01, min_interval=0)
+        gone, left = FakeSession(fail=True), FakeSession()
+        await feed.subscribe(gone, "coinex://spot/BTCUSDT/ticker")
+        await feed.subscribe(left, "coinex://spot/BTCUSDT/depth")
+        feed.unsubscribe(left, "coinex://spot/BTCUSDT/depth")
+        await asyncio.sleep(0.05)
+
+        assert feed._subscribers == {} and feed._pollers == {}
+        assert left.sent == []
+
+    @pytest.mark.asyncio
+    async def test_subscription_caps_and_session_close(self):
+        async def read(uri):
+            return 1
+
+        feed = ResourceFeed(read, poll_interval=0.01, min_interval=0, max_per_session=2, max_resources=3)
+        first, second = FakeSession(), FakeSession()
+        first._exit_stack = contextlib.AsyncExitStack()
+        await feed.subscribe(first, "coinex://spot/BTCUSDT/ticker")
+        await feed.subscribe(first, "coinex://spot/BTCUSDT/depth")
+        await feed.subscribe(first, "coinex://spot/BTCUSDT/depth")
+        with pytest.raises(ValueError, match="per session"):
+            await feed.subscribe(first, "coinex://spot/ETHUSDT/ticker")
+        await feed.subscribe(second, "coinex://spot/ETHUSDT/ticker")
+        with pytest.raises(ValueError, match="Too many"):
+            await feed.subscribe(second, "coinex://spot/SOLUSDT/ticker")
+        # Joining an already polled resource is always possible
+        await feed.subscribe(second, "coinex://spot/BTCUSDT/ticker")
+
+        await first._exit_stack.aclose()
+        await asyncio.sleep(0)
+
+        assert sorted(feed._subscribers) == sorted(feed._pollers) == [
+            "coinex://spot/BTCUSDT/ticker", "coinex://spot/ETHUSDT/ticker"]
+        assert all(list(subscribers) == [second] for subscribers in feed._subscribers.values())
+        feed.close()
+        feed.close()
+
+
+class TestMarketResources:
+    """Test coinex:// resources and resources/subscribe through an MCP client"""
+
+    def setup_method(self):
+        main.coinex_client = AsyncMock(spec=CoinExClient)
+        main.resource_feed.poll_interval = 0.01
+        main.resource_feed.min_interval = 0
+
+    def teardown_method(self):
+        main.resource_feed.close()
+
+    @pytest.mark.asyncio
+    async def test_read_ticker_and_depth(self):
+        main.coinex_client.get_tickers.return_value = {"code": 0, "message": "OK", "data": [{"market": "BTCUSDT"}]}
+        main.coinex_client.get_depth.return_value = {"code": 0, "message": "OK", "data": {"market": "ETHBTC"}}
+
+        async with Client(main.mcp) as client:
+            ticker = await client.read_resource("coinex://spot/BTCUSDT/ticker")
+            depth = await client.read_resource("coinex://futures/ethbtc/depth")
+
+        assert json.loads(ticker[0].text)["data"][0]["market"] == "BTCUSDT"
+        main.coinex_client.get_tickers.assert_called_once_with("BTC", "USDT", CoinExClient.MarketType.SPOT)
+        main.coinex_client.get_depth.assert_called_once_with("ETH", "BTC", CoinExClient.MarketType.FUTURES, 20, "0")
+        assert json.loads(depth[0].text)["code"] == 0
+
+    @pytest.mark.asyncio
+    async def test_subscribe_receives_updates(self):
+        prices = iter(["1", "1", "2"])
+
+        async def tickers(*args):
+            return {"code": 0, "message": "OK", "data": [{"market": "BTCUSDT", "last": next(prices, "2")}]}
+
+        main.coinex_client.get_tickers.side_effect = tickers
+        updated = asyncio.Event()
+
+        class Handler(MessageHandler):
+            async def on_resource_updated(self, message):
+                assert str(message.params.uri) == "coinex://spot/BTCUSDT/ticker"
+                updated.set()
+
+        async with Client(main.mcp, message_handler=Handler()) as client:
+            assert client.initialize_result.capabilities.resources.subscribe is True
+            await client.session.subscribe_resource("coinex://spot/BTCUSDT/ticker")
+            await asyncio.wait_for(updated.wait(), timeout=2)
+            await client.session.unsubscribe_resource("coinex://spot/BTCUSDT/ticker")
+
+        assert main.resource_feed._subscribers == {}
+
+        async with Client(main.mcp) as client:
+            await client.session.subscribe_resource("coinex://spot/BTCUSDT/ticker")
+            assert main.resource_feed._subscribers
+        # Disconnecting without unsubscribing ends the session's subscriptions
+        assert main.resource_feed._subscribers == {} and main.resource_feed._pollers == {}
+
+    @pytest.mark.asyncio
+    async def test_subscribe_to_unknown_market_fails(self):
+        async with Client(main.mcp) as client:
+            with pytest.raises(Exception):
+                await client.session.subscribe_resource("coinex://spot/BTCXYZ/ticker")
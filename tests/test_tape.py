@@ -0,0 +1,160 @@
+"""
+Test cases for the trade tape (no network access required)
+"""
+import time
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+
+from coinex_mcp_server import main
+from coinex_mcp_server.coinex_client import CoinExClient
+from coinex_mcp_server.limits import current_deadline
+from coinex_mcp_server.tape import TapeFeed, TradeTape
+
+
+def deal(deal_id, created_at, price="100", amount="1", side="buy"):
+    return {"deal_id": deal_id, "created_at": created_at, "price": price, "amount": amount, "side": side}
+
+
+def page(*deals):
+    """Deals endpoint order: newest first"""
+    return sorted(deals, key=lambda d: d["deal_id"], reverse=True)
+
+
+class TestTradeTape:
+    """Test incremental appends, delta queries and rolling aggregates"""
+
+    def test_extend_keeps_only_new_deals(self):
+        tape = TradeTape(capacity=10, windows=(60,))
+        assert tape.extend(page(deal(1, 1000), deal(2, 2000))) == 2
+        assert tape.extend(page(deal(2, 2000), deal(3, 3000))) == 1
+        assert tape.last_id == 3
+        assert [d["deal_id"] for d in tape.since(deal_id=0)[0]] == [1, 2, 3]
+
+    def test_since_deal_id_and_timestamp(self):
+        tape = TradeTape(capacity=10, windows=(60,))
+        tape.extend(page(*(deal(i, i * 1000) for i in range(1, 6))))
+
+        trades, truncated = tape.since(deal_id=3)
+        assert [d["deal_id"] for d in trades] == [4, 5]
+        assert truncated is False
+        assert [d["deal_id"] for d in tape.since(since_ms=2000)[0]] == [3, 4, 5]
+        assert [d["deal_id"] for d in tape.since(deal_id=1, limit=2)[0]] == [2, 3]
+        assert [d["deal_id"] for d in tape.since(limit=2)[0]] == [4, 5]
+        assert tape.since(deal_id=5) == ([], False)
+
+    def test_ring_buffer_overwrite_is_reported(self):
+        tape = TradeTape(capacity=3, windows=(60,))
+        tape.extend(page(*(deal(i, i * 1000) for i in range(1, 6))))
+
+        assert len(tape) == 3
+        trades, truncated = tape.since(deal_id=1)
+        assert [d["deal_id"] for d in trades] == [3, 4, 5]
+        assert truncated is True
+        assert tape.since(deal_id=3)[1] is False
+
+    def test_rolling_aggregates(self):
+        tape = TradeTape(windows=(10, 60))
+        tape.extend(page(deal(1, 0, price="100", amount="2", side="buy"),
+                         deal(2, 30_000, price="110", amount="1", side="sell")))
+        tape.extend(page(deal(3, 55_000, price="120", amount="1", side="buy")))
+
+        short, long = tape.aggregates(now_ms=56_000)
+        assert short == {"window_seconds": 10, "trade_count": 1, "volume": "1", "buy_volume": "1",
+                         "sell_volume": "0", "vwap": "120"}
+        assert long["trade_count"] == 3
+        assert long["buy_volume"] == "3" and long["sell_volume"] == "1"
+        assert long["vwap"] == "107.5"
+
+        # Deal 1 leaves the 60s window, deal 3 the 10s window
+        short, long = tape.aggregates(now_ms=66_000)
+        assert short["trade_count"] == 0 and short["vwap"] is None
+        assert long["trade_count"] == 2 and long["vwap"] == "115"
+
+
+class TestTradesSinceTool:
+    """Test get_trades_since against a mocked deals endpoint"""
+
+    def setup_method(self):
+        main.coinex_client = AsyncMock(spec=CoinExClient)
+        main.tape_feed = TapeFeed(main.coinex_client, windows=(60,), interval=3600)
+
+    def teardown_method(self):
+        main.tape_feed.close()
+        main.tape_feed = None
+
+    @pytest.mark.asyncio
+    async def test_delta_queries(self):
+        main.coinex_client.get_deal.return_value = {"code": 0, "message": "OK",
+                                                    "data": page(deal(1, 1000), deal(2, 2000, side="sell"))}
+
+        first = await main.get_trades_since.fn("btc")
+        assert first["code"] == 0
+        assert [d["deal_id"] for d in first["data"]["trades"]] == [1, 2]
+        assert first["data"]["last_id"] == 2
+        main.coinex_client.get_deal.assert_called_once_with("BTC", "USDT", CoinExClient.MarketType.SPOT, limit=1000)
+
+        tape = await main.tape_feed.tape("BTC", "USDT", CoinExClient.MarketType.SPOT)
+        tape.extend(page(deal(3, 3000)))
+        delta = await main.get_trades_since.fn("BTC", deal_id=2)
+        assert [d["deal_id"] for d in delta["data"]["trades"]] == [3]
+        assert delta["data"]["has_more"] is False
+
+        empty = await main.get_trades_since.fn("BTC", deal_id=3)
+        assert empty["data"]["trades"] == [] and empty["data"]["last_id"] == 3
+        assert main.coinex_client.get_deal.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_upstream_error(self):
+        main.coinex_client.get_deal.return_value = {"code": 3639, "message": "market not found"}
+
+        result = await main.get_trades_since.fn("NOPE")
+
+        assert result["code"] == -1
+        assert "3639" in result["message"]
+
+    @pytest.mark.asyncio
+    async def test_poller_does_not_inherit_call_deadline(self):
+        deadlines = []
+
+        async def get_deal(*args, **kwargs):
+            deadlines.append(current_deadline.get())
+            return {"code": 0, "message": "OK", "data": []}
+
+        main.coinex_client.get_deal.side_effect = get_deal
+        main.tape_feed.interval = 0.01
+        token = current_deadline.set(time.monotonic() + 10)
+        try:
+            await main.get_trades_since.fn("BTC")
+        finally:
+            current_deadline.reset(token)
+        await asyncio.sleep(0.05)
+
+        assert deadlines[0] is not None and len(deadlines) > 1 and set(deadlines[1:]) == {None}
+
+    @pytest.mark.asyncio
+    async def test_concurrent_first_queries_share_one_load(self):
+        async def get_deal(*args, **kwargs):
+            await asyncio.sleep(0.01)
+            return {"code": 0, "message": "OK", "data": page(deal(1, 1000))}
+
+        main.coinex_client.get_deal.side_effect = get_deal
+        first, second = await asyncio.gather(main.get_trades_since.fn("BTC"), main.get_trades_since.fn("BTC"))
+
+        assert first["data"] == second["data"]
+        assert main.coinex_client.get_deal.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_tracked_markets_are_capped(self):
+        main.tape_feed.max_tapes = 2
+        main.coinex_client.get_deal.return_value = {"code": 3639, "message": "market not found"}
+        await main.get_trades_since.fn("NOPE")
+        assert main.tape_feed._queried == {} and main.tape_feed._loading == {}
+
+        main.coinex_client.get_deal.return_value = {"code": 0, "message": "OK", "data": []}
+        for base in ("BTC", "ETH", "BTC", "SOL"):
+            await main.get_trades_since.fn(base)
+
+        # ETH was the least recently queried
+        assert sorted(main.tape_feed._tapes) == sorted(main.tape_feed._queried) == [
+            ("BTC", "USDT", "spot"), ("SOL", "USDT", "spot")]
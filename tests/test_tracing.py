@@ -0,0 +1,79 @@
+"""
+Test cases for OpenTelemetry tracing hooks (a recording tracer stands in for the SDK, no network access required)
+"""
+import asyncio
+import contextlib
+import importlib.util
+
+import httpx
+import pytest
+from unittest.mock import AsyncMock
+
+from coinex_mcp_server import coinex_client as client_module
+from coinex_mcp_server import main, tracing
+from coinex_mcp_server.coinex_client import CoinExClient
+
+
+class RecordingTracer:
+    """Minimal tracer: records (name, attributes) of every span in start order."""
+
+    def __init__(self):
+        self.spans = []
+
+    @contextlib.contextmanager
+    def start_as_current_span(self, name, attributes=None):
+        attributes = dict(attributes or {})
+        self.spans.append((name, attributes))
+        span = type("Span", (), {"set_attribute": lambda _, key, value: attributes.__setitem__(key, value)})()
+        yield span
+
+
+class TestTracing:
+    """Test the disabled fast path and the spans opened around tools and CoinEx requests"""
+
+    def setup_method(self):
+        self.tracer = RecordingTracer()
+        main.tool_cache.invalidate()
+
+    def teardown_method(self):
+        tracing._tracer = None
+
+    def test_disabled_spans_are_shared_noop(self):
+        assert not tracing.enabled()
+        with tracing.span("a", {"k": 1}) as first, tracing.span("b") as second:
+            first.set_attribute("x", 1)
+        assert first is second is tracing._NOOP
+        with pytest.raises(ValueError):
+            tracing.configure_tracing("jaeger")
+        if importlib.util.find_spec("opentelemetry") is None:
+            with pytest.raises(RuntimeError, match="tracing"):
+                tracing.configure_tracing("console")
+            assert not tracing.enabled()
+
+    @pytest.mark.asyncio
+    async def test_tool_span_records_code(self):
+        tracing._tracer = self.tracer
+        main.coinex_client = AsyncMock(spec=CoinExClient)
+        main.coinex_client.get_kline.return_value = {"code": 3639, "message": "market not found"}
+
+        await main.get_kline.fn("NOPE")
+
+        assert self.tracer.spans == [("mcp.tool", {"mcp.tool": "get_kline", "coinex.code": 3639})]
+
+    @pytest.mark.asyncio
+    async def test_request_phases(self):
+        tracing._tracer = self.tracer
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, json={"code": 0, "data": [], "message": "OK"}))
+        loop = asyncio.get_running_loop()
+        client_module._http_clients[loop] = httpx.AsyncClient(transport=transport)
+        try:
+            await CoinExClient(enable_env_credentials=False)._request("GET", "/spot/ticker", {"market": "BTCUSDT"})
+        finally:
+            await client_module.close_http_client()
+
+        assert [name for name, _ in self.tracer.spans] == [
+            "coinex.request", "coinex.queue", "coinex.sign", "coinex.send", "coinex.decode"]
+        spans = dict(self.tracer.spans)
+        assert spans["coinex.request"] == {"http.request.method": "GET", "coinex.endpoint": "/spot/ticker",
+                                           "coinex.code": 0}
+        assert spans["coinex.send"] == {"http.response.status_code": 200}